@@ -0,0 +1,20 @@
+from django.contrib import admin
+from .models import MatcherCheckpoint, SavedSearch, SavedSearchMatch
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ['user', 'name', 'city', 'property_type', 'transaction_type', 'is_active', 'created_at']
+    list_filter = ['is_active', 'transaction_type', 'property_type']
+    search_fields = ['user__username', 'name', 'city']
+
+
+@admin.register(SavedSearchMatch)
+class SavedSearchMatchAdmin(admin.ModelAdmin):
+    list_display = ['saved_search', 'property', 'matched_at']
+    raw_id_fields = ['saved_search', 'property']
+
+
+@admin.register(MatcherCheckpoint)
+class MatcherCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_published_at', 'last_property_id', 'updated_at']
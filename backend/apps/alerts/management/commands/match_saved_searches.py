@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.alerts.matcher import MATCH_BATCH_SIZE, run_matcher
+
+
+class Command(BaseCommand):
+    help = 'Confronte les nouvelles annonces aux recherches enregistrées'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=MATCH_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Tourne en continu')
+        parser.add_argument('--interval', type=float, default=60.0, help='Pause (s) entre deux passages')
+
+    def handle(self, *args, **options):
+        while True:
+            count = run_matcher(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{count} correspondance(s) enregistrée(s)'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
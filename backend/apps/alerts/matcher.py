@@ -0,0 +1,160 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from apps.properties.geo import filter_by_location, haversine_km, parse_bbox
+from apps.properties.models import Property
+from apps.properties.search import fold
+from .models import MatcherCheckpoint, SavedSearch, SavedSearchMatch
+
+# Filtres de `PropertyListCreateView` pris en charge par les recherches enregistrées
+EXACT_FILTERS = ('property_type', 'transaction_type', 'city', 'country')
+RANGE_FILTERS = {
+    'min_price': ('price_eur', 'gte'),
+    'max_price': ('price_eur', 'lte'),
+    'bedrooms_min': ('bedrooms', 'gte'),
+    'min_price_per_sqm': ('price_per_sqm', 'gte'),
+    'max_price_per_sqm': ('price_per_sqm', 'lte'),
+}
+GEO_FILTERS = ('lat', 'lng', 'radius_km', 'bbox')
+SEARCH_FILTERS = (*EXACT_FILTERS, *RANGE_FILTERS, *GEO_FILTERS, 'search')
+
+CHECKPOINT_NAME = 'saved_searches'
+MATCH_BATCH_SIZE = 500
+# Laisse aux transactions en cours le temps de valider avant d'avancer le point de reprise
+MATCH_LAG = timedelta(minutes=1)
+PROPERTY_FIELDS = (
+    'id', 'published_at', *EXACT_FILTERS, 'price_eur', 'bedrooms', 'price_per_sqm',
+    'latitude', 'longitude', 'title', 'description', 'address', 'postal_code',
+)
+
+
+def clean_filters(params):
+    """Ne garde que les filtres pris en charge, non vides, et les valide."""
+    filters = {
+        key: str(params[key]).strip()
+        for key in SEARCH_FILTERS
+        if key in params and str(params[key]).strip() != ''
+    }
+    for key in RANGE_FILTERS:
+        if key in filters:
+            try:
+                Decimal(filters[key])
+            except InvalidOperation:
+                raise ValidationError({key: 'Valeur numérique attendue.'})
+    filter_by_location(Property.objects.none(), filters)
+    return filters
+
+
+def compile_filters(filters):
+    """Prédicat Python équivalent aux filtres SQL de la liste des biens."""
+    tests = []
+    for key in EXACT_FILTERS:
+        if key in filters:
+            tests.append(lambda p, key=key, value=filters[key]: getattr(p, key) == value)
+    for key, (field, op) in RANGE_FILTERS.items():
+        if key in filters:
+            bound = Decimal(filters[key])
+            if op == 'gte':
+                tests.append(lambda p, f=field, b=bound: getattr(p, f) is not None and getattr(p, f) >= b)
+            else:
+                tests.append(lambda p, f=field, b=bound: getattr(p, f) is not None and getattr(p, f) <= b)
+
+    if any(key in filters for key in GEO_FILTERS):
+        tests.append(lambda p: p.latitude is not None and p.longitude is not None)
+        if 'bbox' in filters:
+            min_lat, min_lng, max_lat, max_lng = parse_bbox(filters['bbox'])
+            tests.append(lambda p: min_lat <= p.latitude <= max_lat and min_lng <= p.longitude <= max_lng)
+        if filters.get('radius_km') and 'lat' in filters and 'lng' in filters:
+            lat, lng, radius = float(filters['lat']), float(filters['lng']), float(filters['radius_km'])
+            tests.append(lambda p: haversine_km(lat, lng, float(p.latitude), float(p.longitude)) <= radius)
+
+    if 'search' in filters:
+        # Approximation de la recherche plein texte : tous les termes présents
+        terms = fold(filters['search']).split()
+        tests.append(lambda p: all(
+            term in fold(' '.join((p.title, p.description, p.city, p.address, p.postal_code)))
+            for term in terms
+        ))
+    return lambda p: all(test(p) for test in tests)
+
+
+def build_index(searches):
+    """Recherches actives groupées par (ville, type, transaction) ; '' = indifférent."""
+    index = defaultdict(list)
+    for search in searches:
+        try:
+            test = compile_filters(search.filters)
+        except (ValidationError, InvalidOperation, ValueError):
+            continue
+        index[(search.city, search.property_type, search.transaction_type)].append((search.pk, test))
+    return index
+
+
+def candidates(index, p):
+    """Seules les 8 combinaisons (valeur du bien ou indifférent) sont consultées."""
+    for city in {p.city, ''}:
+        for property_type in {p.property_type, ''}:
+            for transaction_type in {p.transaction_type, ''}:
+                yield from index.get((city, property_type, transaction_type), ())
+
+
+def get_checkpoint():
+    checkpoint, created = MatcherCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+    if created:
+        # Premier passage : seules les annonces à venir déclenchent des alertes
+        latest = (
+            Property.objects.filter(is_published=True).order_by('-published_at', '-id')
+            .values_list('published_at', 'id').first()
+        )
+        if latest:
+            checkpoint.last_published_at, checkpoint.last_property_id = latest
+            checkpoint.save()
+    return checkpoint
+
+
+def run_matcher(batch_size=MATCH_BATCH_SIZE):
+    """
+    Confronte les biens publiés depuis le dernier passage à toutes les
+    recherches actives, par lots ; chaque lot et le point de reprise sont
+    enregistrés dans la même transaction. Le parcours suit la date de
+    publication : un brouillon publié plus tard est traité à ce moment-là.
+    Renvoie le nombre de correspondances.
+    """
+    index = build_index(
+        SavedSearch.objects.filter(is_active=True)
+        .only('pk', 'filters', 'city', 'property_type', 'transaction_type')
+        .iterator()
+    )
+    checkpoint = get_checkpoint()
+    horizon = timezone.now() - MATCH_LAG
+    total = 0
+    while True:
+        qs = (
+            Property.objects.filter(is_published=True, published_at__lte=horizon)
+            .only(*PROPERTY_FIELDS).order_by('published_at', 'id')
+        )
+        if checkpoint.last_published_at is not None:
+            qs = qs.filter(
+                Q(published_at__gt=checkpoint.last_published_at)
+                | Q(published_at=checkpoint.last_published_at, id__gt=checkpoint.last_property_id)
+            )
+        batch = list(qs[:batch_size])
+        if not batch:
+            break
+        matches = [
+            SavedSearchMatch(saved_search_id=search_id, property=p)
+            for p in batch
+            for search_id, test in candidates(index, p)
+            if test(p)
+        ]
+        with transaction.atomic():
+            SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+            checkpoint.last_published_at = batch[-1].published_at
+            checkpoint.last_property_id = batch[-1].pk
+            checkpoint.save(update_fields=['last_published_at', 'last_property_id', 'updated_at'])
+        total += len(matches)
+    return total
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0001_initial'),
+        # Le point de reprise suit désormais `Property.published_at`
+        ('properties', '0015_property_published_at'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='matchercheckpoint',
+            old_name='last_created_at',
+            new_name='last_published_at',
+        ),
+    ]
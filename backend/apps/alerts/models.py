@@ -0,0 +1,53 @@
+from django.db import models
+from django.contrib.auth.models import User
+from apps.properties.models import Property
+
+
+class SavedSearch(models.Model):
+    """Filtres de la liste des biens enregistrés par un utilisateur (alerte)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100, blank=True)
+    filters = models.JSONField(default=dict, blank=True)
+    # Dénormalisés depuis `filters` pour l'index du matcher ('' = indifférent)
+    city = models.CharField(max_length=100, blank=True)
+    property_type = models.CharField(max_length=20, blank=True)
+    transaction_type = models.CharField(max_length=10, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.name or self.filters}"
+
+    def save(self, *args, **kwargs):
+        self.city = self.filters.get('city', '')
+        self.property_type = self.filters.get('property_type', '')
+        self.transaction_type = self.filters.get('transaction_type', '')
+        super().save(*args, **kwargs)
+
+
+class SavedSearchMatch(models.Model):
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='saved_search_matches')
+    matched_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('saved_search', 'property')
+        ordering = ['-matched_at']
+
+    def __str__(self):
+        return f"{self.saved_search} ← {self.property.title}"
+
+
+class MatcherCheckpoint(models.Model):
+    """Dernier bien traité par le matcher (`published_at`, puis id pour départager)."""
+    name = models.CharField(max_length=50, unique=True)
+    last_published_at = models.DateTimeField(null=True, blank=True)
+    last_property_id = models.UUIDField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} : {self.last_published_at}"
@@ -0,0 +1,33 @@
+from rest_framework import serializers
+from apps.properties.serializers import PropertyCardSerializer
+from .matcher import clean_filters
+from .models import SavedSearch, SavedSearchMatch
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    matches_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'filters', 'is_active', 'matches_count', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate_filters(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('Objet attendu (paramètres de la liste des biens).')
+        filters = clean_filters(value)
+        if not filters:
+            raise serializers.ValidationError('Au moins un filtre est requis.')
+        return filters
+
+    def create(self, validated_data):
+        validated_data['user'] = self.context['request'].user
+        return super().create(validated_data)
+
+
+class SavedSearchMatchSerializer(serializers.ModelSerializer):
+    property = PropertyCardSerializer(read_only=True)
+
+    class Meta:
+        model = SavedSearchMatch
+        fields = ['id', 'property', 'matched_at']
@@ -0,0 +1,112 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.properties.models import Property
+from .matcher import CHECKPOINT_NAME, run_matcher
+from .models import MatcherCheckpoint, SavedSearch, SavedSearchMatch
+
+
+class SavedSearchMatcherTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        self.user = User.objects.create_user('acheteur', 'acheteur@example.com', 'motdepasse123')
+        # Premier passage : le point de reprise part de la dernière annonce existante
+        self.first = self.publish('Ancien', 'Nice', 'apartment', 'rent', '500', minutes_ago=10)
+        self.assertEqual(run_matcher(), 0)
+        self.searches = {
+            name: SavedSearch.objects.create(user=self.user, name=name, filters=filters)
+            for name, filters in {
+                'nice_location': {'city': 'Nice', 'property_type': 'apartment', 'transaction_type': 'rent'},
+                'ventes': {'transaction_type': 'sale'},
+                'lyon': {'city': 'Lyon'},
+                'nice_pas_cher': {'city': 'Nice', 'max_price': '1000'},
+            }.items()
+        }
+
+    def publish(self, title, city, property_type, transaction_type, price, minutes_ago=5):
+        p = Property.objects.create(
+            owner=self.owner, title=title, description='Desc', city=city, address='1 rue',
+            property_type=property_type, transaction_type=transaction_type, price=Decimal(price),
+            is_published=True,
+        )
+        # Hors du délai de garde `MATCH_LAG`
+        moment = timezone.now() - timedelta(minutes=minutes_ago)
+        Property.objects.filter(pk=p.pk).update(created_at=moment, published_at=moment)
+        p.refresh_from_db()
+        return p
+
+    def matched(self):
+        return sorted(SavedSearchMatch.objects.values_list('saved_search__name', 'property__title'))
+
+    def test_matches_by_bucket_and_filters(self):
+        self.publish('Studio', 'Nice', 'apartment', 'rent', '900', minutes_ago=4)
+        self.publish('Villa', 'Nice', 'villa', 'sale', '2000', minutes_ago=3)
+        last = self.publish('T2', 'Lyon', 'apartment', 'rent', '700', minutes_ago=2)
+        # Trop récente : traitée au prochain passage
+        self.publish('Récente', 'Lyon', 'apartment', 'rent', '700', minutes_ago=0)
+
+        self.assertEqual(run_matcher(batch_size=2), 4)
+        self.assertEqual(self.matched(), [
+            ('lyon', 'T2'), ('nice_location', 'Studio'), ('nice_pas_cher', 'Studio'), ('ventes', 'Villa'),
+        ])
+        checkpoint = MatcherCheckpoint.objects.get(name=CHECKPOINT_NAME)
+        self.assertEqual((checkpoint.last_published_at, checkpoint.last_property_id), (last.published_at, last.pk))
+
+    def test_runs_never_duplicate_matches(self):
+        self.publish('Studio', 'Nice', 'apartment', 'rent', '900')
+        self.assertEqual(run_matcher(), 2)
+        self.assertEqual(run_matcher(), 0)
+        # Point de reprise ramené en arrière : les correspondances existantes ne sont pas dupliquées
+        MatcherCheckpoint.objects.update(last_published_at=self.first.published_at, last_property_id=self.first.pk)
+        run_matcher()
+        self.assertEqual(SavedSearchMatch.objects.count(), 2)
+
+        self.publish('Maison', 'Lyon', 'villa', 'sale', '300000', minutes_ago=2)
+        self.assertEqual(run_matcher(), 2)
+        self.assertEqual(self.matched(), [
+            ('lyon', 'Maison'), ('nice_location', 'Studio'), ('nice_pas_cher', 'Studio'), ('ventes', 'Maison'),
+        ])
+
+    def test_draft_published_later_is_matched(self):
+        draft = Property.objects.create(
+            owner=self.owner, title='Brouillon', description='Desc', city='Lyon', address='1 rue',
+            property_type='apartment', transaction_type='rent', price=Decimal('700'),
+        )
+        Property.objects.filter(pk=draft.pk).update(created_at=timezone.now() - timedelta(minutes=30))
+        self.publish('Studio', 'Nice', 'apartment', 'rent', '900', minutes_ago=5)
+        self.assertEqual(run_matcher(), 2)
+
+        # Créé avant le point de reprise, publié après : traité au passage suivant
+        draft.refresh_from_db()
+        self.assertIsNone(draft.published_at)
+        draft.is_published = True
+        draft.save(update_fields=['is_published'])
+        Property.objects.filter(pk=draft.pk).update(published_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(run_matcher(), 1)
+        self.assertIn(('lyon', 'Brouillon'), self.matched())
+
+    def test_invalid_filters_are_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for filters in [{'lat': '43.7'}, {'min_price': 'beaucoup'}, {'bbox': '1,2'}]:
+            response = client.post('/api/alerts/searches/', {'name': 'x', 'filters': filters}, format='json')
+            self.assertEqual(response.status_code, 400, filters)
+
+    def test_match_list_resolves_favorites_once(self):
+        from apps.favorites.models import Favorite
+        studios = [self.publish(f'Studio {i}', 'Lyon', 'apartment', 'rent', '900') for i in range(5)]
+        run_matcher()
+        Favorite.objects.create(user=self.user, property=studios[2])
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(f"/api/alerts/searches/{self.searches['lyon'].pk}/matches/")
+        self.assertEqual(response.status_code, 200)
+        favorited = {m['property']['title']: m['property']['is_favorited'] for m in response.json()['results']}
+        self.assertEqual(favorited, {f'Studio {i}': i == 2 for i in range(5)})
+        self.assertEqual(len([q for q in ctx.captured_queries if 'favorites_favorite' in q['sql']]), 1)
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('searches/', views.SavedSearchListCreateView.as_view(), name='saved-search-list'),
+    path('searches/<int:pk>/', views.SavedSearchDetailView.as_view(), name='saved-search-detail'),
+    path('searches/<int:pk>/matches/', views.SavedSearchMatchListView.as_view(), name='saved-search-matches'),
+]
@@ -0,0 +1,55 @@
+from django.db.models import Count, Prefetch
+from rest_framework import generics, permissions
+from rest_framework.response import Response
+from apps.properties.models import Property
+from apps.properties.serializers import card_queryset, resolve_favorites
+from .models import SavedSearch, SavedSearchMatch
+from .serializers import SavedSearchMatchSerializer, SavedSearchSerializer
+
+
+def own_searches(user):
+    # L'agrégat supprime l'ordre par défaut du modèle : il est redonné explicitement
+    return (
+        SavedSearch.objects.filter(user=user)
+        .annotate(matches_count=Count('matches')).order_by('-created_at')
+    )
+
+
+class SavedSearchListCreateView(generics.ListCreateAPIView):
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return own_searches(self.request.user)
+
+
+class SavedSearchDetailView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return own_searches(self.request.user)
+
+
+class SavedSearchMatchListView(generics.ListAPIView):
+    """Annonces trouvées pour une recherche enregistrée, les plus récentes d'abord."""
+    serializer_class = SavedSearchMatchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearchMatch.objects.filter(
+            saved_search_id=self.kwargs['pk'], saved_search__user=self.request.user,
+        ).prefetch_related(
+            Prefetch('property', queryset=card_queryset(Property.objects.all())),
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        matches = list(queryset) if page is None else page
+        # `is_favorited` des biens de la page en une seule requête
+        resolve_favorites([match.property for match in matches], request.user)
+        serializer = self.get_serializer(matches, many=True)
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
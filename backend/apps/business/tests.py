@@ -1,3 +1,39 @@
+from unittest.mock import patch
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+from .models import Business, BusinessReview, TeamMember
+from .serializers import BusinessSerializer
 
-# Create your tests here.
+
+class BusinessEtagTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        self.agent = User.objects.create_user('agent', 'agent@example.com', 'motdepasse123')
+        self.business = Business.objects.create(owner=self.owner, name='Agence du Port', business_type='agency')
+        TeamMember.objects.create(business=self.business, user=self.agent)
+        self.client = APIClient()
+        self.url = f'/api/business/{self.business.pk}/'
+
+    def etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_etag_is_not_serialized(self):
+        etag = self.etag()
+        with patch.object(BusinessSerializer, 'to_representation') as to_representation:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        to_representation.assert_not_called()
+
+    def test_reviews_and_team_change_etag(self):
+        etags = [self.etag()]
+        BusinessReview.objects.create(business=self.business, author=self.agent, rating=4, content='Sérieux')
+        etags.append(self.etag())
+        self.agent.first_name = 'Camille'
+        self.agent.save()
+        etags.append(self.etag())
+        TeamMember.objects.filter(user=self.agent).update(role='manager')
+        etags.append(self.etag())
+        self.assertEqual(len(set(etags)), 4)
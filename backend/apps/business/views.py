@@ -1,3 +1,7 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -35,6 +39,27 @@ class BusinessCreateView(generics.CreateAPIView):
         )
 
 
+def business_etag(request, pk):
+    """
+    ETag du détail : `updated_at`, marqueurs des avis, membres de l'équipe
+    tels qu'affichés (rôle, titre, identité de l'utilisateur), nombre de
+    biens publiés.
+    """
+    parts = Business.objects.filter(pk=pk).annotate(
+        reviews_n=Count('reviews', distinct=True),
+        reviews_last=Max('reviews__id'),
+    ).values_list('updated_at', 'owner_id', 'owner__username', 'reviews_n', 'reviews_last').first()
+    if parts is None:
+        return None
+    from apps.properties.models import Property
+    team = TeamMember.objects.filter(business_id=pk).order_by('id').values_list(
+        'id', 'role', 'title', 'user_id', 'user__username', 'user__first_name', 'user__last_name',
+    )
+    parts += (tuple(team), Property.objects.filter(owner_id=parts[1], is_published=True).count())
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+@method_decorator(condition(etag_func=business_etag), name='get')
 class BusinessDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = BusinessSerializer
     permission_classes = [permissions.AllowAny]
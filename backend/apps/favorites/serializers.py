@@ -11,6 +11,12 @@ class FavoriteSerializer(serializers.ModelSerializer):
         model = Favorite
         fields = ['id', 'property', 'property_id', 'created_at']
 
+    def to_representation(self, instance):
+        request = self.context.get('request')
+        if request and instance.user_id == request.user.id:
+            instance.property._is_favorited = True
+        return super().to_representation(instance)
+
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
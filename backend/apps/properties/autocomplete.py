@@ -0,0 +1,226 @@
+import bisect
+import threading
+import time
+from collections import Counter
+import numpy as np
+from django.db import connection
+from django.db.models import Count
+from .models import Property
+from .search import fold
+
+# Ordre de préférence à nombre d'annonces égal
+SUGGESTION_KINDS = ('city', 'postal_code', 'address')
+KIND_BONUS = {kind: len(SUGGESTION_KINDS) - 1 - i for i, kind in enumerate(SUGGESTION_KINDS)}
+MIN_QUERY_LENGTH = 2
+MAX_SUGGESTIONS = 20
+# Une adresse est aussi trouvable à partir de chacun de ses premiers mots
+MAX_KEY_WORDS = 6
+REBUILD_INTERVAL = 300    # secondes ; rattrape les écritures des autres processus
+
+
+def property_values(city, postal_code, address, is_published=True):
+    """Couples (type, libellé) qu'un bien apporte à l'index."""
+    if not is_published:
+        return []
+    values = zip(SUGGESTION_KINDS, (city, postal_code, address))
+    return [(kind, value.strip()) for kind, value in values if value and value.strip()]
+
+
+def business_values(city, is_active=True):
+    city = (city or '').strip()
+    return [('city', city)] if is_active and city else []
+
+
+def _keys(folded):
+    words = folded.split()
+    return {' '.join(words[i:]) for i in range(min(len(words), MAX_KEY_WORDS))}
+
+
+def _score(kind, total):
+    return total * len(SUGGESTION_KINDS) + KIND_BONUS[kind]
+
+
+class AutocompleteIndex:
+    """
+    Libellés distincts (villes, codes postaux, adresses) des biens publiés et
+    villes des professionnels actifs, regroupés sans accents ni casse, avec
+    leur nombre d'annonces.
+
+    Les clés repliées forment une liste triée : un préfixe correspond à une
+    tranche trouvée par `bisect`. Un tableau numpy aligné porte le score de
+    chaque clé, si bien que le top-N d'une tranche, même large (« rue de »),
+    est un `argpartition` vectorisé.
+
+    Tenu à jour par les signaux du processus courant et reconstruit depuis la
+    base toutes les `REBUILD_INTERVAL` secondes, dans un thread : les
+    nouveaux tableaux sont calculés hors du verrou puis échangés, les
+    suggestions continuent d'être servies par l'index courant. Les
+    modifications reçues pendant la reconstruction sont rejouées sur le
+    nouvel index (un compte peut être doublé jusqu'à la reconstruction
+    suivante si la lecture les a déjà vues).
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.build_lock = threading.Lock()
+        self.built = False
+        self.journal = None
+
+    def read_counts(self):
+        from apps.business.models import Business
+        counts = Counter()
+        published = Property.objects.filter(is_published=True).order_by()
+        for kind in SUGGESTION_KINDS:
+            rows = published.exclude(**{kind: ''}).values_list(kind).annotate(n=Count('pk'))
+            for value, n in rows.iterator():
+                if value.strip():
+                    counts[(kind, value.strip())] += n
+        rows = (
+            Business.objects.filter(is_active=True).exclude(city='')
+            .order_by().values_list('city').annotate(n=Count('pk'))
+        )
+        for city, n in rows.iterator():
+            for entry in business_values(city):
+                counts[entry] += n
+        return counts
+
+    def build(self):
+        with self.lock:
+            self.journal = []
+        try:
+            state = self._compute(self.read_counts())
+        except BaseException:
+            with self.lock:
+                self.journal = None
+            raise
+        with self.lock:
+            self.labels, self.totals, self.keys, self.scores = state
+            journal, self.journal = self.journal, None
+            for removed, added in journal:
+                self._apply(removed, added)
+            self.built_at = time.monotonic()
+            self.built = True
+
+    @staticmethod
+    def _compute(counts):
+        labels = {}
+        totals = Counter()
+        for (kind, label), n in counts.items():
+            entry = (kind, fold(label))
+            labels.setdefault(entry, Counter())[label] += n
+            totals[entry] += n
+        keys = sorted((key, kind, folded) for kind, folded in labels for key in _keys(folded))
+        scores = np.fromiter(
+            (_score(kind, totals[(kind, folded)]) for _, kind, folded in keys),
+            dtype=np.int64, count=len(keys),
+        )
+        return labels, totals, keys, scores
+
+    def ensure_built(self):
+        if not self.built:
+            # Premier accès : la requête attend l'index (une seule construction)
+            with self.build_lock:
+                if not self.built:
+                    self.build()
+        elif time.monotonic() - self.built_at > REBUILD_INTERVAL and not self.build_lock.locked():
+            self.built_at = time.monotonic()
+            threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def refresh(self):
+        """Reconstruit l'index ; sans effet si une reconstruction est déjà en cours."""
+        if not self.build_lock.acquire(blocking=False):
+            return
+        try:
+            self.build()
+        finally:
+            self.build_lock.release()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            connection.close()
+
+    def _position(self, item):
+        i = bisect.bisect_left(self.keys, item)
+        return i if i < len(self.keys) and self.keys[i] == item else None
+
+    def _add(self, kind, label, n):
+        folded = fold(label)
+        entry = (kind, folded)
+        labels = self.labels.get(entry)
+        if labels is None:
+            if n <= 0:
+                return
+            labels = self.labels[entry] = Counter()
+            for key in _keys(folded):
+                i = bisect.bisect_left(self.keys, (key, kind, folded))
+                self.keys.insert(i, (key, kind, folded))
+                self.scores = np.insert(self.scores, i, 0)
+        labels[label] += n
+        self.totals[entry] += n
+        if labels[label] <= 0:
+            del labels[label]
+        if not labels or self.totals[entry] <= 0:
+            del self.labels[entry], self.totals[entry]
+            for key in _keys(folded):
+                i = self._position((key, kind, folded))
+                if i is not None:
+                    del self.keys[i]
+                    self.scores = np.delete(self.scores, i)
+            return
+        score = _score(kind, self.totals[entry])
+        for key in _keys(folded):
+            i = self._position((key, kind, folded))
+            if i is not None:
+                self.scores[i] = score
+
+    def change(self, removed=(), added=()):
+        """Retire puis ajoute des couples (type, libellé) ; une annonce chacun."""
+        with self.lock:
+            if self.journal is not None:
+                self.journal.append((removed, added))
+            if self.built:
+                self._apply(removed, added)
+
+    def _apply(self, removed, added):
+        for kind, label in removed:
+            self._add(kind, label, -1)
+        for kind, label in added:
+            self._add(kind, label, 1)
+
+    def suggest(self, query, limit=MAX_SUGGESTIONS):
+        """Top-`limit` des libellés dont un mot commence par `query` (repliée)."""
+        prefix = ' '.join(fold(query).split())
+        if len(prefix) < MIN_QUERY_LENGTH:
+            return []
+        with self.lock:
+            lo = bisect.bisect_left(self.keys, (prefix,))
+            hi = bisect.bisect_left(self.keys, (prefix + '\uffff',), lo)
+            window = self.scores[lo:hi]
+            # Un libellé peut apparaître sous plusieurs clés de la tranche :
+            # on élargit la sélection jusqu'à `limit` libellés distincts
+            wanted = limit
+            while True:
+                if wanted >= len(window):
+                    best = np.argsort(-window, kind='stable')
+                else:
+                    best = np.argpartition(-window, wanted)[:wanted]
+                    best = best[np.lexsort((best, -window[best]))]
+                entries = list(dict.fromkeys(self.keys[lo + i][1:] for i in best))
+                if len(entries) >= limit or wanted >= len(window):
+                    break
+                wanted *= 2
+            return [
+                {'type': kind, 'value': self.labels[(kind, folded)].most_common(1)[0][0],
+                 'count': self.totals[(kind, folded)]}
+                for kind, folded in entries[:limit]
+            ]
+
+
+index = AutocompleteIndex()
+
+
+def suggest(query, limit=MAX_SUGGESTIONS):
+    index.ensure_built()
+    return index.suggest(query, limit)
@@ -0,0 +1,110 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+from django.core.cache import cache
+from .geo import MAX_TILE_ZOOM, tile_for
+
+# Paramètres sans effet sur l'ensemble des biens filtrés
+NON_FILTER_PARAMS = frozenset({'page', 'page_size', 'cursor', 'pagination', 'ordering', 'fields', 'format'})
+
+VERSION_KEY = 'properties:version'
+OWNER_VERSION_KEY = 'properties:owner:{}:version'
+TILE_VERSION_KEY = 'properties:tile:{}/{}/{}:version'
+AVAILABILITY_VERSION_KEY = 'properties:availability:version'
+CALENDAR_VERSION_KEY = 'properties:calendar:{}:version'
+RESPONSE_CACHE_TIMEOUT = 600
+
+
+def normalized_query(params, ignore=NON_FILTER_PARAMS):
+    """Query string triée, sans paramètres vides ni ignorés."""
+    items = sorted(
+        (key, value)
+        for key in params
+        if key not in ignore
+        for value in params.getlist(key)
+        if value != ''
+    )
+    return urlencode(items)
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        # Repart d'une valeur jamais utilisée si la clé a été évincée
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def listings_version():
+    """Version courante des données publiques des biens (incrémentée à chaque écriture)."""
+    return _version(VERSION_KEY)
+
+
+def invalidate_listings():
+    """Rend obsolètes toutes les entrées versionnées sans les parcourir."""
+    _bump(VERSION_KEY)
+
+
+def owner_version(owner_id):
+    """Version des biens d'un propriétaire : seules ses écritures l'incrémentent."""
+    return _version(OWNER_VERSION_KEY.format(owner_id))
+
+
+def invalidate_owner(owner_id):
+    _bump(OWNER_VERSION_KEY.format(owner_id))
+
+
+def availability_version():
+    """Version des réservations, dates bloquées et plages (recherches par dates)."""
+    return _version(AVAILABILITY_VERSION_KEY)
+
+
+def invalidate_availability():
+    _bump(AVAILABILITY_VERSION_KEY)
+
+
+def calendar_version(property_id):
+    """Version du calendrier d'un bien (réservations, dates bloquées, plages)."""
+    return _version(CALENDAR_VERSION_KEY.format(property_id))
+
+
+def invalidate_calendar(property_id):
+    _bump(CALENDAR_VERSION_KEY.format(property_id))
+
+
+def tile_version(z, x, y):
+    """Version d'une tuile de carte : change quand un bien de la tuile est modifié."""
+    return _version(TILE_VERSION_KEY.format(z, x, y))
+
+
+def invalidate_tiles(points):
+    """
+    Invalide, à tous les niveaux de zoom, les tuiles contenant les points
+    (lat, lng) donnés. Les clés de version sont supprimées en un seul appel ;
+    `_version` repart ensuite d'une valeur jamais utilisée.
+    """
+    keys = {
+        TILE_VERSION_KEY.format(*tile_for(lat, lng, z))
+        for lat, lng in points
+        if lat is not None and lng is not None
+        for z in range(MAX_TILE_ZOOM + 1)
+    }
+    if keys:
+        cache.delete_many(list(keys))
+
+
+def cache_key(prefix, params, ignore=NON_FILTER_PARAMS, extra='', version=None):
+    """Clé versionnée (par défaut sur `listings_version`) : une écriture invalide les clés précédentes."""
+    raw = f'{extra}?{normalized_query(params, ignore)}'
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    if version is None:
+        version = listings_version()
+    return f'properties:{prefix}:v{version}:{digest}'
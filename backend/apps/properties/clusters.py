@@ -0,0 +1,53 @@
+from django.db.models import Avg, Count, F, FloatField, Max, Min, Value
+from django.db.models.functions import Cast, Floor
+from .geo import tile_bounds
+
+# Chaque tuile est découpée en GRID × GRID cellules ; une cellule = un cluster
+CLUSTER_GRID = 8
+
+
+def compute_clusters(qs, z, x, y):
+    """
+    Regroupe les biens de la tuile par cellule de grille en une seule requête
+    GROUP BY (filtrée sur l'index latitude/longitude) : centroïde, nombre de
+    biens et fourchette de prix par cluster, en euros (`price_eur`) pour ne
+    pas mêler les devises ; les biens sans taux de change n'y comptent pas.
+    """
+    south, west, north, east = tile_bounds(z, x, y)
+    cell_lat = (north - south) / CLUSTER_GRID
+    cell_lng = (east - west) / CLUSTER_GRID
+    lat = Cast(F('latitude'), FloatField())
+    lng = Cast(F('longitude'), FloatField())
+    rows = (
+        qs.order_by()
+        .filter(latitude__gte=south, latitude__lt=north, longitude__gte=west, longitude__lt=east)
+        .annotate(
+            cell_x=Floor((lng - Value(west)) / Value(cell_lng)),
+            cell_y=Floor((Value(north) - lat) / Value(cell_lat)),
+        )
+        .values('cell_x', 'cell_y')
+        .annotate(
+            count=Count('pk'),
+            center_lat=Avg(lat),
+            center_lng=Avg(lng),
+            min_price=Min('price_eur'),
+            max_price=Max('price_eur'),
+        )
+    )
+    clusters = [
+        {
+            'latitude': round(row['center_lat'], 6),
+            'longitude': round(row['center_lng'], 6),
+            'count': row['count'],
+            'min_price': row['min_price'],
+            'max_price': row['max_price'],
+        }
+        for row in rows
+    ]
+    clusters.sort(key=lambda c: -c['count'])
+    return {
+        'tile': {'z': z, 'x': x, 'y': y},
+        'bounds': {'south': south, 'west': west, 'north': north, 'east': east},
+        'count': sum(c['count'] for c in clusters),
+        'clusters': clusters,
+    }
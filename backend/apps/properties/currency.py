@@ -0,0 +1,50 @@
+from functools import reduce
+from operator import or_
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .cache import invalidate_listings, invalidate_owner, invalidate_tiles
+from .models import ExchangeRate, Property
+
+RECOMPUTE_BATCH_SIZE = 1000
+
+
+def recompute_price_eur(currencies=None, batch_size=RECOMPUTE_BATCH_SIZE):
+    """
+    Recalcule `price_eur`, et `price_per_sqm` qui en dérive, depuis les taux
+    courants, par lots (parcours par clé primaire, sans OFFSET), en n'écrivant
+    que les biens dont la valeur change.
+    `updated_at` est aussi touché : ETag du détail et index de similarité.
+    Renvoie le nombre de biens mis à jour.
+    """
+    rates = ExchangeRate.rates()
+    rows = Property.objects.only(
+        'pk', 'owner_id', 'price', 'currency', 'price_eur', 'surface_area', 'price_per_sqm',
+        'latitude', 'longitude',
+    ).order_by('pk')
+    if currencies:
+        rows = rows.filter(reduce(or_, (Q(currency__iexact=c) for c in currencies)))
+    updated, owners, last = 0, set(), None
+    while True:
+        batch = list((rows if last is None else rows.filter(pk__gt=last))[:batch_size])
+        if not batch:
+            break
+        now = timezone.now()
+        changed = []
+        for p in batch:
+            value = Property.compute_price_eur(p.price, rates.get(p.currency.upper()))
+            per_sqm = Property.compute_price_per_sqm(value, p.surface_area)
+            if value != p.price_eur or per_sqm != p.price_per_sqm:
+                p.price_eur, p.price_per_sqm, p.updated_at = value, per_sqm, now
+                changed.append(p)
+        with transaction.atomic():
+            Property.objects.bulk_update(changed, ['price_eur', 'price_per_sqm', 'updated_at'])
+        invalidate_tiles([(p.latitude, p.longitude) for p in changed])
+        owners.update(p.owner_id for p in changed)
+        updated += len(changed)
+        last = batch[-1].pk
+    if updated:
+        invalidate_listings()
+        for owner_id in owners:
+            invalidate_owner(owner_id)
+    return updated
@@ -0,0 +1,65 @@
+import csv
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_CHUNK_SIZE = 2000
+# Lignes regroupées par morceau envoyé au client (moins d'appels d'écriture)
+LINES_PER_WRITE = 200
+EXPORT_FIELDS = (
+    'id', 'title', 'description', 'property_type', 'transaction_type',
+    'price', 'currency', 'price_eur', 'address', 'city', 'country', 'postal_code',
+    'latitude', 'longitude', 'bedrooms', 'bathrooms', 'max_guests', 'surface_area',
+    'price_per_sqm', 'cover_image_url', 'created_at', 'updated_at',
+)
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class LineBuffer:
+    """Pseudo-fichier pour `csv.writer` : `write()` renvoie la ligne au lieu de la stocker."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Dicts `EXPORT_FIELDS` lus par morceaux (curseur serveur sur PostgreSQL) :
+    aucune instance de modèle ni résultat complet en mémoire.
+    """
+    return queryset.values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def _format_cell(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([_format_cell(row[field]) for field in EXPORT_FIELDS])
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def stream_export(queryset, output_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Produit l'export par morceaux de `LINES_PER_WRITE` lignes."""
+    lines = csv_lines if output_format == 'csv' else ndjson_lines
+    batch = []
+    for line in lines(export_rows(queryset, chunk_size)):
+        batch.append(line)
+        if len(batch) >= LINES_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
@@ -0,0 +1,81 @@
+from collections import defaultdict
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from .models import Property
+
+BEDROOM_BUCKETS = 5  # 0, 1, 2, 3, 4, 5+
+PRICE_EDGES = [1000, 2000, 5000, 100000, 250000, 500000, 1000000]
+TOP_CITIES = 20
+
+
+def _price_bucket():
+    # Tranches en euros ; sans taux de change connu, le bien n'est dans aucune
+    whens = [When(price_eur__lt=edge, then=Value(i)) for i, edge in enumerate(PRICE_EDGES)]
+    return Case(
+        When(price_eur__isnull=True, then=Value(-1)), *whens,
+        default=Value(len(PRICE_EDGES)), output_field=IntegerField(),
+    )
+
+
+def _bedroom_bucket():
+    return Case(
+        When(bedrooms__isnull=True, then=Value(-1)),
+        When(bedrooms__gte=BEDROOM_BUCKETS, then=Value(BEDROOM_BUCKETS)),
+        default=F('bedrooms'),
+        output_field=IntegerField(),
+    )
+
+
+def _price_label(index):
+    low = PRICE_EDGES[index - 1] if index > 0 else 0
+    high = PRICE_EDGES[index] if index < len(PRICE_EDGES) else None
+    return {'min': low, 'max': high}
+
+
+def compute_facets(qs):
+    """
+    Compte les biens par type, transaction, ville, tranche de chambres et de
+    prix en une seule requête groupée ; les totaux sont agrégés en Python.
+    """
+    rows = (
+        qs.order_by()
+        .annotate(bedroom_bucket=_bedroom_bucket(), price_bucket=_price_bucket())
+        .values('property_type', 'transaction_type', 'city', 'bedroom_bucket', 'price_bucket')
+        .annotate(n=Count('pk'))
+    )
+    totals = defaultdict(lambda: defaultdict(int))
+    count = 0
+    for row in rows:
+        count += row['n']
+        for dimension in ('property_type', 'transaction_type', 'city', 'bedroom_bucket', 'price_bucket'):
+            totals[dimension][row[dimension]] += row['n']
+
+    type_labels = dict(Property.PROPERTY_TYPES)
+    transaction_labels = dict(Property.TRANSACTION_TYPES)
+    cities = sorted(totals['city'].items(), key=lambda item: (-item[1], item[0]))[:TOP_CITIES]
+    return {
+        'count': count,
+        'property_type': [
+            {'value': value, 'label': type_labels.get(value, value), 'count': n}
+            for value, n in sorted(totals['property_type'].items(), key=lambda item: -item[1])
+        ],
+        'transaction_type': [
+            {'value': value, 'label': transaction_labels.get(value, value), 'count': n}
+            for value, n in sorted(totals['transaction_type'].items(), key=lambda item: -item[1])
+        ],
+        'city': [{'value': value, 'count': n} for value, n in cities],
+        'bedrooms': [
+            {
+                'value': None if bucket < 0 else bucket,
+                'label': 'Non renseigné' if bucket < 0 else (
+                    f'{bucket}+' if bucket == BEDROOM_BUCKETS else str(bucket)
+                ),
+                'count': n,
+            }
+            for bucket, n in sorted(totals['bedroom_bucket'].items())
+        ],
+        'price': [
+            {**_price_label(bucket), 'count': n}
+            for bucket, n in sorted(totals['price_bucket'].items())
+            if bucket >= 0
+        ],
+    }
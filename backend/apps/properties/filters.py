@@ -0,0 +1,40 @@
+from rest_framework.filters import OrderingFilter, SearchFilter
+from .search import search_properties, supports_full_text
+
+
+class PropertySearchFilter(SearchFilter):
+    """
+    Recherche plein texte classée par pertinence (voir `search.py`) ; sur une
+    base sans index, recherche `icontains` de DRF sur `search_fields`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not supports_full_text():
+            return super().filter_queryset(request, queryset, view)
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return search_properties(queryset, ' '.join(terms))
+
+
+class PropertyOrderingFilter(OrderingFilter):
+    """
+    Sans `?ordering=` explicite : tri par distance lors d'une recherche
+    géographique, sinon par pertinence lors d'une recherche plein texte.
+    `price` trie sur le prix converti en euros.
+    """
+    aliases = {'price': 'price_eur'}
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param):
+            if 'distance' in queryset.query.annotations:
+                return ['distance', '-created_at']
+            if 'search_rank' in queryset.query.extra_select:
+                return ['-search_rank', '-created_at']
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [
+            ('-' if term.startswith('-') else '') + self.aliases.get(term.lstrip('-'), term.lstrip('-'))
+            for term in ordering
+        ]
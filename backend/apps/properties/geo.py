@@ -0,0 +1,153 @@
+import math
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+from rest_framework.exceptions import ValidationError
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_RADIUS_KM = 500
+
+
+def bounding_box(lat, lng, radius_km):
+    """Rectangle (min_lat, min_lng, max_lat, max_lng) englobant le cercle de recherche."""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6:
+        delta_lng = 180.0
+    else:
+        delta_lng = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return (
+        max(-90.0, lat - delta_lat),
+        max(-180.0, lng - delta_lng),
+        min(90.0, lat + delta_lat),
+        min(180.0, lng + delta_lng),
+    )
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distance orthodromique en kilomètres entre deux points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_expression(lat, lng):
+    """Expression SQL (haversine) de la distance en km depuis (lat, lng)."""
+    row_lat = Radians(Cast(F('latitude'), FloatField()))
+    row_lng = Radians(Cast(F('longitude'), FloatField()))
+    lat_r = Value(math.radians(lat), output_field=FloatField())
+    lng_r = Value(math.radians(lng), output_field=FloatField())
+    a = (
+        Power(Sin((row_lat - lat_r) / 2), 2)
+        + Value(math.cos(math.radians(lat)), output_field=FloatField())
+        * Cos(row_lat) * Power(Sin((row_lng - lng_r) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM, output_field=FloatField()) * ASin(
+        Least(Sqrt(a), Value(1.0, output_field=FloatField()))
+    )
+
+
+def _parse_float(params, name, low, high):
+    try:
+        value = float(params[name])
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Valeur numérique attendue.'})
+    if not math.isfinite(value) or not low <= value <= high:
+        raise ValidationError({name: f'Doit être compris entre {low} et {high}.'})
+    return value
+
+
+def parse_bbox(value):
+    """Parse `min_lng,min_lat,max_lng,max_lat` (ordre GeoJSON)."""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in value.split(','))
+    except ValueError:
+        raise ValidationError({'bbox': 'Format attendu : min_lng,min_lat,max_lng,max_lat.'})
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValidationError({'bbox': 'Coordonnées hors limites ou inversées.'})
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def filter_by_location(qs, params):
+    """
+    Applique les filtres `?lat=&lng=&radius_km=` et `?bbox=`.
+
+    Le rectangle englobant est filtré sur l'index (latitude, longitude), puis
+    la distance exacte (haversine) n'est calculée que sur les candidats
+    restants. Le queryset est annoté avec `distance` (km).
+    """
+    has_point = 'lat' in params or 'lng' in params
+    bbox = params.get('bbox')
+    if not has_point and not bbox:
+        return qs
+
+    if bbox:
+        min_lat, min_lng, max_lat, max_lng = parse_bbox(bbox)
+    if has_point:
+        for name in ('lat', 'lng'):
+            if name not in params:
+                raise ValidationError({name: 'lat et lng doivent être fournis ensemble.'})
+        lat = _parse_float(params, 'lat', -90, 90)
+        lng = _parse_float(params, 'lng', -180, 180)
+    else:
+        lat, lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+
+    radius_km = None
+    if has_point and params.get('radius_km'):
+        radius_km = _parse_float(params, 'radius_km', 0, MAX_RADIUS_KM)
+        box = bounding_box(lat, lng, radius_km)
+        if bbox:
+            min_lat, min_lng = max(min_lat, box[0]), max(min_lng, box[1])
+            max_lat, max_lng = min(max_lat, box[2]), min(max_lng, box[3])
+        else:
+            min_lat, min_lng, max_lat, max_lng = box
+
+    if bbox or radius_km is not None:
+        qs = qs.filter(
+            latitude__gte=min_lat, latitude__lte=max_lat,
+            longitude__gte=min_lng, longitude__lte=max_lng,
+        )
+    else:
+        qs = qs.filter(latitude__isnull=False, longitude__isnull=False)
+
+    qs = qs.annotate(distance=distance_expression(lat, lng))
+    if radius_km is not None:
+        qs = qs.filter(distance__lte=radius_km)
+    return qs
+
+
+MAX_TILE_ZOOM = 18
+MERCATOR_MAX_LAT = 85.05112878
+
+
+def tile_bounds(z, x, y):
+    """Emprise (south, west, north, east) de la tuile XYZ (Web Mercator)."""
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+
+def tile_for(lat, lng, z):
+    """Tuile XYZ contenant le point au niveau de zoom `z`."""
+    n = 2 ** z
+    lat = max(-MERCATOR_MAX_LAT, min(MERCATOR_MAX_LAT, float(lat)))
+    x = int((float(lng) + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return z, min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def parse_tile(params):
+    """Lit `?z=&x=&y=` ; ValidationError si la tuile n'existe pas."""
+    try:
+        z, x, y = (int(params[name]) for name in ('z', 'x', 'y'))
+    except (KeyError, TypeError, ValueError):
+        raise ValidationError({'tile': 'Paramètres entiers z, x et y requis.'})
+    if not 0 <= z <= MAX_TILE_ZOOM:
+        raise ValidationError({'z': f'Doit être compris entre 0 et {MAX_TILE_ZOOM}.'})
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValidationError({'tile': 'Tuile hors limites pour ce niveau de zoom.'})
+    return z, x, y
@@ -0,0 +1,190 @@
+import io
+import logging
+import os
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+from .cache import invalidate_listings, invalidate_owner
+from .models import Property, PropertyImage
+
+logger = logging.getLogger(__name__)
+
+# Côté le plus long (px) de chaque variante générée
+VARIANT_SIZES = {
+    'thumbnail': 400,
+    'medium': 1024,
+}
+VARIANT_QUALITY = 85
+PROCESS_BATCH_SIZE = 20
+# Au-delà, une image `processing` est considérée abandonnée (worker arrêté)
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def lock_property(property_id):
+    """
+    Verrouille la ligne du bien (PostgreSQL) pour sérialiser ordre et
+    couverture ; renvoie l'id du propriétaire (None si le bien n'existe plus).
+    """
+    return Property.objects.select_for_update().filter(pk=property_id).values_list('owner_id', flat=True).first()
+
+
+def enqueue_images(property_obj, files):
+    """
+    Accepte des fichiers sans les traiter : copie locale et lignes `pending`.
+
+    Les positions suivent les images existantes ; elles sont attribuées sous
+    verrou pour que deux uploads simultanés ne produisent pas le même `order`.
+    """
+    with transaction.atomic():
+        lock_property(property_obj.pk)
+        last = property_obj.images.aggregate(last=Max('order'))['last']
+        start = 0 if last is None else last + 1
+        images = PropertyImage.objects.bulk_create([
+            PropertyImage(property=property_obj, source=f, status='pending', order=start + i)
+            for i, f in enumerate(files)
+        ])
+        transaction.on_commit(invalidate_listings)
+        transaction.on_commit(partial(invalidate_owner, property_obj.owner_id))
+        if settings.PROPERTY_IMAGES_EAGER:
+            ids = [image.pk for image in images]
+            transaction.on_commit(lambda: process_images(ids, limit=len(ids)))
+    return images
+
+
+def render_variants(data):
+    """Redimensionne l'original en JPEG pour chaque entrée de `VARIANT_SIZES`."""
+    with Image.open(io.BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original).convert('RGB')
+        variants = {}
+        for name, size in VARIANT_SIZES.items():
+            resized = original.copy()
+            resized.thumbnail((size, size))
+            buffer = io.BytesIO()
+            resized.save(buffer, 'JPEG', quality=VARIANT_QUALITY, optimize=True)
+            variants[name] = ContentFile(buffer.getvalue())
+    return variants
+
+
+def image_urls(image):
+    """URLs des variantes d'une image ; l'original sert de repli si une variante manque."""
+    full = image.image.url
+    return {
+        'full_url': full,
+        'medium_url': image.medium.url if image.medium else full,
+        'thumbnail_url': image.thumbnail.url if image.thumbnail else full,
+    }
+
+
+def refresh_cover(property_id, preferred=None):
+    """
+    Recalcule la couverture dénormalisée du bien : `preferred` si fournie,
+    sinon l'image prête marquée `is_cover`, sinon la première prête par ordre.
+    Un seul `is_cover` est conservé.
+    """
+    with transaction.atomic():
+        owner_id = lock_property(property_id)
+        ready = PropertyImage.objects.filter(property_id=property_id, status='ready')
+        cover = None
+        if preferred is not None and preferred.status == 'ready':
+            cover = preferred
+        if cover is None:
+            cover = ready.order_by('-is_cover', 'order', 'pk').only('pk', 'medium_url').first()
+        covers = PropertyImage.objects.filter(property_id=property_id, is_cover=True)
+        if cover is not None:
+            covers = covers.exclude(pk=cover.pk)
+            PropertyImage.objects.filter(pk=cover.pk, is_cover=False).update(is_cover=True)
+        covers.update(is_cover=False)
+        # `updated_at` sert aussi de marqueur de changement des images (ETag)
+        Property.objects.filter(pk=property_id).update(
+            cover_image=cover, cover_image_url=cover.medium_url if cover else '',
+            updated_at=timezone.now(),
+        )
+        transaction.on_commit(invalidate_listings)
+        if owner_id is not None:
+            transaction.on_commit(partial(invalidate_owner, owner_id))
+    return cover
+
+
+def reorder_images(property_obj, ids, cover_id=None):
+    """Applique un nouvel ordre (liste d'ids) et, éventuellement, une nouvelle couverture."""
+    with transaction.atomic():
+        lock_property(property_obj.pk)
+        images = {image.pk: image for image in property_obj.images.all()}
+        position = {pk: i for i, pk in enumerate(ids)}
+        # Les images absentes de la liste gardent leur ordre relatif, à la suite
+        rest = sorted((image for pk, image in images.items() if pk not in position), key=lambda i: (i.order, i.pk))
+        for offset, image in enumerate(rest, start=len(position)):
+            position[image.pk] = offset
+        for pk, image in images.items():
+            image.order = position[pk]
+        PropertyImage.objects.bulk_update(images.values(), ['order'])
+        return refresh_cover(property_obj.pk, preferred=images.get(cover_id))
+
+
+def claim_pending(limit=PROCESS_BATCH_SIZE, ids=None):
+    """
+    Réserve des images en attente pour ce worker (`pending` -> `processing`),
+    ainsi que celles réservées depuis plus de `CLAIM_TIMEOUT` par un worker
+    arrêté avant la fin. `skip_locked` laisse plusieurs workers travailler
+    en parallèle sur PostgreSQL.
+    """
+    now = timezone.now()
+    claimable = Q(status='pending') | Q(status='processing') & (
+        Q(claimed_at__lt=now - CLAIM_TIMEOUT) | Q(claimed_at__isnull=True)
+    )
+    with transaction.atomic():
+        qs = PropertyImage.objects.filter(claimable)
+        if ids is not None:
+            qs = qs.filter(pk__in=ids)
+        claimed = list(
+            qs.order_by('uploaded_at', 'order', 'pk')
+            .select_for_update(skip_locked=True)
+            .values_list('pk', flat=True)[:limit]
+        )
+        PropertyImage.objects.filter(claimable, pk__in=claimed).update(status='processing', claimed_at=now)
+    return claimed
+
+
+def process_image(image):
+    """
+    Stocke l'original et ses variantes avec leurs URLs, puis marque l'image
+    prête ; la couverture du bien est recalculée par le signal `post_save`.
+    """
+    staged = image.source.name
+    try:
+        with image.source.open('rb') as fh:
+            data = fh.read()
+        variants = render_variants(data)
+        name = os.path.basename(staged)
+        stem = os.path.splitext(name)[0]
+        image.image.save(name, ContentFile(data), save=False)
+        for field, content in variants.items():
+            getattr(image, field).save(f'{stem}_{field}.jpg', content, save=False)
+    except Exception as exc:
+        logger.exception("Échec du traitement de l'image %s", image.pk)
+        image.status = 'failed'
+        image.error = str(exc)[:255]
+        image.save(update_fields=['status', 'error'])
+        return image
+
+    for field, url in image_urls(image).items():
+        setattr(image, field, url)
+    image.status = 'ready'
+    image.error = ''
+    image.source = ''
+    image.save()
+    image.source.storage.delete(staged)
+    return image
+
+
+def process_images(ids=None, limit=PROCESS_BATCH_SIZE):
+    """Traite un lot d'images en attente ; renvoie le nombre d'images traitées."""
+    claimed = claim_pending(limit, ids)
+    for image in PropertyImage.objects.filter(pk__in=claimed).order_by('order', 'pk'):
+        process_image(image)
+    return len(claimed)
@@ -0,0 +1,130 @@
+import csv
+import json
+from django.db import transaction
+from django.utils import timezone
+from .models import ExchangeRate, Property, PropertyImport
+from .serializers import PropertyCreateSerializer
+from .signals import sync_bulk_created
+
+IMPORT_CHUNK_SIZE = 500
+MAX_STORED_ERRORS = 1000
+
+
+class ImportFileError(Exception):
+    """Fichier illisible (encodage, CSV mal formé) : l'import `job` est marqué en échec."""
+
+    def __init__(self, message, job):
+        super().__init__(message)
+        self.job = job
+
+
+def iter_rows(stream, input_format):
+    """
+    Lit un flux texte ligne à ligne, sans le charger en mémoire.
+
+    Produit des dicts ; une ligne NDJSON illisible produit une chaîne
+    d'erreur à la place.
+    """
+    if input_format == 'csv':
+        for row in csv.DictReader(stream):
+            # Cellule vide = champ absent (valeur par défaut / null)
+            yield {key: value for key, value in row.items() if key and value not in ('', None)}
+    elif input_format == 'ndjson':
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield 'JSON invalide'
+                continue
+            yield row if isinstance(row, dict) else 'Objet JSON attendu'
+    else:
+        raise ValueError(f'Format non supporté : {input_format}')
+
+
+class PropertyImporter:
+    """
+    Valide chaque ligne avec `PropertyCreateSerializer` et écrit les biens par
+    lots (`bulk_create`). Chaque lot et le point de reprise de l'import sont
+    enregistrés dans la même transaction : après un arrêt brutal, relancer le
+    même import reprend après la dernière ligne validée.
+    """
+
+    def __init__(self, job, chunk_size=IMPORT_CHUNK_SIZE):
+        self.job = job
+        self.chunk_size = chunk_size
+        self.rates = ExchangeRate.rates()
+
+    def run(self, rows):
+        job = self.job
+        resume_after = job.rows_processed
+        pending, errors, number = [], [], resume_after
+        job.status = 'running'
+        job.save(update_fields=['status', 'updated_at'])
+        try:
+            for number, row in enumerate(rows, start=1):
+                if number <= resume_after:
+                    continue
+                instance, row_errors = self.build(row)
+                if instance is not None:
+                    pending.append(instance)
+                else:
+                    errors.append({'row': number, 'errors': row_errors})
+                if number - job.rows_processed >= self.chunk_size:
+                    self.flush(pending, errors, number)
+                    pending, errors = [], []
+            self.flush(pending, errors, number)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            message = (
+                'Fichier illisible : encodage UTF-8 attendu' if isinstance(exc, UnicodeDecodeError)
+                else f'CSV invalide : {exc}'
+            )
+            # Les lignes lues avant l'erreur sont conservées (point de reprise)
+            self.flush(pending, errors + [{'row': number + 1, 'errors': {'non_field_errors': [message]}}], number)
+            job.status = 'failed'
+            job.save(update_fields=['status', 'updated_at'])
+            raise ImportFileError(message, job)
+        except Exception:
+            job.status = 'failed'
+            job.save(update_fields=['status', 'updated_at'])
+            raise
+        job.status = 'completed'
+        job.save(update_fields=['status', 'updated_at'])
+        return job
+
+    def build(self, row):
+        if not isinstance(row, dict):
+            return None, {'non_field_errors': [row]}
+        serializer = PropertyCreateSerializer(data=row)
+        if not serializer.is_valid():
+            return None, json.loads(json.dumps(serializer.errors))
+        instance = Property(owner=self.job.owner, **serializer.validated_data)
+        # `bulk_create` n'appelle pas `save()`
+        instance.price_eur = Property.compute_price_eur(instance.price, self.rates.get(instance.currency.upper()))
+        instance.price_per_sqm = Property.compute_price_per_sqm(instance.price_eur, instance.surface_area)
+        if instance.is_published:
+            instance.published_at = timezone.now()
+        return instance, None
+
+    def flush(self, pending, errors, number):
+        job = self.job
+        with transaction.atomic():
+            created = Property.objects.bulk_create(pending)
+            job.rows_processed = number
+            job.created_count += len(created)
+            job.error_count += len(errors)
+            room = MAX_STORED_ERRORS - len(job.errors)
+            if room > 0:
+                job.errors = job.errors + errors[:room]
+            job.save(update_fields=[
+                'rows_processed', 'created_count', 'error_count', 'errors', 'updated_at',
+            ])
+            sync_bulk_created(created)
+
+
+def run_import(owner, stream, input_format, source_name='', job=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Démarre (ou reprend, si `job` est fourni) un import depuis un flux texte."""
+    if job is None:
+        job = PropertyImport.objects.create(owner=owner, input_format=input_format, source_name=source_name)
+    return PropertyImporter(job, chunk_size).run(iter_rows(stream, job.input_format))
@@ -0,0 +1,29 @@
+import sys
+from django.core.management.base import BaseCommand
+from apps.properties.exports import EXPORT_CHUNK_SIZE, stream_export
+from apps.properties.models import Property
+
+
+class Command(BaseCommand):
+    help = 'Exporte les biens publiés en CSV ou NDJSON, en flux (mémoire constante)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Fichier de sortie ('-' pour la sortie standard)")
+        parser.add_argument('--output-format', choices=['csv', 'ndjson'])
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument('--all', action='store_true', help='Inclut les biens non publiés')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        output_format = options['output_format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        queryset = Property.objects.order_by('created_at', 'id')
+        if not options['all']:
+            queryset = queryset.filter(is_published=True)
+
+        stream = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            for chunk in stream_export(queryset, output_format, options['chunk_size']):
+                stream.write(chunk)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
@@ -0,0 +1,53 @@
+import sys
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from apps.properties.imports import IMPORT_CHUNK_SIZE, ImportFileError, run_import
+from apps.properties.models import PropertyImport
+
+
+class Command(BaseCommand):
+    help = 'Importe des biens en masse depuis un fichier CSV ou NDJSON (reprenable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier à importer ('-' pour l'entrée standard)")
+        parser.add_argument('--owner', help="Nom d'utilisateur propriétaire des biens")
+        parser.add_argument('--input-format', choices=['csv', 'ndjson'])
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument('--resume', metavar='IMPORT_ID', help="Reprend un import interrompu")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        job = None
+        if options['resume']:
+            try:
+                job = PropertyImport.objects.get(pk=options['resume'])
+            except (PropertyImport.DoesNotExist, ValueError):
+                raise CommandError('Import introuvable')
+            owner, input_format = job.owner, job.input_format
+        else:
+            if not options['owner']:
+                raise CommandError('--owner est requis pour un nouvel import')
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError('Utilisateur introuvable')
+            input_format = options['input_format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            job = run_import(
+                owner, stream, input_format, source_name=path, job=job,
+                chunk_size=options['chunk_size'],
+            )
+        except ImportFileError as exc:
+            raise CommandError(f'Import {exc.job.id} : {exc}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Import {job.id} : {job.created_count} bien(s) créé(s), '
+            f'{job.error_count} ligne(s) en erreur sur {job.rows_processed}'
+        ))
+        for error in job.errors[:20]:
+            self.stdout.write(f"  ligne {error['row']} : {error['errors']}")
@@ -0,0 +1,24 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.properties.images import PROCESS_BATCH_SIZE, process_images
+
+
+class Command(BaseCommand):
+    help = 'Traite les images de biens en attente (original, variantes, couverture)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PROCESS_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Tourne en continu (worker)')
+        parser.add_argument('--interval', type=float, default=2.0, help='Pause (s) quand la file est vide')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            count = process_images(limit=options['batch_size'])
+            total += count
+            if count:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'{total} image(s) traitée(s)'))
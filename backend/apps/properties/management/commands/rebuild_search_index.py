@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.properties import search
+from apps.properties.models import Property
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index plein texte des biens"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = search.rebuild_index(Property.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{count} bien(s) indexé(s)'))
@@ -0,0 +1,32 @@
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from apps.properties.currency import RECOMPUTE_BATCH_SIZE, recompute_price_eur
+from apps.properties.models import ExchangeRate
+
+
+class Command(BaseCommand):
+    help = "Recalcule le prix en euros des biens après un changement de taux de change"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rate', action='append', default=[], metavar='DEVISE=TAUX',
+            help="Enregistre un taux (valeur en euros d'une unité) avant le recalcul",
+        )
+        parser.add_argument('--currency', action='append', default=[], help='Limite le recalcul à cette devise')
+        parser.add_argument('--batch-size', type=int, default=RECOMPUTE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        currencies = [c.upper() for c in options['currency']]
+        for item in options['rate']:
+            currency, _, value = item.partition('=')
+            try:
+                rate = Decimal(value)
+            except InvalidOperation:
+                raise CommandError(f'Taux invalide : {item}')
+            if rate <= 0 or len(currency) != 3:
+                raise CommandError(f'Taux invalide : {item}')
+            ExchangeRate.objects.update_or_create(currency=currency.upper(), defaults={'rate': rate})
+            currencies.append(currency.upper())
+
+        count = recompute_price_eur(currencies or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{count} bien(s) mis à jour'))
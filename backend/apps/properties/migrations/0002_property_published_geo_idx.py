@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['latitude', 'longitude'], name='property_published_geo_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+import unicodedata
+from django.db import migrations
+
+# Copie figée de `apps.properties.search` à la date de la migration : les
+# évolutions du module ne doivent pas changer ce que fait cette migration.
+SEARCH_TABLE = 'properties_property_search'
+
+
+def fold(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def document(p):
+    return (
+        fold(p.title),
+        fold(' '.join(filter(None, [p.city, p.postal_code, p.address]))),
+        fold(p.description),
+    )
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE TABLE {SEARCH_TABLE} ('
+            ' property_id uuid PRIMARY KEY REFERENCES properties_property (id)'
+            ' ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,'
+            ' document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {SEARCH_TABLE}_document_gin ON {SEARCH_TABLE} USING GIN (document)'
+        )
+        insert = (
+            f'INSERT INTO {SEARCH_TABLE} (property_id, document) VALUES (%s, '
+            " setweight(to_tsvector('french', %s), 'A')"
+            " || setweight(to_tsvector('french', %s), 'B')"
+            " || setweight(to_tsvector('french', %s), 'C'))"
+        )
+        rows = lambda p: (p.id, *document(p))
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5('
+            " property_id UNINDEXED, title, location, description,"
+            " tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        insert = (
+            f'INSERT INTO {SEARCH_TABLE} (rowid, property_id, title, location, description)'
+            ' VALUES (%s, %s, %s, %s, %s)'
+        )
+        rows = lambda p: (p.id.int & 0x7FFFFFFFFFFFFFFF, p.id.hex, *document(p))
+    else:
+        return
+
+    Property = apps.get_model('properties', 'Property')
+    properties = Property.objects.only('id', 'title', 'city', 'postal_code', 'address', 'description')
+    batch = []
+    with schema_editor.connection.cursor() as cursor:
+        for p in properties.iterator(chunk_size=1000):
+            batch.append(rows(p))
+            if len(batch) >= 1000:
+                cursor.executemany(insert, batch)
+                batch = []
+        if batch:
+            cursor.executemany(insert, batch)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0002_property_published_geo_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:44
+
+import apps.properties.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0005_propertyimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyimage',
+            name='error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='medium',
+            field=models.ImageField(blank=True, upload_to='properties/medium/'),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='source',
+            field=models.FileField(blank=True, storage=apps.properties.storage.staging_storage, upload_to='pending/'),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('processing', 'En cours de traitement'), ('ready', 'Prête'), ('failed', 'Échouée')], db_index=True, default='ready', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='properties/thumbnails/'),
+        ),
+        migrations.AlterField(
+            model_name='propertyimage',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='properties/'),
+        ),
+    ]
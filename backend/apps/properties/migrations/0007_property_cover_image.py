@@ -0,0 +1,84 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def image_urls(image):
+    # Copie figée de `images.image_urls`
+    full = image.image.url
+    return {
+        'full_url': full,
+        'medium_url': image.medium.url if image.medium else full,
+        'thumbnail_url': image.thumbnail.url if image.thumbnail else full,
+    }
+
+
+def backfill_image_urls(apps, schema_editor):
+    """Calcule les URLs des images existantes et la couverture de chaque bien."""
+    Property = apps.get_model('properties', 'Property')
+    PropertyImage = apps.get_model('properties', 'PropertyImage')
+    images = (
+        PropertyImage.objects.filter(status='ready').exclude(image='')
+        .order_by('property_id', '-is_cover', 'order', 'pk')
+    )
+    covers, batch = {}, []
+    for image in images.iterator(chunk_size=BATCH_SIZE):
+        for field, url in image_urls(image).items():
+            setattr(image, field, url)
+        batch.append(image)
+        covers.setdefault(image.property_id, image)
+        if len(batch) >= BATCH_SIZE:
+            PropertyImage.objects.bulk_update(batch, ['full_url', 'medium_url', 'thumbnail_url'])
+            batch = []
+    PropertyImage.objects.bulk_update(batch, ['full_url', 'medium_url', 'thumbnail_url'])
+
+    cover_ids = [image.pk for image in covers.values()]
+    PropertyImage.objects.filter(is_cover=True).exclude(pk__in=cover_ids).update(is_cover=False)
+    PropertyImage.objects.filter(pk__in=cover_ids).update(is_cover=True)
+    Property.objects.bulk_update(
+        [
+            Property(pk=property_id, cover_image_id=image.pk, cover_image_url=image.medium_url)
+            for property_id, image in covers.items()
+        ],
+        ['cover_image', 'cover_image_url'],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_propertyimage_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='cover_image',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='properties.propertyimage'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='cover_image_url',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='full_url',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='medium_url',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='thumbnail_url',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.RunPython(backfill_image_urls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-18 00:48
+
+from decimal import ROUND_HALF_UP, Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def price_per_sqm(price, surface_area):
+    # Copie figée de `Property.compute_price_per_sqm` à cette étape (prix local)
+    if price is None or not surface_area or surface_area <= 0:
+        return None
+    return (Decimal(price) / Decimal(surface_area)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def backfill_price_per_sqm(apps, schema_editor):
+    """Remplit `price_per_sqm` par lots (parcours par clé primaire, sans OFFSET)."""
+    Property = apps.get_model('properties', 'Property')
+    rows = Property.objects.filter(surface_area__gt=0).only('pk', 'price', 'surface_area').order_by('pk')
+    last = None
+    while True:
+        batch = list((rows if last is None else rows.filter(pk__gt=last))[:BATCH_SIZE])
+        if not batch:
+            break
+        for row in batch:
+            row.price_per_sqm = price_per_sqm(row.price, row.surface_area)
+        Property.objects.bulk_update(batch, ['price_per_sqm'])
+        last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0008_property_published_owner_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='price_per_sqm',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.RunPython(backfill_price_per_sqm, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['price_per_sqm', 'id'], name='property_published_ppsqm_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:01
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+BATCH_SIZE = 1000
+
+
+def backfill_price_eur(apps, schema_editor):
+    """
+    Aucun taux n'existe encore : seuls les biens en euros ont un prix converti.
+    Mise à jour par lots de clés primaires (parcours par clé, sans OFFSET).
+    """
+    Property = apps.get_model('properties', 'Property')
+    rows = Property.objects.filter(currency__iexact='EUR').order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        batch = list((rows if last is None else rows.filter(pk__gt=last))[:BATCH_SIZE])
+        if not batch:
+            break
+        Property.objects.filter(pk__in=batch).update(price_eur=F('price'))
+        last = batch[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0010_property_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3, unique=True)),
+                ('rate', models.DecimalField(decimal_places=8, help_text="Valeur en euros d'une unité", max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['currency'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='property',
+            name='property_published_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='property',
+            name='property_published_txn_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='property',
+            name='property_published_city_idx',
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='price_eur',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.RunPython(backfill_price_eur, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['price_eur', 'id'], name='property_published_eur_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['transaction_type', 'price_eur'], name='property_pub_txn_eur_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['city', 'transaction_type', 'price_eur'], name='property_pub_city_eur_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0011_price_eur'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='max_guests',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Vide = sans limite', null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:40
+
+from decimal import ROUND_HALF_UP, Decimal
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def price_per_sqm(price_eur, surface_area):
+    # Copie figée de `Property.compute_price_per_sqm`
+    if price_eur is None or not surface_area or surface_area <= 0:
+        return None
+    return (Decimal(price_eur) / Decimal(surface_area)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def recompute_price_per_sqm(apps, schema_editor):
+    """Recalcule `price_per_sqm` depuis `price_eur`, par lots (parcours par clé primaire, sans OFFSET)."""
+    Property = apps.get_model('properties', 'Property')
+    rows = Property.objects.only('pk', 'price_eur', 'surface_area', 'price_per_sqm').order_by('pk')
+    last = None
+    while True:
+        batch = list((rows if last is None else rows.filter(pk__gt=last))[:BATCH_SIZE])
+        if not batch:
+            break
+        changed = []
+        for row in batch:
+            value = price_per_sqm(row.price_eur, row.surface_area)
+            if value != row.price_per_sqm:
+                row.price_per_sqm = value
+                changed.append(row)
+        Property.objects.bulk_update(changed, ['price_per_sqm'])
+        last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0013_propertyimage_claimed_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_price_per_sqm, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:20
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_published_at(apps, schema_editor):
+    """Biens déjà publiés : la date de création tient lieu de date de publication."""
+    Property = apps.get_model('properties', 'Property')
+    Property.objects.filter(is_published=True, published_at__isnull=True).update(published_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0014_price_per_sqm_from_eur'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='published_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_published_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(
+                condition=models.Q(('is_published', True)), fields=['published_at', 'id'],
+                name='property_published_at_idx',
+            ),
+        ),
+    ]
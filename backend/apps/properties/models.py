@@ -1,6 +1,9 @@
 import uuid
+from decimal import ROUND_HALF_UP, Decimal
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .storage import staging_storage
 
 
 class Property(models.Model):
@@ -25,6 +28,9 @@ class Property(models.Model):
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPES, default='rent')
     price = models.DecimalField(max_digits=12, decimal_places=2)
     currency = models.CharField(max_length=3, default='EUR')
+    # Prix converti via `ExchangeRate` (voir `save` et `recompute_price_eur`) ;
+    # NULL si la devise n'a pas de taux : exclu des filtres de prix
+    price_eur = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, editable=False)
     address = models.CharField(max_length=300)
     city = models.CharField(max_length=100)
     country = models.CharField(max_length=100, default='France')
@@ -33,21 +39,152 @@ class Property(models.Model):
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     bedrooms = models.IntegerField(null=True, blank=True)
     bathrooms = models.IntegerField(null=True, blank=True)
+    max_guests = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Vide = sans limite")
     surface_area = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Dénormalisé depuis price_eur / surface_area (voir `save`) : comparable
+    # d'une devise à l'autre, NULL comme price_eur si la devise n'a pas de taux
+    price_per_sqm = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
     is_published = models.BooleanField(default=False)
+    # Première publication (voir `save`) : point de reprise des alertes
+    published_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Couverture dénormalisée (maintenue par `images.refresh_cover`)
+    cover_image = models.ForeignKey(
+        'PropertyImage', on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+    )
+    cover_image_url = models.CharField(max_length=500, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Index partiels : la recherche publique ne porte que sur les biens publiés
+            models.Index(
+                fields=['created_at', 'id'], name='property_published_recent_idx',
+                condition=models.Q(is_published=True),
+            ),
+            models.Index(
+                fields=['price_eur', 'id'], name='property_published_eur_idx',
+                condition=models.Q(is_published=True),
+            ),
+            models.Index(
+                fields=['transaction_type', 'price_eur'], name='property_pub_txn_eur_idx',
+                condition=models.Q(is_published=True),
+            ),
+            models.Index(
+                fields=['city', 'transaction_type', 'price_eur'], name='property_pub_city_eur_idx',
+                condition=models.Q(is_published=True),
+            ),
+            models.Index(
+                fields=['latitude', 'longitude'], name='property_published_geo_idx',
+                condition=models.Q(is_published=True),
+            ),
+            models.Index(
+                fields=['owner', 'created_at'], name='property_published_owner_idx',
+                condition=models.Q(is_published=True),
+            ),
+            models.Index(
+                fields=['price_per_sqm', 'id'], name='property_published_ppsqm_idx',
+                condition=models.Q(is_published=True),
+            ),
+            # Rattrapage incrémental de l'index de similarité
+            models.Index(fields=['updated_at'], name='property_updated_idx'),
+            # Parcours du matcher des recherches enregistrées
+            models.Index(
+                fields=['published_at', 'id'], name='property_published_at_idx',
+                condition=models.Q(is_published=True),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.city}"
 
+    @staticmethod
+    def compute_price_per_sqm(price, surface_area):
+        """`price` : prix converti en euros (`price_eur`)."""
+        if price is None or not surface_area or surface_area <= 0:
+            return None
+        return (Decimal(price) / Decimal(surface_area)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    @staticmethod
+    def compute_price_eur(price, rate):
+        """`rate` : valeur en euros d'une unité de la devise (None si inconnue)."""
+        if price is None or rate is None:
+            return None
+        return (Decimal(price) * Decimal(rate)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    def save(self, *args, **kwargs):
+        self.price_eur = self.compute_price_eur(self.price, ExchangeRate.rate_for(self.currency))
+        self.price_per_sqm = self.compute_price_per_sqm(self.price_eur, self.surface_area)
+        if self.is_published and self.published_at is None:
+            self.published_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derived = set()
+            if 'is_published' in set(update_fields):
+                derived.add('published_at')
+            if {'price', 'currency'} & set(update_fields):
+                derived.update({'price_eur', 'price_per_sqm'})
+            if 'surface_area' in set(update_fields):
+                derived.add('price_per_sqm')
+            if derived:
+                kwargs['update_fields'] = {*update_fields, *derived}
+        super().save(*args, **kwargs)
+
+
+class ExchangeRate(models.Model):
+    """Taux de conversion vers l'euro, tenus localement (voir `recompute_price_eur`)."""
+    BASE_CURRENCY = 'EUR'
+
+    currency = models.CharField(max_length=3, unique=True)
+    rate = models.DecimalField(max_digits=18, decimal_places=8, help_text="Valeur en euros d'une unité")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['currency']
+
+    def __str__(self):
+        return f"1 {self.currency} = {self.rate} {self.BASE_CURRENCY}"
+
+    def save(self, *args, **kwargs):
+        self.currency = self.currency.upper()
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def rate_for(cls, currency):
+        currency = (currency or '').upper()
+        if currency == cls.BASE_CURRENCY:
+            return Decimal(1)
+        return cls.objects.filter(currency=currency).values_list('rate', flat=True).first()
+
+    @classmethod
+    def rates(cls):
+        """Tous les taux connus, devise de base comprise."""
+        return {cls.BASE_CURRENCY: Decimal(1), **dict(cls.objects.values_list('currency', 'rate'))}
+
 
 class PropertyImage(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('processing', 'En cours de traitement'),
+        ('ready', 'Prête'),
+        ('failed', 'Échouée'),
+    ]
+
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='properties/')
+    image = models.ImageField(upload_to='properties/', blank=True)
+    thumbnail = models.ImageField(upload_to='properties/thumbnails/', blank=True)
+    medium = models.ImageField(upload_to='properties/medium/', blank=True)
+    # Fichier reçu, conservé localement jusqu'au traitement
+    source = models.FileField(upload_to='pending/', storage=staging_storage, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ready', db_index=True)
+    # Prise en charge par un worker ; passé `CLAIM_TIMEOUT`, l'image est reprise
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    # URLs calculées au traitement : les sérialiseurs n'interrogent pas le stockage
+    full_url = models.CharField(max_length=500, blank=True)
+    thumbnail_url = models.CharField(max_length=500, blank=True)
+    medium_url = models.CharField(max_length=500, blank=True)
     is_cover = models.BooleanField(default=False)
     order = models.IntegerField(default=0)
     uploaded_at = models.DateTimeField(auto_now_add=True)
@@ -57,3 +194,34 @@ class PropertyImage(models.Model):
 
     def __str__(self):
         return f"Image de {self.property.title}"
+
+
+class PropertyImport(models.Model):
+    """Import en masse de biens (CSV / NDJSON), reprenable depuis `rows_processed`."""
+    STATUS_CHOICES = [
+        ('running', 'En cours'),
+        ('completed', 'Terminé'),
+        ('failed', 'Échoué'),
+    ]
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='property_imports')
+    source_name = models.CharField(max_length=255, blank=True)
+    input_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    rows_processed = models.IntegerField(default=0, help_text="Dernière ligne validée (point de reprise)")
+    created_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Import {self.source_name or self.id} ({self.get_status_display()})"
@@ -0,0 +1,144 @@
+import base64
+import binascii
+import datetime
+import json
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class PropertyPagination(PageNumberPagination):
+    """
+    Pagination par numéro de page (défaut) ou par curseur.
+
+    Le mode curseur (`?pagination=cursor`, puis `?cursor=<jeton>`) est une
+    pagination par clé : la page suivante est obtenue par
+    `WHERE (clé, id) > (dernière clé, dernier id)` sur le tri courant
+    (`created_at`, `price`, `surface_area`...), sans `COUNT(*)` ni `OFFSET`.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    invalid_cursor_message = 'Curseur invalide.'
+    unsupported_key_message = (
+        'Pagination par curseur indisponible pour un tri par pertinence : '
+        'préciser `ordering` ou utiliser la pagination par page.'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        field, descending = self.get_key(request, queryset, view)
+        if field in queryset.query.extra_select:
+            # Colonne `.extra()` (rang plein texte) : ni filtrable ni encodable
+            raise ParseError(self.unsupported_key_message)
+        self.key = ('-' if descending else '') + field
+
+        nullable = self.is_nullable(queryset, field)
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            position = self.decode_cursor(token)
+            if position['k'] != self.key:
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                queryset = queryset.filter(
+                    self.after(field, descending, position['v'], position['id'], nullable)
+                )
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        if nullable:
+            key = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+        else:
+            # Tri simple : reste servi par les index (clé, id)
+            key = self.key
+        queryset = queryset.order_by(key, '-pk' if descending else 'pk')
+
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        results = results[:page_size]
+        self.last = results[-1] if results else None
+        self.field = field
+        return results
+
+    def get_key(self, request, queryset, view):
+        """Premier critère du tri demandé (via le filtre d'ordre de la vue)."""
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = ordering or getattr(view, 'ordering', None) or ['-created_at']
+        key = ordering[0] if isinstance(ordering, (list, tuple)) else ordering
+        return key.lstrip('-'), key.startswith('-')
+
+    @staticmethod
+    def is_nullable(queryset, field):
+        if field in queryset.query.annotations:
+            return False
+        return queryset.model._meta.get_field(field).null
+
+    @staticmethod
+    def after(field, descending, value, pk, nullable=True):
+        """Condition « strictement après (value, pk) » ; les NULL sont triés en dernier."""
+        op = 'lt' if descending else 'gt'
+        if value is None:
+            return Q(**{f'{field}__isnull': True, f'pk__{op}': pk})
+        condition = Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'pk__{op}': pk})
+        if nullable:
+            condition |= Q(**{f'{field}__isnull': True})
+        return condition
+
+    def encode_cursor(self, obj):
+        position = {'k': self.key, 'v': _encode_value(getattr(obj, self.field)), 'id': str(obj.pk)}
+        raw = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            position = json.loads(raw)
+            if not isinstance(position, dict) or not {'k', 'v', 'id'} <= position.keys():
+                raise ValueError
+        except (binascii.Error, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_html_context(self):
+        if not self.cursor_mode:
+            return super().get_html_context()
+        return {'previous_url': None, 'next_url': self.get_next_link()}
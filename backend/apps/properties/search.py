@@ -0,0 +1,127 @@
+"""
+Index plein texte des biens.
+
+PostgreSQL : table `properties_property_search` (tsvector + index GIN,
+configuration `french`). SQLite (USE_SQLITE) : table virtuelle FTS5 du même
+nom. Le texte est normalisé (minuscules, accents retirés) avant indexation et
+avant recherche, ce qui rend la recherche insensible aux accents. La table
+est créée par la migration 0003 (qui garde sa propre copie du DDL).
+"""
+import unicodedata
+from django.db import connection
+
+SEARCH_TABLE = 'properties_property_search'
+
+# Poids par colonne : titre > localisation > description
+FTS5_WEIGHTS = (0.0, 10.0, 4.0, 1.0)
+INDEX_FIELDS = ('id', 'title', 'city', 'postal_code', 'address', 'description')
+
+
+def fold(text):
+    """Minuscules sans accents : 'Élégant Château' -> 'elegant chateau'."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def _document(row):
+    return (
+        fold(row['title']),
+        fold(' '.join(filter(None, [row['city'], row['postal_code'], row['address']]))),
+        fold(row['description']),
+    )
+
+
+def _rowid(pk):
+    # FTS5 exige un rowid entier : dérivé de l'UUID du bien
+    return pk.int & 0x7FFFFFFFFFFFFFFF
+
+
+def index_rows(rows):
+    """Indexe (ou réindexe) des biens donnés sous forme de dicts `INDEX_FIELDS`."""
+    rows = list(rows)
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (property_id, document) VALUES (%s, '
+                " setweight(to_tsvector('french', %s), 'A')"
+                " || setweight(to_tsvector('french', %s), 'B')"
+                " || setweight(to_tsvector('french', %s), 'C'))"
+                ' ON CONFLICT (property_id) DO UPDATE SET document = EXCLUDED.document',
+                [(row['id'], *_document(row)) for row in rows],
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.executemany(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                [(_rowid(row['id']),) for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, property_id, title, location, description)'
+                ' VALUES (%s, %s, %s, %s, %s)',
+                [(_rowid(row['id']), row['id'].hex, *_document(row)) for row in rows],
+            )
+
+
+def index_properties(properties):
+    index_rows({field: getattr(p, field) for field in INDEX_FIELDS} for p in properties)
+
+
+def unindex_property(pk):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE property_id = %s', [pk])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [_rowid(pk)])
+
+
+def rebuild_index(queryset, batch_size=1000):
+    """Réindexe tout le queryset par lots ; retourne le nombre de biens indexés."""
+    batch, count = [], 0
+    for row in queryset.values(*INDEX_FIELDS).iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            index_rows(batch)
+            count += len(batch)
+            batch = []
+    index_rows(batch)
+    return count + len(batch)
+
+
+def _fts5_query(terms):
+    # Chaque terme devient une chaîne FTS5 littérale (pas d'opérateurs utilisateur)
+    return ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+
+
+def supports_full_text():
+    """Index disponible sur cette base (sinon : recherche `icontains` de DRF)."""
+    return connection.vendor in ('postgresql', 'sqlite')
+
+
+def search_properties(qs, text):
+    """
+    Restreint `qs` aux biens correspondant à `text`, classés par
+    `search_rank` (plus grand = plus pertinent). La table d'index est jointe
+    une seule fois : la correspondance et le score sont calculés dans la
+    même passe.
+    """
+    terms = fold(text).split()
+    if not terms:
+        return qs
+    table = qs.model._meta.db_table
+    join = f'{SEARCH_TABLE}.property_id = {table}.id'
+    if connection.vendor == 'postgresql':
+        query = ' '.join(terms)
+        match = f"{SEARCH_TABLE}.document @@ websearch_to_tsquery('french', %s)"
+        rank = f"ts_rank_cd({SEARCH_TABLE}.document, websearch_to_tsquery('french', %s))"
+    elif connection.vendor == 'sqlite':
+        query = _fts5_query(terms)
+        weights = ', '.join(str(w) for w in FTS5_WEIGHTS)
+        match = f'{SEARCH_TABLE} MATCH %s'
+        rank = f'-bm25({SEARCH_TABLE}, {weights})'
+    else:
+        raise NotImplementedError(f'Recherche plein texte non supportée sur {connection.vendor}')
+    return qs.extra(
+        tables=[SEARCH_TABLE], where=[join, match], params=[query],
+        select={'search_rank': rank}, select_params=[query],
+    )
@@ -1,15 +1,102 @@
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models.functions import Substr
+from django.utils.text import Truncator
 from rest_framework import serializers
-from .models import Property, PropertyImage
+from .models import Property, PropertyImage, PropertyImport
 from apps.users.serializers import UserSerializer
 
+DESCRIPTION_EXCERPT_LENGTH = 160
+
 
 class PropertyImageSerializer(serializers.ModelSerializer):
+    """URLs précalculées au traitement (aucun appel au stockage)."""
+    image = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
+    medium = serializers.SerializerMethodField()
+
     class Meta:
         model = PropertyImage
-        fields = ['id', 'image', 'is_cover', 'order', 'uploaded_at']
+        fields = [
+            'id', 'image', 'thumbnail', 'medium', 'status', 'error',
+            'is_cover', 'order', 'uploaded_at',
+        ]
+        read_only_fields = fields
+
+    def get_image(self, obj):
+        return obj.full_url or None
+
+    def get_thumbnail(self, obj):
+        return obj.thumbnail_url or None
+
+    def get_medium(self, obj):
+        return obj.medium_url or None
+
+
+def favorites_user(context):
+    """
+    Utilisateur dont on résout les favoris. `favorites_user=None` dans le
+    contexte produit une représentation anonyme, partageable en cache.
+    """
+    if 'favorites_user' in context:
+        return context['favorites_user']
+    request = context.get('request')
+    if request and request.user.is_authenticated:
+        return request.user
+    return None
+
+
+def resolve_favorites(properties, user):
+    """Renseigne `_is_favorited` sur chaque bien en une seule requête."""
+    from apps.favorites.models import Favorite
+    pending = [p for p in properties if not hasattr(p, '_is_favorited')]
+    if not pending:
+        return
+    favorited = set(
+        Favorite.objects.filter(user=user, property_id__in=[p.pk for p in pending])
+        .values_list('property_id', flat=True)
+    )
+    for p in pending:
+        p._is_favorited = p.pk in favorited
+
+
+def overlay_favorites(items, user):
+    """Applique `is_favorited` de `user` sur des biens déjà sérialisés (une requête)."""
+    from apps.favorites.models import Favorite
+    items = [item for item in items if 'is_favorited' in item and 'id' in item]
+    if not items:
+        return
+    favorited = {
+        str(pk) for pk in
+        Favorite.objects.filter(user=user, property_id__in=[item['id'] for item in items])
+        .values_list('property_id', flat=True)
+    }
+    for item in items:
+        item['is_favorited'] = str(item['id']) in favorited
 
 
-class PropertySerializer(serializers.ModelSerializer):
+class PropertyListSerializer(serializers.ListSerializer):
+    """Résout `is_favorited` pour toute la page avant la sérialisation."""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.Manager) else data)
+        user = favorites_user(self.context)
+        if user is not None:
+            resolve_favorites(items, user)
+        return super().to_representation(items)
+
+
+class FavoriteStateMixin:
+    def get_is_favorited(self, obj):
+        user = favorites_user(self.context)
+        if user is None:
+            return False
+        if not hasattr(obj, '_is_favorited'):
+            resolve_favorites([obj], user)
+        return obj._is_favorited
+
+
+class PropertySerializer(FavoriteStateMixin, serializers.ModelSerializer):
     images = PropertyImageSerializer(many=True, read_only=True)
     owner = UserSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField()
@@ -18,18 +105,13 @@ class PropertySerializer(serializers.ModelSerializer):
         model = Property
         fields = [
             'id', 'owner', 'title', 'description', 'property_type',
-            'transaction_type', 'price', 'currency', 'address', 'city',
+            'transaction_type', 'price', 'currency', 'price_eur', 'address', 'city',
             'country', 'postal_code', 'latitude', 'longitude',
-            'bedrooms', 'bathrooms', 'surface_area', 'is_published',
+            'bedrooms', 'bathrooms', 'max_guests', 'surface_area', 'price_per_sqm', 'is_published',
             'images', 'is_favorited', 'created_at', 'updated_at',
         ]
-        read_only_fields = ['id', 'owner', 'created_at', 'updated_at']
-
-    def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.favorited_by.filter(user=request.user).exists()
-        return False
+        read_only_fields = ['id', 'owner', 'price_eur', 'price_per_sqm', 'created_at', 'updated_at']
+        list_serializer_class = PropertyListSerializer
 
 
 class PropertyCreateSerializer(serializers.ModelSerializer):
@@ -38,9 +120,96 @@ class PropertyCreateSerializer(serializers.ModelSerializer):
         fields = [
             'title', 'description', 'property_type', 'transaction_type',
             'price', 'currency', 'address', 'city', 'country', 'postal_code',
-            'latitude', 'longitude', 'bedrooms', 'bathrooms', 'surface_area', 'is_published',
+            'latitude', 'longitude', 'bedrooms', 'bathrooms', 'max_guests', 'surface_area', 'is_published',
         ]
 
     def create(self, validated_data):
         validated_data['owner'] = self.context['request'].user
         return super().create(validated_data)
+
+
+class PropertyImportSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = PropertyImport
+        fields = [
+            'id', 'source_name', 'input_format', 'status', 'status_display',
+            'rows_processed', 'created_count', 'error_count', 'errors',
+            'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class SparseFieldsMixin:
+    """`?fields=id,title,price` : ne renvoie que les champs demandés (sérialiseur racine uniquement)."""
+    fields_query_param = 'fields'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if parent is not None and not (isinstance(parent, serializers.ListSerializer) and parent.parent is None):
+            return fields
+        request = self.context.get('request')
+        requested = request.query_params.get(self.fields_query_param) if request else None
+        if requested:
+            wanted = {name.strip() for name in requested.split(',')}
+            fields = {name: field for name, field in fields.items() if name in wanted}
+        return fields
+
+
+class OwnerSummarySerializer(serializers.ModelSerializer):
+    full_name = serializers.SerializerMethodField()
+    avatar = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'full_name', 'avatar']
+
+    def get_full_name(self, obj):
+        return f"{obj.first_name} {obj.last_name}".strip() or obj.username
+
+    def get_avatar(self, obj):
+        if hasattr(obj, 'profile') and obj.profile.avatar:
+            return obj.profile.avatar.url
+        return None
+
+
+class PropertyCardSerializer(SparseFieldsMixin, FavoriteStateMixin, serializers.ModelSerializer):
+    """Représentation compacte pour les listes (cartes) : couverture seule, description tronquée."""
+    owner = OwnerSummarySerializer(read_only=True)
+    description = serializers.SerializerMethodField()
+    cover_image = serializers.SerializerMethodField()
+    is_favorited = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Property
+        fields = [
+            'id', 'owner', 'title', 'description', 'property_type',
+            'transaction_type', 'price', 'currency', 'price_eur', 'city', 'country',
+            'latitude', 'longitude', 'bedrooms', 'bathrooms', 'max_guests', 'surface_area',
+            'price_per_sqm', 'cover_image', 'is_favorited', 'created_at',
+        ]
+        list_serializer_class = PropertyListSerializer
+
+    def get_description(self, obj):
+        text = getattr(obj, 'description_excerpt', None)
+        if text is None:
+            text = obj.description
+        return Truncator(text).chars(DESCRIPTION_EXCERPT_LENGTH)
+
+    def get_cover_image(self, obj):
+        return obj.cover_image_url or None
+
+
+def card_queryset(qs):
+    """Charge uniquement les colonnes utilisées par `PropertyCardSerializer`."""
+    return qs.select_related('owner__profile').only(
+        'id', 'title', 'property_type', 'transaction_type', 'price', 'currency', 'price_eur',
+        'city', 'country', 'latitude', 'longitude', 'bedrooms', 'bathrooms', 'max_guests',
+        'surface_area', 'price_per_sqm', 'cover_image_url', 'created_at',
+        'owner__id', 'owner__username', 'owner__first_name', 'owner__last_name',
+        'owner__profile__id', 'owner__profile__avatar',
+    ).annotate(
+        description_excerpt=Substr('description', 1, DESCRIPTION_EXCERPT_LENGTH + 1),
+    )
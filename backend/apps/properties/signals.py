@@ -0,0 +1,158 @@
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.contrib.auth.models import User
+from apps.business.models import Business
+from apps.users.models import UserProfile
+from . import autocomplete, images, search, similar
+from .cache import invalidate_listings, invalidate_owner, invalidate_tiles
+from .models import Property, PropertyImage
+
+
+@receiver(post_save, sender=Property)
+def index_property(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_properties([instance])
+
+
+@receiver(post_delete, sender=Property)
+def unindex_property(sender, instance, **kwargs):
+    search.unindex_property(instance.pk)
+
+
+@receiver(post_save, sender=Property)
+def update_similarity_index(sender, instance, raw=False, **kwargs):
+    # Après validation : une sauvegarde annulée ne laisse pas de ligne fantôme
+    if not raw:
+        transaction.on_commit(partial(similar.index.update, [instance]))
+
+
+@receiver(post_delete, sender=Property)
+def discard_from_similarity_index(sender, instance, **kwargs):
+    transaction.on_commit(partial(similar.index.discard, instance.pk))
+
+
+@receiver(post_save, sender=PropertyImage)
+def refresh_cover_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        images.refresh_cover(instance.property_id, preferred=instance if instance.is_cover else None)
+
+
+@receiver(post_delete, sender=PropertyImage)
+def refresh_cover_on_delete(sender, instance, **kwargs):
+    images.refresh_cover(instance.property_id)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender=UserProfile)
+def invalidate_cached_listings(sender, **kwargs):
+    # Après validation : une lecture concurrente ne peut plus mettre en cache,
+    # sous la nouvelle version, des données d'avant l'écriture
+    transaction.on_commit(invalidate_listings)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_owner_listings(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_owner, instance.owner_id))
+
+
+@receiver(pre_save, sender=Property)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    # Un déplacement invalide aussi les tuiles de l'ancienne position ;
+    # l'ancienne adresse est retirée de l'autocomplétion
+    if not raw and not instance._state.adding:
+        previous = Property.objects.filter(pk=instance.pk).values_list(
+            'latitude', 'longitude', 'city', 'postal_code', 'address', 'is_published',
+        ).first()
+        if previous is not None:
+            instance._previous_location = previous[:2]
+            instance._previous_suggestions = autocomplete.property_values(*previous[2:])
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_cluster_tiles(sender, instance, **kwargs):
+    points = [(instance.latitude, instance.longitude)]
+    previous = getattr(instance, '_previous_location', None)
+    if previous and previous != points[0]:
+        points.append(previous)
+    transaction.on_commit(partial(invalidate_tiles, points))
+
+
+def property_suggestions(p):
+    return autocomplete.property_values(p.city, p.postal_code, p.address, p.is_published)
+
+
+@receiver(post_save, sender=Property)
+def update_autocomplete_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(partial(
+            autocomplete.index.change,
+            getattr(instance, '_previous_suggestions', ()), property_suggestions(instance),
+        ))
+
+
+@receiver(post_delete, sender=Property)
+def discard_from_autocomplete_index(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete.index.change, property_suggestions(instance)))
+
+
+@receiver(pre_save, sender=Business)
+def remember_previous_business_city(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        previous = Business.objects.filter(pk=instance.pk).values_list('city', 'is_active').first()
+        instance._previous_suggestions = autocomplete.business_values(*previous) if previous else ()
+
+
+@receiver(post_save, sender=Business)
+def update_business_autocomplete(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(partial(
+            autocomplete.index.change,
+            getattr(instance, '_previous_suggestions', ()),
+            autocomplete.business_values(instance.city, instance.is_active),
+        ))
+
+
+@receiver(post_delete, sender=Business)
+def discard_business_from_autocomplete(sender, instance, **kwargs):
+    transaction.on_commit(partial(
+        autocomplete.index.change, autocomplete.business_values(instance.city, instance.is_active),
+    ))
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_profile_owner_listings(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_owner, instance.user_id))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_owner_listings(sender, instance, update_fields=None, **kwargs):
+    # La mise à jour de `last_login` ne change rien aux cartes
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        transaction.on_commit(partial(invalidate_owner, instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_owner_listings(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_owner, instance.pk))
+
+
+def sync_bulk_created(properties):
+    """Équivalent de `post_save` pour des biens créés par `bulk_create` (sans signaux)."""
+    if not properties:
+        return
+    search.index_properties(properties)
+    transaction.on_commit(partial(similar.index.update, properties))
+    transaction.on_commit(partial(
+        autocomplete.index.change, added=[value for p in properties for value in property_suggestions(p)],
+    ))
+    transaction.on_commit(invalidate_listings)
+    for owner_id in {p.owner_id for p in properties}:
+        transaction.on_commit(partial(invalidate_owner, owner_id))
+    transaction.on_commit(partial(invalidate_tiles, [(p.latitude, p.longitude) for p in properties]))
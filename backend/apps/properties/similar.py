@@ -0,0 +1,355 @@
+import math
+import threading
+import time
+import uuid
+from itertools import islice
+import numpy as np
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Abs
+from .models import Property
+
+# Colonnes lues pour construire un vecteur de caractéristiques
+ROW_FIELDS = (
+    'id', 'price_eur', 'surface_area', 'bedrooms', 'bathrooms',
+    'latitude', 'longitude', 'property_type', 'transaction_type',
+)
+FEATURE_COUNT = 6
+
+# Échelles : un écart égal à l'échelle compte pour 1 dans la distance
+PRICE_SCALE = 0.25        # sur log(prix en euros), soit environ ±28 %
+SURFACE_SCALE = 0.25      # sur log(surface)
+ROOM_SCALE = 1.0          # une chambre / salle de bain
+LOCATION_SCALE_KM = 10.0
+KM_PER_DEGREE = 111.32
+
+MISSING_PENALTY = 1.0     # écart retenu quand une valeur manque d'un côté
+TYPE_PENALTY = 4.0        # ajouté au carré de la distance si le type diffère
+SYNC_INTERVAL = 30        # secondes entre deux rattrapages depuis la base
+BUILD_BATCH_SIZE = 5000
+MAX_SIMILAR = 24
+
+TYPE_CODES = {code: i for i, (code, _) in enumerate(Property.PROPERTY_TYPES)}
+TRANSACTION_CODES = {code: i for i, (code, _) in enumerate(Property.TRANSACTION_TYPES)}
+UINT64_MASK = (1 << 64) - 1
+
+
+def feature_vector(row):
+    """Vecteur mis à l'échelle (float32, NaN si valeur absente) d'une ligne `ROW_FIELDS`."""
+    _, price, surface, bedrooms, bathrooms, lat, lng, _, _ = row
+    vector = np.full(FEATURE_COUNT, np.nan, dtype=np.float32)
+    if price and price > 0:
+        vector[0] = math.log(price) / PRICE_SCALE
+    if surface and surface > 0:
+        vector[1] = math.log(surface) / SURFACE_SCALE
+    if bedrooms is not None:
+        vector[2] = bedrooms / ROOM_SCALE
+    if bathrooms is not None:
+        vector[3] = bathrooms / ROOM_SCALE
+    if lat is not None and lng is not None:
+        lat, lng = float(lat), float(lng)
+        km = KM_PER_DEGREE / LOCATION_SCALE_KM
+        vector[4] = lat * km
+        vector[5] = lng * math.cos(math.radians(lat)) * km
+    return vector
+
+
+# Au-delà, les nouvelles clés sont fusionnées par un tri complet plutôt qu'insérées une à une
+MAX_KEY_INSERTS = 16
+
+
+def split_uuid(pk):
+    return pk.int >> 64, pk.int & UINT64_MASK
+
+
+class SimilarityIndex:
+    """
+    Matrice de caractéristiques des biens publiés, en mémoire dans chaque
+    processus. Par bien : 6 float32, codes type/transaction, UUID
+    (2 × uint64), indicateur actif, plus une entrée de la table de
+    correspondance UUID -> ligne (2 × uint64 triés + int32, interrogée par
+    `searchsorted`), soit ~63 octets : ~32 Mo pour 500 000 annonces. Les
+    tableaux par ligne doublent quand ils sont pleins (jusqu'à ~53 Mo), une
+    reconstruction tient brièvement deux copies, et chaque recherche alloue
+    ~15 Mo de temporaires (écarts et distances sur toute la matrice).
+
+    Construit puis rattrapé dans un thread, jamais sur le chemin d'une
+    requête (voir `ensure_built`) : les lectures en base se font hors du
+    verrou. Mis à jour après validation par les signaux du processus
+    courant ; les écritures des autres processus sont rattrapées via
+    `updated_at` au plus toutes les `SYNC_INTERVAL` secondes, leurs
+    suppressions quand une recherche tombe dessus (`similar_properties`).
+    """
+    STATE = (
+        'features', 'types', 'transactions', 'ids', 'active',
+        'key_hi', 'key_lo', 'key_rows', 'free', 'size', 'watermark',
+    )
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.build_lock = threading.Lock()
+        self.built = False
+        self.synced_at = None
+        self.journal = None
+
+    def _allocate(self, capacity):
+        capacity = max(capacity, 1024)
+        self.features = np.full((capacity, FEATURE_COUNT), np.nan, dtype=np.float32)
+        self.types = np.zeros(capacity, dtype=np.int8)
+        self.transactions = np.full(capacity, -1, dtype=np.int8)
+        self.ids = np.zeros((capacity, 2), dtype=np.uint64)
+        self.active = np.zeros(capacity, dtype=bool)
+        # Correspondance UUID -> ligne, triée sur (poids fort, poids faible)
+        self.key_hi = np.zeros(0, dtype=np.uint64)
+        self.key_lo = np.zeros(0, dtype=np.uint64)
+        self.key_rows = np.zeros(0, dtype=np.int32)
+        self.free = []
+        self.size = 0
+
+    def _grow(self):
+        capacity = len(self.active) * 2
+        n = len(self.active)
+        features = np.full((capacity, FEATURE_COUNT), np.nan, dtype=np.float32)
+        features[:n] = self.features
+        types = np.zeros(capacity, dtype=np.int8)
+        types[:n] = self.types
+        transactions = np.full(capacity, -1, dtype=np.int8)
+        transactions[:n] = self.transactions
+        ids = np.zeros((capacity, 2), dtype=np.uint64)
+        ids[:n] = self.ids
+        active = np.zeros(capacity, dtype=bool)
+        active[:n] = self.active
+        self.features, self.types, self.transactions = features, types, transactions
+        self.ids, self.active = ids, active
+
+    def _load(self):
+        """Remplit les tableaux depuis la base (instance non partagée, sans verrou)."""
+        queryset = Property.objects.filter(is_published=True).order_by()
+        self.watermark = Property.objects.order_by('-updated_at').values_list('updated_at', flat=True).first()
+        self._allocate(queryset.count() + 1024)
+        for row in queryset.values_list(*ROW_FIELDS).iterator(chunk_size=BUILD_BATCH_SIZE):
+            if self.size == len(self.active):
+                self._grow()
+            self._write(self.size, row)
+            self.size += 1
+        # Table de correspondance triée en une fois
+        self._update_keys(list(range(self.size)), [])
+
+    def build(self):
+        """
+        Charge un nouvel index hors du verrou puis l'échange avec le courant ;
+        les modifications reçues entre-temps sont rejouées dessus.
+        """
+        with self.lock:
+            self.journal = []
+        fresh = SimilarityIndex()
+        try:
+            fresh._load()
+        except BaseException:
+            with self.lock:
+                self.journal = None
+            raise
+        with self.lock:
+            for name in self.STATE:
+                setattr(self, name, getattr(fresh, name))
+            journal, self.journal = self.journal, None
+            for rows, removed in journal:
+                self._apply(rows, removed)
+            self.synced_at = time.monotonic()
+            self.built = True
+
+    def ensure_built(self):
+        """
+        Lance en arrière-plan la construction (premier accès) ou le rattrapage
+        (index plus vieux que `SYNC_INTERVAL`) ; ne bloque jamais. Renvoie
+        True si l'index peut répondre.
+        """
+        stale = self.synced_at is None or time.monotonic() - self.synced_at > SYNC_INTERVAL
+        if stale and not self.build_lock.locked():
+            self.synced_at = time.monotonic()
+            threading.Thread(target=self._refresh_in_background, daemon=True).start()
+        return self.built
+
+    def refresh(self):
+        """Construit ou rattrape l'index ; sans effet si un passage est déjà en cours."""
+        if not self.build_lock.acquire(blocking=False):
+            return
+        try:
+            if self.built:
+                self.sync()
+            else:
+                self.build()
+        finally:
+            self.build_lock.release()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            connection.close()
+
+    def _find(self, pk):
+        """Ligne du bien dans la matrice, None s'il n'est pas indexé."""
+        hi, lo = split_uuid(pk)
+        hi, lo = np.uint64(hi), np.uint64(lo)
+        start = np.searchsorted(self.key_hi, hi, 'left')
+        end = np.searchsorted(self.key_hi, hi, 'right')
+        i = start + np.searchsorted(self.key_lo[start:end], lo)
+        if i < end and self.key_lo[i] == lo:
+            return int(self.key_rows[i])
+        return None
+
+    def _write(self, position, row):
+        pk = row[0]
+        self.features[position] = feature_vector(row)
+        self.types[position] = TYPE_CODES.get(row[7], -1)
+        self.transactions[position] = TRANSACTION_CODES.get(row[8], -1)
+        self.ids[position] = split_uuid(pk)
+        self.active[position] = True
+
+    def _apply(self, rows=(), removed=()):
+        """Insère ou met à jour les lignes `ROW_FIELDS`, retire les biens `removed`."""
+        added, dropped, seen = [], [], {}
+        for row in rows:
+            position = seen.get(row[0])
+            if position is None:
+                position = self._find(row[0])
+            if position is None:
+                if self.free:
+                    position = self.free.pop()
+                else:
+                    if self.size == len(self.active):
+                        self._grow()
+                    position = self.size
+                    self.size += 1
+                seen[row[0]] = position
+                added.append(position)
+            self._write(position, row)
+        for pk in removed:
+            position = self._find(pk)
+            if position is not None:
+                self.active[position] = False
+                self.features[position] = np.nan
+                self.free.append(position)
+                dropped.append(position)
+        if added or dropped:
+            self._update_keys(added, dropped)
+
+    def _update_keys(self, added, dropped):
+        if dropped:
+            keep = ~np.isin(self.key_rows, np.array(dropped, dtype=np.int32))
+            self.key_hi, self.key_lo, self.key_rows = self.key_hi[keep], self.key_lo[keep], self.key_rows[keep]
+        if not added:
+            return
+        if len(added) <= MAX_KEY_INSERTS:
+            for position in added:
+                hi, lo = self.ids[position]
+                start = np.searchsorted(self.key_hi, hi, 'left')
+                end = np.searchsorted(self.key_hi, hi, 'right')
+                i = start + np.searchsorted(self.key_lo[start:end], lo)
+                self.key_hi = np.insert(self.key_hi, i, hi)
+                self.key_lo = np.insert(self.key_lo, i, lo)
+                self.key_rows = np.insert(self.key_rows, i, position)
+            return
+        rows = np.concatenate([self.key_rows, np.array(added, dtype=np.int32)])
+        hi, lo = self.ids[rows, 0], self.ids[rows, 1]
+        order = np.lexsort((lo, hi))
+        self.key_hi, self.key_lo, self.key_rows = hi[order], lo[order], rows[order]
+
+    def change(self, rows=(), removed=()):
+        """Applique des lignes `ROW_FIELDS` et des retraits, journalisés pendant une construction."""
+        with self.lock:
+            if self.journal is not None:
+                self.journal.append((rows, removed))
+            if self.built:
+                self._apply(rows, removed)
+
+    def discard(self, pk):
+        self.change(removed=[pk])
+
+    def update(self, properties):
+        """Insère, met à jour ou retire (dépublication) des biens déjà chargés."""
+        self.change(
+            [tuple(getattr(p, field) for field in ROW_FIELDS) for p in properties if p.is_published],
+            [p.pk for p in properties if not p.is_published],
+        )
+
+    def sync(self):
+        """
+        Rattrape les biens modifiés depuis le dernier passage (autres
+        processus). Chaque lot est lu hors du verrou puis appliqué : une
+        version plus récente reçue entre-temps par signal peut être écrasée
+        jusqu'au passage suivant, qui la relit (`updated_at` >= repère).
+        """
+        changed = Property.objects.order_by('updated_at')
+        if self.watermark is not None:
+            changed = changed.filter(updated_at__gte=self.watermark)
+        rows = changed.values_list(*ROW_FIELDS, 'is_published', 'updated_at').iterator(chunk_size=BUILD_BATCH_SIZE)
+        while True:
+            batch = list(islice(rows, BUILD_BATCH_SIZE))
+            if not batch:
+                break
+            with self.lock:
+                self._apply([row[:-2] for row in batch if row[-2]], [row[0] for row in batch if not row[-2]])
+            self.watermark = batch[-1][-1]
+        self.synced_at = time.monotonic()
+
+    def nearest(self, target, k):
+        """
+        Identifiants des `k` biens publiés les plus proches de `target` (même
+        transaction), du plus proche au plus lointain. Distance euclidienne
+        vectorisée sur toute la matrice.
+        """
+        query = feature_vector(tuple(getattr(target, field) for field in ROW_FIELDS))
+        transaction = TRANSACTION_CODES.get(target.transaction_type, -1)
+        property_type = TYPE_CODES.get(target.property_type, -1)
+        with self.lock:
+            n = self.size
+            diff = self.features[:n] - query
+            np.nan_to_num(diff, copy=False, nan=MISSING_PENALTY)
+            distances = np.einsum('ij,ij->i', diff, diff)
+            distances += TYPE_PENALTY * (self.types[:n] != property_type)
+            distances[~self.active[:n] | (self.transactions[:n] != transaction)] = np.inf
+            own = self._find(target.pk)
+            if own is not None:
+                distances[own] = np.inf
+            k = min(k, int(np.isfinite(distances).sum()))
+            if k <= 0:
+                return []
+            best = np.argpartition(distances, k - 1)[:k]
+            best = best[np.argsort(distances[best], kind='stable')]
+            ids = self.ids[best]
+        return [uuid.UUID(int=(int(hi) << 64) | int(lo)) for hi, lo in ids]
+
+
+index = SimilarityIndex()
+
+
+def fallback_properties(target, k, queryset):
+    """Repli tant que l'index se construit : même transaction et même ville, prix le plus proche."""
+    qs = queryset.filter(transaction_type=target.transaction_type, city=target.city).exclude(pk=target.pk)
+    if target.price_eur is not None:
+        qs = qs.order_by(Abs(F('price_eur') - target.price_eur).asc(nulls_last=True), 'pk')
+    return list(qs[:k])
+
+
+def similar_properties(target, k, queryset):
+    """
+    Biens publiés de `queryset` similaires à `target`, dans l'ordre de
+    proximité. Les identifiants de l'index sont confrontés aux biens vivants :
+    ceux supprimés ou dépubliés par un autre processus sont retirés de
+    l'index et remplacés par les suivants.
+    """
+    if not index.ensure_built():
+        return fallback_properties(target, k, queryset)
+    while True:
+        ids = index.nearest(target, k)
+        found = {p.pk: p for p in queryset.filter(pk__in=ids)}
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            live = set(Property.objects.filter(pk__in=missing, is_published=True).values_list('pk', flat=True))
+            gone = [pk for pk in missing if pk not in live]
+            if gone:
+                index.change(removed=gone)
+                continue
+        return [found[pk] for pk in ids if pk in found]
@@ -0,0 +1,9 @@
+from django.core.files.storage import FileSystemStorage
+
+# Sans `location`, le stockage suit MEDIA_ROOT (y compris `override_settings`)
+_staging = FileSystemStorage()
+
+
+def staging_storage():
+    """Stockage local des fichiers reçus, en attente de traitement par le worker."""
+    return _staging
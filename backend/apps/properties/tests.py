@@ -1,3 +1,847 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from . import autocomplete, similar
+from .images import CLAIM_TIMEOUT, claim_pending, process_images, refresh_cover
+from .imports import run_import
+from .clusters import CLUSTER_GRID, compute_clusters
+from .geo import tile_bounds, tile_for
+from .models import ExchangeRate, Property, PropertyImage, PropertyImport
+from .serializers import PropertyCardSerializer, PropertySerializer, card_queryset
 
-# Create your tests here.
+CITIES = ['Nice', 'Lyon', 'Paris', 'Bordeaux', 'Marseille']
+
+# Lignes de plan signalant un parcours complet de la table des biens
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN properties_property\b(?! USING)'),
+    'postgresql': re.compile(r'\bSeq Scan on properties_property\b'),
+}
+
+
+class PropertyQueryPlanTests(TestCase):
+    """
+    Vérifie via EXPLAIN que les requêtes réellement émises par la liste des
+    biens restent servies par un index.
+
+    Sur PostgreSQL, `enable_seqscan` est désactivé : sur un jeu de données
+    réduit le planificateur préférerait un parcours séquentiel même si un
+    index adapté existe ; on vérifie ici qu'il en existe un.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        properties = [
+            Property(
+                owner=owner,
+                title=f'Bien {i}',
+                description='Description',
+                transaction_type='rent' if i % 3 else 'sale',
+                price=Decimal(500 + (i * 37) % 5000),
+                address=f'{i} rue de la Paix',
+                city=CITIES[i % len(CITIES)],
+                latitude=Decimal('43.0') + Decimal(i % 100) / 100,
+                longitude=Decimal('5.0') + Decimal(i % 70) / 100,
+                bedrooms=i % 6,
+                surface_area=Decimal(20 + i % 150),
+                is_published=i % 10 != 0,
+            )
+            for i in range(500)
+        ]
+        for p in properties:
+            p.price_eur = p.price
+            p.price_per_sqm = Property.compute_price_per_sqm(p.price_eur, p.surface_area)
+        Property.objects.bulk_create(properties)
+
+    def setUp(self):
+        self.client = APIClient()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE properties_property')
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def explain(self, sql):
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+
+    def assertIndexedList(self, params):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f'Plans non vérifiés sur {connection.vendor}')
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/properties/', params)
+        self.assertEqual(response.status_code, 200)
+        queries = [q['sql'] for q in ctx.captured_queries if 'FROM "properties_property"' in q['sql']]
+        self.assertTrue(queries)
+        for sql in queries:
+            plan = self.explain(sql)
+            self.assertIsNone(pattern.search(plan), f'Parcours séquentiel :\n{sql}\n{plan}')
+
+    def test_latest_published(self):
+        self.assertIndexedList({})
+
+    def test_city_transaction_price_range(self):
+        self.assertIndexedList({
+            'city': 'Nice', 'transaction_type': 'rent', 'min_price': 800, 'max_price': 2000,
+        })
+
+    def test_transaction_price_range(self):
+        self.assertIndexedList({'transaction_type': 'sale', 'min_price': 1000})
+
+    def test_order_by_price(self):
+        self.assertIndexedList({'ordering': 'price'})
+
+    def test_order_by_price_per_sqm(self):
+        self.assertIndexedList({'ordering': 'price_per_sqm'})
+
+    def test_price_per_sqm_range(self):
+        self.assertIndexedList({'min_price_per_sqm': 20, 'max_price_per_sqm': 40})
+
+    def test_cursor_pages(self):
+        self.assertIndexedList({'pagination': 'cursor'})
+        response = self.client.get('/api/properties/', {'pagination': 'cursor'})
+        self.assertIndexedList({'cursor': response.json()['next'].split('cursor=')[1]})
+
+    def test_bounding_box(self):
+        self.assertIndexedList({'bbox': '5.1,43.2,5.3,43.4'})
+
+
+def image_upload(name, size=(1600, 1200)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'navy').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class PropertyImageProcessingTests(TestCase):
+    """Upload sans traitement dans la requête ; stockage local à la place de Cloudinary."""
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage = override_settings(
+            MEDIA_ROOT=media_root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+        )
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        self.owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        self.property = Property.objects.create(
+            owner=self.owner, title='Loft', description='Description', price=Decimal('1200'),
+            address='1 rue de la Paix', city='Lyon',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = f'/api/properties/{self.property.pk}/images/'
+
+    def upload(self, *names):
+        return self.client.post(self.url, {'images': [image_upload(n) for n in names]}, format='multipart')
+
+    def test_upload_is_pending_until_processed(self):
+        response = self.upload('a.jpg', 'b.jpg')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual([img['status'] for img in response.json()], ['pending', 'pending'])
+        self.assertEqual(self.client.get(f'/api/properties/{self.property.pk}/').json()['images'], [])
+
+        self.assertEqual(process_images(), 2)
+        first, second = self.property.images.order_by('order')
+        self.assertEqual((first.status, second.status), ('ready', 'ready'))
+        self.assertEqual((first.order, second.order), (0, 1))
+        self.assertEqual((first.is_cover, second.is_cover), (True, False))
+        self.assertFalse(first.source)
+        with Image.open(first.thumbnail) as thumbnail:
+            self.assertEqual(max(thumbnail.size), 400)
+        with Image.open(first.medium) as medium:
+            self.assertEqual(max(medium.size), 1024)
+
+    def test_later_uploads_append_after_existing_images(self):
+        self.upload('a.jpg', 'b.jpg')
+        process_images()
+        self.upload('c.jpg')
+        process_images()
+        images = list(self.property.images.order_by('order'))
+        self.assertEqual([img.order for img in images], [0, 1, 2])
+        self.assertEqual([img.is_cover for img in images], [True, False, False])
+
+    def test_cover_is_denormalized_on_property(self):
+        self.upload('a.jpg', 'b.jpg', 'c.jpg')
+        process_images()
+        first, second, third = self.property.images.order_by('order')
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.cover_image, first)
+        self.assertEqual(self.property.cover_image_url, first.medium_url)
+
+        self.property.is_published = True
+        self.property.save()
+        with CaptureQueriesContext(connection) as ctx:
+            card = self.client.get('/api/properties/').json()['results'][0]
+        self.assertEqual(card['cover_image'], first.medium_url)
+        self.assertFalse([q for q in ctx.captured_queries if 'properties_propertyimage' in q['sql']])
+
+        response = self.client.post(f'{self.url}reorder/', {'images': [third.pk, first.pk, third.pk]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            f'{self.url}reorder/', {'images': [third.pk, first.pk], 'cover': second.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(img['id'], img['is_cover']) for img in response.json()], [
+            (third.pk, False), (first.pk, False), (second.pk, True),
+        ])
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.cover_image_url, second.medium_url)
+
+        second.delete()
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.cover_image_id, third.pk)
+        self.assertTrue(PropertyImage.objects.get(pk=third.pk).is_cover)
+
+    def test_invalid_file_is_marked_failed(self):
+        self.client.post(
+            self.url, {'images': [SimpleUploadedFile('x.jpg', b'pas une image')]}, format='multipart',
+        )
+        with self.assertLogs('apps.properties.images', 'ERROR'):
+            process_images()
+        image = PropertyImage.objects.get(property=self.property)
+        self.assertEqual(image.status, 'failed')
+        self.assertFalse(image.is_cover)
+
+    def test_abandoned_claims_are_reclaimed(self):
+        self.upload('a.jpg', 'b.jpg')
+        # Worker arrêté juste après avoir réservé les images
+        self.assertEqual(len(claim_pending()), 2)
+        self.assertEqual(process_images(), 0)
+
+        PropertyImage.objects.update(claimed_at=timezone.now() - CLAIM_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(process_images(), 2)
+        images = list(self.property.images.order_by('order'))
+        self.assertEqual([(img.status, img.is_cover) for img in images], [('ready', True), ('ready', False)])
+
+
+class PropertyExportTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('partenaire', 'partenaire@example.com', 'motdepasse123')
+        for i, city in enumerate(CITIES):
+            Property.objects.create(
+                owner=self.owner, title=f'Bien {i}', description='Séjour, "lumineux"',
+                price=Decimal(100000 + i), address='1 rue', city=city, is_published=True,
+            )
+        Property.objects.create(owner=self.owner, title='Brouillon', price=Decimal('1'), address='1 rue', city='Nice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def export(self, **params):
+        response = self.client.get('/api/properties/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_is_importable(self):
+        rows = list(csv.DictReader(io.StringIO(self.export(city='Lyon'))))
+        self.assertEqual([row['title'] for row in rows], ['Bien 1'])
+        self.assertEqual(rows[0]['description'], 'Séjour, "lumineux"')
+        self.assertEqual(rows[0]['latitude'], '')
+
+    def test_ndjson_export_streams_published_properties(self):
+        rows = [json.loads(line) for line in self.export(output_format='ndjson').splitlines()]
+        self.assertEqual([row['title'] for row in rows], [f'Bien {i}' for i in range(len(CITIES))])
+        self.assertEqual(rows[0]['price'], '100000.00')
+
+
+class PropertyAutocompleteTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        for city in ['Évreux', 'Évreux', 'Paris']:
+            Property.objects.create(
+                owner=self.owner, title='Maison', price=Decimal('1'), address='4 rue des Évêques',
+                city=city, postal_code='27000', is_published=True,
+            )
+        # Index reconstruit depuis la base de test à la première requête
+        autocomplete.index.built = False
+        self.client = APIClient()
+
+    def suggest(self, q):
+        return [(s['type'], s['value'], s['count']) for s in self.client.get('/api/properties/autocomplete/', {'q': q}).json()]
+
+    def test_folded_prefixes_ranked_by_listing_count(self):
+        self.assertEqual(self.suggest('ev'), [('address', '4 rue des Évêques', 3), ('city', 'Évreux', 2)])
+        self.assertEqual(self.suggest('RUE DES'), [('address', '4 rue des Évêques', 3)])
+        self.assertEqual(self.suggest('e'), [])
+
+    def test_index_follows_saves(self):
+        self.suggest('ev')
+        with self.captureOnCommitCallbacks(execute=True):
+            Property.objects.filter(city='Paris').get().delete()
+            Property.objects.create(
+                owner=self.owner, title='Studio', price=Decimal('1'), address='1 quai',
+                city='Evreux', is_published=True,
+            )
+        self.assertEqual(self.suggest('evr'), [('city', 'Évreux', 3)])
+        self.assertEqual(self.suggest('par'), [])
+
+    def test_rebuild_does_not_block_suggestions(self):
+        self.suggest('ev')
+        reading, release = threading.Event(), threading.Event()
+
+        def slow_counts():
+            reading.set()
+            release.wait(5)
+            return Counter({('city', 'Évreux'): 2, ('city', 'Paris'): 1})
+
+        with patch.object(autocomplete.index, 'read_counts', slow_counts):
+            rebuild = threading.Thread(target=autocomplete.index.refresh)
+            rebuild.start()
+            reading.wait(5)
+            started = time.perf_counter()
+            self.assertEqual(self.suggest('evr'), [('city', 'Évreux', 2)])
+            self.assertLess(time.perf_counter() - started, 1)
+            # Reçue pendant la reconstruction : rejouée sur le nouvel index
+            autocomplete.index.change(added=[('city', 'Evreux')])
+            release.set()
+            rebuild.join()
+        self.assertEqual(self.suggest('evr'), [('city', 'Évreux', 3)])
+        self.assertEqual(self.suggest('rue'), [])
+
+
+class PropertyCurrencyTests(TestCase):
+    def setUp(self):
+        ExchangeRate.objects.create(currency='usd', rate=Decimal('0.9'))
+        owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        for title, price, currency in [('Euros', '1000', 'EUR'), ('Dollars', '1000', 'USD'), ('Francs', '1000', 'XAF')]:
+            Property.objects.create(
+                owner=owner, title=title, price=Decimal(price), currency=currency,
+                address='1 rue', city='Nice', surface_area=Decimal('50'), is_published=True,
+            )
+        self.client = APIClient()
+
+    def titles(self, **params):
+        cache.clear()
+        return [p['title'] for p in self.client.get('/api/properties/', params).json()['results']]
+
+    def test_filters_and_ordering_use_converted_price(self):
+        self.assertEqual(Property.objects.get(title='Dollars').price_eur, Decimal('900.00'))
+        self.assertIsNone(Property.objects.get(title='Francs').price_eur)
+        self.assertEqual(self.titles(min_price=950), ['Euros'])
+        self.assertEqual(self.titles(ordering='price', max_price=5000), ['Dollars', 'Euros'])
+
+    def test_price_per_sqm_uses_converted_price(self):
+        self.assertEqual(Property.objects.get(title='Dollars').price_per_sqm, Decimal('18.00'))
+        self.assertIsNone(Property.objects.get(title='Francs').price_per_sqm)
+        self.assertEqual(self.titles(min_price_per_sqm=19), ['Euros'])
+        self.assertEqual(self.titles(ordering='price_per_sqm', max_price_per_sqm=100), ['Dollars', 'Euros'])
+        dollars = Property.objects.get(title='Dollars')
+        dollars.surface_area = Decimal('100')
+        dollars.save(update_fields=['surface_area'])
+        self.assertEqual(Property.objects.get(title='Dollars').price_per_sqm, Decimal('9.00'))
+
+    def test_invalid_bounds_are_rejected(self):
+        for name in ['min_price', 'max_price', 'min_price_per_sqm', 'max_price_per_sqm', 'bedrooms_min']:
+            for value in ['abc', 'NaN']:
+                cache.clear()
+                response = self.client.get('/api/properties/', {name: value})
+                self.assertEqual(response.status_code, 400, (name, value))
+                self.assertIn(name, response.json())
+        response = self.client.get('/api/properties/facets/', {'min_price_per_sqm': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.titles(min_price_per_sqm='19.5'), ['Euros'])
+
+    def test_recompute_after_rate_change(self):
+        call_command('recompute_price_eur', '--rate', 'USD=1.2', '--rate', 'XAF=0.0015', stdout=io.StringIO())
+        self.assertEqual(Property.objects.get(title='Dollars').price_eur, Decimal('1200.00'))
+        self.assertEqual(Property.objects.get(title='Francs').price_eur, Decimal('1.50'))
+        self.assertEqual(Property.objects.get(title='Dollars').price_per_sqm, Decimal('24.00'))
+        self.assertEqual(Property.objects.get(title='Francs').price_per_sqm, Decimal('0.03'))
+        self.assertEqual(self.titles(ordering='-price'), ['Dollars', 'Euros', 'Francs'])
+
+
+class PropertyGeoTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        for title, lat, lng in [
+            ('Antibes', '43.5808', '7.1251'), ('Nice', '43.7031', '7.2661'),
+            ('Marseille', '43.2965', '5.3698'), ('Sans position', None, None),
+        ]:
+            Property.objects.create(
+                owner=owner, title=title, price=Decimal('1000'), address='1 rue', city=title,
+                latitude=lat and Decimal(lat), longitude=lng and Decimal(lng), is_published=True,
+            )
+        self.client = APIClient()
+
+    def titles(self, **params):
+        response = self.client.get('/api/properties/', params)
+        self.assertEqual(response.status_code, 200)
+        return [p['title'] for p in response.json()['results']]
+
+    def test_radius_keeps_nearby_properties_by_distance(self):
+        self.assertEqual(self.titles(lat='43.70', lng='7.26', radius_km='25'), ['Nice', 'Antibes'])
+        self.assertEqual(self.titles(lat='43.70', lng='7.26', radius_km='5'), ['Nice'])
+        self.assertEqual(self.titles(lat='43.30', lng='5.37'), ['Marseille', 'Antibes', 'Nice'])
+
+    def test_bbox(self):
+        self.assertEqual(self.titles(bbox='7.0,43.5,7.2,43.6'), ['Antibes'])
+        for bbox in ['7.0,43.5,7.2', '7.2,43.5,7.0,43.6', '7,43,8,91', 'a,b,c,d']:
+            self.assertEqual(self.client.get('/api/properties/', {'bbox': bbox}).status_code, 400, bbox)
+
+    def test_lat_and_lng_required_together(self):
+        for url in ['/api/properties/', '/api/properties/facets/']:
+            for params in [{'lat': '43'}, {'lng': '7'}, {'lat': 'x', 'lng': '7'}]:
+                self.assertEqual(self.client.get(url, params).status_code, 400, (url, params))
+
+
+IMPORT_HEADER = 'title,description,price,address,city\n'
+
+
+def import_rows(*numbers):
+    return ''.join(f'Bien {n},Desc,{100 + n},{n} rue,Nice\n' for n in numbers)
+
+
+class PropertyClusterTests(TestCase):
+    ZOOM = 10
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        self.tile = tile_for(43.70, 7.26, self.ZOOM)
+        self.other_tile = tile_for(43.30, 5.37, self.ZOOM)
+        south, west, north, east = tile_bounds(*self.tile)
+        cell_lat, cell_lng = (north - south) / CLUSTER_GRID, (east - west) / CLUSTER_GRID
+        # Deux biens dans la cellule nord-ouest, un dans la cellule voisine à l'est
+        self.nice = [
+            self.create('A', north - cell_lat * 0.25, west + cell_lng * 0.25, '900'),
+            self.create('B', north - cell_lat * 0.75, west + cell_lng * 0.75, '1500'),
+            self.create('C', north - cell_lat * 0.5, west + cell_lng * 1.5, '700'),
+        ]
+        self.marseille = self.create('D', 43.30, 5.37, '800')
+        self.create('Brouillon', north - cell_lat * 0.5, west + cell_lng * 0.5, '100', is_published=False)
+        self.client = APIClient()
+
+    def create(self, title, lat, lng, price, is_published=True, currency='EUR'):
+        return Property.objects.create(
+            owner=self.owner, title=title, price=Decimal(price), currency=currency, address='1 rue', city='Nice',
+            latitude=Decimal(f'{lat:.6f}'), longitude=Decimal(f'{lng:.6f}'), is_published=is_published,
+        )
+
+    def tile_count(self, tile):
+        z, x, y = tile
+        response = self.client.get('/api/properties/clusters/', {'z': z, 'x': x, 'y': y})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['count']
+
+    def test_centroids_counts_and_price_ranges(self):
+        data = compute_clusters(Property.objects.filter(is_published=True), *self.tile)
+        self.assertEqual(data['count'], 3)
+        pair, single = data['clusters']
+        a, b, c = self.nice
+        self.assertEqual(pair['count'], 2)
+        self.assertAlmostEqual(pair['latitude'], float(a.latitude + b.latitude) / 2, places=5)
+        self.assertAlmostEqual(pair['longitude'], float(a.longitude + b.longitude) / 2, places=5)
+        self.assertEqual((pair['min_price'], pair['max_price']), (Decimal('900'), Decimal('1500')))
+        self.assertEqual(single['count'], 1)
+        self.assertEqual((single['latitude'], single['longitude']), (float(c.latitude), float(c.longitude)))
+        self.assertEqual((single['min_price'], single['max_price']), (Decimal('700'), Decimal('700')))
+
+    def test_price_ranges_are_in_euros(self):
+        ExchangeRate.objects.create(currency='USD', rate=Decimal('0.5'))
+        c = self.nice[2]
+        # 1000 USD = 500 EUR : sous les 700 EUR du voisin, bien qu'au-dessus en valeur faciale
+        self.create('E', float(c.latitude), float(c.longitude), '1000', currency='USD')
+        clusters = compute_clusters(Property.objects.filter(is_published=True), *self.tile)['clusters']
+        east = next(cluster for cluster in clusters if cluster['longitude'] == float(c.longitude))
+        self.assertEqual(east['count'], 2)
+        self.assertEqual((east['min_price'], east['max_price']), (Decimal('500'), Decimal('700')))
+
+    def test_move_and_delete_invalidate_old_and_new_tiles(self):
+        self.assertEqual((self.tile_count(self.tile), self.tile_count(self.other_tile)), (3, 1))
+        with self.assertNumQueries(0):
+            self.tile_count(self.tile)
+
+        moved = self.nice[0]
+        moved.latitude, moved.longitude = self.marseille.latitude, self.marseille.longitude
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.save()
+        self.assertEqual((self.tile_count(self.tile), self.tile_count(self.other_tile)), (2, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.marseille.delete()
+        self.assertEqual(self.tile_count(self.other_tile), 1)
+
+
+class PropertyFacetsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        for i in range(24):
+            Property.objects.create(
+                owner=owner, title=f'Bien {i}', price=Decimal(400 + i * 150),
+                currency='XAF' if i % 11 == 0 else 'EUR', address='1 rue',
+                property_type=['apartment', 'villa', 'office'][i % 3],
+                transaction_type='sale' if i % 4 == 0 else 'rent',
+                city=CITIES[i % 3], bedrooms=None if i % 7 == 0 else i % 7, is_published=i % 9 != 0,
+            )
+        self.client = APIClient()
+
+    def get(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counts_match_filtered_list(self):
+        for params in [{}, {'city': 'Nice'}, {'transaction_type': 'rent', 'min_price': '1000'}, {'bedrooms_min': '3'}]:
+            facets = self.get('/api/properties/facets/', params)
+            self.assertEqual(facets['count'], self.get('/api/properties/', params)['count'], params)
+            for dimension in ('property_type', 'transaction_type', 'city'):
+                for bucket in facets[dimension]:
+                    listed = self.get('/api/properties/', {**params, dimension: bucket['value']})['count']
+                    self.assertEqual(bucket['count'], listed, (params, dimension, bucket))
+            for bucket in facets['price']:
+                bounds = {'min_price': bucket['min']}
+                if bucket['max'] is not None:
+                    # Tranches semi-ouvertes [min, max) ; prix entiers ici
+                    bounds['max_price'] = bucket['max'] - 1
+                listed = self.get('/api/properties/', {**params, **bounds})['count']
+                self.assertEqual(bucket['count'], listed, (params, bucket))
+            self.assertEqual(sum(b['count'] for b in facets['bedrooms']), facets['count'])
+
+    def test_cache_key_ignores_parameter_order(self):
+        self.get('/api/properties/facets/?city=Nice&transaction_type=rent&page=2', {})
+        with self.assertNumQueries(0):
+            data = self.get('/api/properties/facets/?transaction_type=rent&city=Nice', {})
+        self.assertEqual(data['count'], Property.objects.filter(
+            is_published=True, city='Nice', transaction_type='rent',
+        ).count())
+
+
+class PropertyImportTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def upload(self, content, name='biens.csv', **data):
+        data['file'] = SimpleUploadedFile(name, content if isinstance(content, bytes) else content.encode())
+        return self.client.post('/api/properties/import/', data, format='multipart')
+
+    def test_rows_with_errors_are_reported(self):
+        response = self.upload(IMPORT_HEADER + import_rows(1) + ',Desc,10,1 rue,Nice\n' + import_rows(3))
+        self.assertEqual(response.status_code, 201)
+        job = response.json()
+        self.assertEqual((job['status'], job['created_count'], job['error_count']), ('completed', 2, 1))
+        self.assertEqual(job['errors'][0]['row'], 2)
+        self.assertIn('title', job['errors'][0]['errors'])
+
+        response = self.upload('{"title": "A", "description": "D", "price": "5", "address": "1", "city": "Nice"}\n[]\n{', 'biens.ndjson')
+        self.assertEqual([e['errors']['non_field_errors'] for e in response.json()['errors']], [['Objet JSON attendu'], ['JSON invalide']])
+
+    def test_unreadable_file_is_a_client_error(self):
+        response = self.upload((IMPORT_HEADER + import_rows(1) + 'Bien 2,Été,5,1 rue,Nice\n').encode('latin-1'))
+        self.assertEqual(response.status_code, 400)
+        job = response.json()['import']
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['errors'][-1]['errors']['non_field_errors'], ['Fichier illisible : encodage UTF-8 attendu'])
+
+        response = self.upload(IMPORT_HEADER + f'Bien 1,"{"x" * (csv.field_size_limit() + 1)}",5,1 rue,Nice\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()['error'].startswith('CSV invalide'))
+
+    def test_command_resumes_after_last_committed_chunk(self):
+        content = IMPORT_HEADER + import_rows(1, 2, 3, 4, 5)
+
+        def interrupted():
+            yield from io.StringIO(IMPORT_HEADER + import_rows(1, 2, 3))
+            raise RuntimeError('arrêt brutal')
+
+        with self.assertRaises(RuntimeError):
+            run_import(self.owner, interrupted(), 'csv', chunk_size=2)
+        job = PropertyImport.objects.get()
+        self.assertEqual((job.status, job.rows_processed), ('failed', 2))
+
+        path = f'{self.tmp}/biens.csv'
+        with open(path, 'w') as fh:
+            fh.write(content)
+        call_command('import_properties', path, resume=str(job.pk), stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_processed, job.created_count), ('completed', 5, 5))
+        self.assertEqual(
+            sorted(Property.objects.values_list('title', flat=True)), [f'Bien {n}' for n in range(1, 6)],
+        )
+
+
+class PropertyListCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        self.properties = [
+            Property.objects.create(
+                owner=self.owner, title=f'Bien {i}', price=Decimal('1000'), address='1 rue',
+                city='Nice', is_published=True,
+            )
+            for i in range(3)
+        ]
+        self.client = APIClient()
+
+    def titles(self):
+        return [p['title'] for p in self.client.get('/api/properties/').json()['results']]
+
+    def test_anonymous_hits_skip_the_database(self):
+        self.titles()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(), ['Bien 2', 'Bien 1', 'Bien 0'])
+
+    def test_invalidated_once_the_write_commits(self):
+        self.titles()
+        first = self.properties[0]
+        first.title = 'Renommé'
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.save()
+            # Pas encore validé : le cache reste sur l'ancienne version
+            self.assertEqual(self.titles(), ['Bien 2', 'Bien 1', 'Bien 0'])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.titles(), ['Bien 2', 'Bien 1', 'Renommé'])
+
+    def test_favorites_overlay_cached_page(self):
+        from apps.favorites.models import Favorite
+        self.titles()
+        Favorite.objects.create(user=self.owner, property=self.properties[1])
+        self.client.force_authenticate(self.owner)
+        with self.assertNumQueries(1):
+            results = self.client.get('/api/properties/').json()['results']
+        self.assertEqual([p['is_favorited'] for p in results], [False, True, False])
+        self.client.force_authenticate(None)
+        self.assertEqual([p['is_favorited'] for p in self.client.get('/api/properties/').json()['results']], [False] * 3)
+
+
+class PropertyFavoriteStateTests(TestCase):
+    def setUp(self):
+        from apps.favorites.models import Favorite
+        self.user = User.objects.create_user('acheteur', 'acheteur@example.com', 'motdepasse123')
+        properties = [
+            Property.objects.create(
+                owner=self.user, title=f'Bien {i}', price=Decimal('1000'), address='1 rue', city='Nice',
+            )
+            for i in range(5)
+        ]
+        for p in properties[1::2]:
+            Favorite.objects.create(user=self.user, property=p)
+
+    def test_page_resolves_favorites_in_one_query(self):
+        context = {'favorites_user': self.user}
+        for serializer_class, qs in [
+            (PropertyCardSerializer, card_queryset(Property.objects.all())),
+            (PropertySerializer, Property.objects.select_related('owner__profile').prefetch_related('images')),
+        ]:
+            page = list(qs.order_by('title'))
+            with self.assertNumQueries(1):
+                data = serializer_class(page, many=True, context=context).data
+            self.assertEqual([p['is_favorited'] for p in data], [False, True, False, True, False])
+
+        page = list(Property.objects.select_related('owner__profile').prefetch_related('images').order_by('title'))
+        with self.assertNumQueries(0):
+            data = PropertySerializer(page, many=True, context={'favorites_user': None}).data
+        self.assertEqual({p['is_favorited'] for p in data}, {False})
+
+
+class PropertyCardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123', first_name='Agence')
+        for i in range(3):
+            Property.objects.create(
+                owner=owner, title=f'Bien {i}', description='Très lumineux. ' * 40, price=Decimal('1000'),
+                address='1 rue', city='Nice', is_published=True,
+            )
+        self.client = APIClient()
+
+    def test_sparse_fieldsets(self):
+        results = self.client.get('/api/properties/', {'fields': 'id, title,price'}).json()['results']
+        self.assertEqual([set(p) for p in results], [{'id', 'title', 'price'}] * 3)
+        # Les sérialiseurs imbriqués ne sont pas filtrés
+        card = self.client.get('/api/properties/', {'fields': 'owner'}).json()['results'][0]
+        self.assertEqual(card, {'owner': {'id': card['owner']['id'], 'full_name': 'Agence', 'avatar': None}})
+        self.assertEqual(len(self.client.get('/api/properties/').json()['results'][0]), len(PropertyCardSerializer.Meta.fields))
+
+    def test_card_queryset_loads_only_card_columns(self):
+        page = list(card_queryset(Property.objects.order_by('title')))
+        # La description complète n'est lue que tronquée (`description_excerpt`)
+        self.assertEqual(page[0].get_deferred_fields(), {
+            'description', 'address', 'postal_code', 'is_published', 'cover_image_id', 'updated_at', 'published_at',
+        })
+        with self.assertNumQueries(0):
+            data = PropertyCardSerializer(page, many=True, context={'favorites_user': None}).data
+        self.assertTrue(data[0]['description'].endswith('…'))
+
+
+class PropertySimilarTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        self.target = self.create('Cible', '1000', 50, 2, '43.70')
+        self.near = self.create('Proche', '1050', 52, 2, '43.71')
+        self.mid = self.create('Moyen', '1500', 70, 3, '43.75')
+        self.far = self.create('Lointain', '5000', 200, 6, '45.00')
+        self.create('Brouillon', '1000', 50, 2, '43.70', is_published=False)
+        self.create('Vente', '1000', 50, 2, '43.70', transaction_type='sale')
+        # Construit comme au démarrage, depuis la base de test
+        similar.index.build()
+        self.client = APIClient()
+
+    def create(self, title, price, surface, bedrooms, lat, is_published=True, transaction_type='rent'):
+        return Property.objects.create(
+            owner=self.owner, title=title, price=Decimal(price), surface_area=Decimal(surface),
+            bedrooms=bedrooms, latitude=Decimal(lat), longitude=Decimal('7.26'), address='1 rue',
+            city='Nice', is_published=is_published, transaction_type=transaction_type,
+        )
+
+    def similar(self, k=5):
+        return [p['title'] for p in self.client.get(f'/api/properties/{self.target.pk}/similar/', {'k': k}).json()]
+
+    def test_nearest_published_with_same_transaction(self):
+        self.assertEqual(self.similar(), ['Proche', 'Moyen', 'Lointain'])
+        self.assertEqual(self.similar(k=1), ['Proche'])
+
+    def test_index_follows_committed_writes(self):
+        self.similar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.far.price, self.far.surface_area, self.far.latitude = Decimal('1000'), Decimal('50'), Decimal('43.70')
+            self.far.bedrooms = 2
+            self.far.save()
+            self.near.delete()
+            self.mid.is_published = False
+            self.mid.save()
+        self.assertEqual(self.similar(), ['Lointain'])
+
+        # Sauvegarde annulée : aucune ligne fantôme dans l'index
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            ghost = self.create('Fantôme', '1000', 50, 2, '43.70')
+            raise RuntimeError
+        self.assertIsNone(similar.index._find(ghost.pk))
+
+    def test_deletions_from_other_processes_are_pruned(self):
+        # Sans rappel `on_commit` : l'index ignore la suppression, comme pour un autre processus
+        pk = self.near.pk
+        self.near.delete()
+        self.assertIsNotNone(similar.index._find(pk))
+        self.assertEqual(self.similar(k=2), ['Moyen', 'Lointain'])
+        self.assertIsNone(similar.index._find(pk))
+
+    def test_requests_never_build_the_index(self):
+        similar.index.built, similar.index.synced_at = False, None
+        with patch.object(similar.index, '_refresh_in_background') as refresh:
+            # Repli en base (même transaction, même ville, prix le plus proche) pendant la construction
+            self.assertEqual(self.similar(k=2), ['Proche', 'Moyen'])
+            self.similar()
+        refresh.assert_called_once()
+        similar.index.refresh()
+        self.assertTrue(similar.index.built)
+        self.assertEqual(self.similar(), ['Proche', 'Moyen', 'Lointain'])
+
+
+class PropertySearchTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        self.titled = self.create('Élégant château', 'Grand parc arboré.')
+        self.described = self.create('Maison de maître', 'Ancien château restauré, piscine.')
+        self.create('Studio', 'Proche gare.')
+        self.client = APIClient()
+
+    def create(self, title, description):
+        return Property.objects.create(
+            owner=self.owner, title=title, description=description, price=Decimal('1000'),
+            address='1 rue', city='Lyon', is_published=True,
+        )
+
+    def titles(self, search, **params):
+        cache.clear()
+        return [p['title'] for p in self.client.get('/api/properties/', {'search': search, **params}).json()['results']]
+
+    def test_ranked_and_accent_insensitive(self):
+        self.assertEqual(self.titles('CHATEAU'), ['Élégant château', 'Maison de maître'])
+        self.assertEqual(self.titles('élégant chateau'), ['Élégant château'])
+        self.assertEqual(self.titles('chateau', ordering='created_at'), ['Élégant château', 'Maison de maître'])
+        response = self.client.get('/api/properties/facets/', {'search': 'chateau'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.titled.title = 'Manoir'
+        self.titled.save()
+        self.assertEqual(self.titles('manoir'), ['Manoir'])
+        self.assertEqual(self.titles('elegant'), [])
+        self.described.delete()
+        self.assertEqual(self.titles('chateau'), [])
+
+    def test_falls_back_to_icontains_without_index(self):
+        with patch('apps.properties.filters.supports_full_text', return_value=False):
+            self.assertEqual(self.titles('gare'), ['Studio'])
+
+    def test_cursor_pagination_needs_explicit_ordering(self):
+        response = self.client.get('/api/properties/', {'search': 'chateau', 'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 400)
+        page = self.client.get('/api/properties/', {
+            'search': 'chateau', 'pagination': 'cursor', 'ordering': '-created_at', 'page_size': 1,
+        }).json()
+        self.assertEqual([p['title'] for p in page['results']], ['Maison de maître'])
+        page = self.client.get(page['next']).json()
+        self.assertEqual([p['title'] for p in page['results']], ['Élégant château'])
+        self.assertIsNone(page['next'])
+
+
+class PropertyEtagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        self.property = Property.objects.create(
+            owner=self.owner, title='Loft', price=Decimal('1200'), address='1 rue', city='Lyon', is_published=True,
+        )
+        self.client = APIClient()
+        self.url = f'/api/properties/{self.property.pk}/'
+
+    def etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_etag_is_not_serialized(self):
+        etag = self.etag()
+        cache.clear()
+        with patch.object(PropertySerializer, 'to_representation') as to_representation:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        to_representation.assert_not_called()
+
+    def test_image_and_favorite_changes_change_etag(self):
+        from apps.favorites.models import Favorite
+        etags = [self.etag()]
+        PropertyImage.objects.create(property=self.property, medium_url='https://example.com/a.jpg')
+        refresh_cover(self.property.pk)
+        etags.append(self.etag())
+        self.client.force_authenticate(self.owner)
+        etags.append(self.etag())
+        Favorite.objects.create(user=self.owner, property=self.property)
+        etags.append(self.etag())
+        self.assertEqual(len(set(etags)), 4)
@@ -3,6 +3,14 @@ from . import views
 
 urlpatterns = [
     path('', views.PropertyListCreateView.as_view(), name='property-list'),
+    path('facets/', views.PropertyFacetsView.as_view(), name='property-facets'),
+    path('clusters/', views.PropertyClusterView.as_view(), name='property-clusters'),
+    path('autocomplete/', views.autocomplete_locations, name='property-autocomplete'),
+    path('export/', views.PropertyExportView.as_view(), name='property-export'),
+    path('import/', views.import_properties, name='property-import'),
+    path('import/<uuid:pk>/', views.PropertyImportDetailView.as_view(), name='property-import-detail'),
     path('<uuid:pk>/', views.PropertyDetailView.as_view(), name='property-detail'),
+    path('<uuid:pk>/similar/', views.PropertySimilarView.as_view(), name='property-similar'),
     path('<uuid:pk>/images/', views.upload_property_image, name='property-images'),
+    path('<uuid:pk>/images/reorder/', views.reorder_property_images, name='property-images-reorder'),
 ]
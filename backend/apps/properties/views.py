@@ -1,24 +1,128 @@
+import hashlib
+import io
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import generics, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
-from .models import Property, PropertyImage
-from .serializers import PropertySerializer, PropertyCreateSerializer, PropertyImageSerializer
+from apps.reservations.filters import STAY_PARAMS, filter_available
+from .autocomplete import MAX_SUGGESTIONS, suggest
+from .cache import NON_FILTER_PARAMS, RESPONSE_CACHE_TIMEOUT, availability_version, cache_key, tile_version
+from .clusters import compute_clusters
+from .exports import EXPORT_FORMATS, stream_export
+from .facets import compute_facets
+from .filters import PropertyOrderingFilter, PropertySearchFilter
+from .geo import filter_by_location, parse_tile
+from .images import enqueue_images, reorder_images
+from .imports import ImportFileError, run_import
+from .models import Property, PropertyImage, PropertyImport
+from .pagination import PropertyPagination
+from .similar import MAX_SIMILAR, similar_properties
+from .serializers import (
+    PropertySerializer, PropertyCardSerializer, PropertyCreateSerializer,
+    PropertyImageSerializer, PropertyImportSerializer, card_queryset, overlay_favorites,
+)
 
 
-class PropertyListCreateView(generics.ListCreateAPIView):
-    queryset = Property.objects.filter(is_published=True).prefetch_related('images', 'owner__profile')
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+class SharedCacheMixin:
+    """
+    Met en cache la réponse GET anonyme, indexée par la query string
+    normalisée et la version des biens (invalidée par signaux). Pour un
+    utilisateur connecté, `is_favorited` est superposé à la réponse en cache.
+    """
+    cache_prefix = None
+
+    def get_cache_version(self):
+        """Version des entrées en cache ; `None` = version globale des biens."""
+        return None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method == 'GET':
+            context['favorites_user'] = None
+        return context
+
+    def cached_response(self, build, extra=''):
+        key = cache_key(
+            self.cache_prefix, self.request.query_params, ignore=(),
+            extra=f'{self.request.get_host()}{extra}', version=self.get_cache_version(),
+        )
+        data = cache.get(key)
+        if data is None:
+            data = build().data
+            cache.set(key, data, RESPONSE_CACHE_TIMEOUT)
+        if self.request.user.is_authenticated:
+            items = data['results'] if 'results' in data else [data]
+            overlay_favorites(items, self.request.user)
+        return Response(data)
+
+
+# Bornes de recherche : paramètre -> lookup (prix en euros, toutes devises confondues)
+RANGE_PARAMS = {
+    'min_price': 'price_eur__gte',
+    'max_price': 'price_eur__lte',
+    'min_price_per_sqm': 'price_per_sqm__gte',
+    'max_price_per_sqm': 'price_per_sqm__lte',
+    'bedrooms_min': 'bedrooms__gte',
+}
+
+
+def _parse_decimal(params, name):
+    try:
+        value = Decimal(params[name])
+    except InvalidOperation:
+        raise ValidationError({name: 'Valeur numérique attendue.'})
+    if not value.is_finite():
+        raise ValidationError({name: 'Valeur numérique attendue.'})
+    return value
+
+
+class PropertyFilterMixin:
+    """Filtres de recherche des biens publiés, partagés par la liste et les facettes."""
+    queryset = Property.objects.filter(is_published=True)
+    filter_backends = [DjangoFilterBackend, PropertySearchFilter, PropertyOrderingFilter]
     filterset_fields = ['property_type', 'transaction_type', 'city', 'country']
     search_fields = ['title', 'description', 'city', 'address']
-    ordering_fields = ['price', 'created_at', 'surface_area']
+    ordering_fields = ['price', 'price_eur', 'created_at', 'surface_area', 'price_per_sqm']
     ordering = ['-created_at']
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        params = self.request.query_params
+        # Valeur invalide : 400 plutôt qu'une erreur de conversion en base
+        bounds = {
+            lookup: _parse_decimal(params, name)
+            for name, lookup in RANGE_PARAMS.items() if params.get(name)
+        }
+        if bounds:
+            qs = qs.filter(**bounds)
+        qs = filter_available(qs, self.request.query_params)
+        return filter_by_location(qs, self.request.query_params)
+
+    def availability_cache_extra(self):
+        """Suffixe de clé de cache : les recherches par dates suivent aussi les réservations."""
+        if STAY_PARAMS & set(self.request.query_params):
+            return f':stay{availability_version()}'
+        return ''
+
+
+class PropertyListCreateView(SharedCacheMixin, PropertyFilterMixin, generics.ListCreateAPIView):
+    pagination_class = PropertyPagination
+    cache_prefix = 'list'
+
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return PropertyCreateSerializer
-        return PropertySerializer
+        return PropertyCardSerializer
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -26,21 +130,122 @@ class PropertyListCreateView(generics.ListCreateAPIView):
         return [permissions.AllowAny()]
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
-        bedrooms_min = self.request.query_params.get('bedrooms_min')
-        if min_price:
-            qs = qs.filter(price__gte=min_price)
-        if max_price:
-            qs = qs.filter(price__lte=max_price)
-        if bedrooms_min:
-            qs = qs.filter(bedrooms__gte=bedrooms_min)
-        return qs
+        return card_queryset(super().get_queryset())
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            partial(super().list, request, *args, **kwargs), extra=self.availability_cache_extra(),
+        )
+
+
+class PropertyFacetsView(PropertyFilterMixin, generics.GenericAPIView):
+    """Compteurs par facette pour les filtres courants de la liste des biens."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        key = cache_key('facets', request.query_params, extra=self.availability_cache_extra())
+        data = cache.get(key)
+        if data is None:
+            data = compute_facets(self.filter_queryset(self.get_queryset()))
+            cache.set(key, data, RESPONSE_CACHE_TIMEOUT)
+        return Response(data)
+
 
+class PropertyClusterView(PropertyFilterMixin, generics.GenericAPIView):
+    """
+    Clusters de marqueurs d'une tuile de carte (`?z=&x=&y=`), avec les mêmes
+    filtres que la liste. Cache par tuile, invalidé par les écritures sur
+    les biens situés dans la tuile.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        z, x, y = parse_tile(request.query_params)
+        key = cache_key(
+            'tile', request.query_params, ignore=NON_FILTER_PARAMS | {'z', 'x', 'y'},
+            extra=f'{z}/{x}/{y}{self.availability_cache_extra()}', version=tile_version(z, x, y),
+        )
+        data = cache.get(key)
+        if data is None:
+            data = compute_clusters(self.filter_queryset(self.get_queryset()), z, x, y)
+            cache.set(key, data, RESPONSE_CACHE_TIMEOUT)
+        return Response(data)
+
+
+class PropertyExportView(PropertyFilterMixin, generics.GenericAPIView):
+    """
+    Export complet des biens publiés (`?output_format=csv|ndjson`), avec les
+    filtres de la liste, diffusé ligne à ligne sans pagination.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    ordering = ['created_at', 'id']
+
+    def get(self, request):
+        output_format = request.query_params.get('output_format', 'csv')
+        if output_format not in EXPORT_FORMATS:
+            return Response({'error': 'Format non supporté'}, status=400)
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            stream_export(queryset, output_format), content_type=EXPORT_FORMATS[output_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="properties.{output_format}"'
+        return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def autocomplete_locations(request):
+    """Suggestions de villes, codes postaux et adresses pour `?q=` (index en mémoire)."""
+    try:
+        limit = min(int(request.query_params.get('limit', 8)), MAX_SUGGESTIONS)
+    except ValueError:
+        return Response({'error': 'limit doit être un entier'}, status=400)
+    return Response(suggest(request.query_params.get('q', ''), max(limit, 1)))
 
-class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Property.objects.all()
+
+class PropertySimilarView(generics.ListAPIView):
+    """`k` biens publiés les plus proches (prix, surface, pièces, position, type)."""
+    serializer_class = PropertyCardSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+
+    def get_queryset(self):
+        try:
+            target = Property.objects.get(pk=self.kwargs['pk'])
+        except Property.DoesNotExist:
+            raise NotFound('Bien introuvable')
+        try:
+            k = min(int(self.request.query_params.get('k', 6)), MAX_SIMILAR)
+        except ValueError:
+            raise ValidationError({'k': 'Entier attendu.'})
+        return similar_properties(
+            target, max(k, 1), card_queryset(Property.objects.filter(is_published=True)),
+        )
+
+
+def property_etag(request, pk):
+    """
+    ETag du détail sans sérialisation : `updated_at` du bien (également mis à
+    jour par les changements d'images), propriétaire affiché et état favori
+    de l'utilisateur courant.
+    """
+    parts = Property.objects.filter(pk=pk).values_list(
+        'updated_at', 'owner__username', 'owner__email', 'owner__first_name',
+        'owner__last_name', 'owner__profile__updated_at',
+    ).first()
+    if parts is None:
+        return None
+    if request.user.is_authenticated:
+        parts += (request.user.favorites.filter(property_id=pk).exists(),)
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+@method_decorator(condition(etag_func=property_etag), name='get')
+class PropertyDetailView(SharedCacheMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Property.objects.select_related('owner__profile').prefetch_related(
+        Prefetch('images', queryset=PropertyImage.objects.filter(status='ready')),
+    )
+    cache_prefix = 'detail'
 
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -52,6 +257,11 @@ class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]
 
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            partial(super().retrieve, request, *args, **kwargs), extra=str(kwargs['pk']),
+        )
+
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
         if instance.owner != request.user:
@@ -65,22 +275,87 @@ class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
         return super().destroy(request, *args, **kwargs)
 
 
-@api_view(['POST'])
+@api_view(['GET', 'POST'])
 @permission_classes([permissions.IsAuthenticated])
 def upload_property_image(request, pk):
+    """
+    POST : accepte les images et répond immédiatement (statut `pending`) ;
+    le traitement est fait par le worker `process_property_images`.
+    GET : état de traitement des images du bien.
+    """
     try:
         property_obj = Property.objects.get(pk=pk, owner=request.user)
     except Property.DoesNotExist:
         return Response({'error': 'Bien introuvable'}, status=404)
 
+    if request.method == 'GET':
+        return Response(PropertyImageSerializer(property_obj.images.all(), many=True).data)
+
     images = request.FILES.getlist('images')
     if not images:
         return Response({'error': 'Aucune image fournie'}, status=400)
 
-    created = []
-    for i, img in enumerate(images):
-        is_cover = (i == 0 and not property_obj.images.filter(is_cover=True).exists())
-        pi = PropertyImage.objects.create(property=property_obj, image=img, is_cover=is_cover, order=i)
-        created.append(PropertyImageSerializer(pi).data)
+    created = enqueue_images(property_obj, images)
+    return Response(PropertyImageSerializer(created, many=True).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def reorder_property_images(request, pk):
+    """Réordonne les images (`images`: liste d'ids) et choisit la couverture (`cover`)."""
+    try:
+        property_obj = Property.objects.get(pk=pk, owner=request.user)
+    except Property.DoesNotExist:
+        return Response({'error': 'Bien introuvable'}, status=404)
+
+    ids = request.data.get('images', [])
+    cover = request.data.get('cover')
+    known = set(property_obj.images.values_list('pk', flat=True))
+    if not isinstance(ids, list) or not all(isinstance(i, int) and i in known for i in ids):
+        return Response({'error': 'Liste d\'images invalide'}, status=400)
+    if len(set(ids)) != len(ids):
+        return Response({'error': 'Image présente plusieurs fois dans la liste'}, status=400)
+    if cover is not None and cover not in known:
+        return Response({'error': 'Image de couverture invalide'}, status=400)
 
-    return Response(created, status=status.HTTP_201_CREATED)
+    reorder_images(property_obj, ids, cover)
+    return Response(PropertyImageSerializer(property_obj.images.all(), many=True).data)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@parser_classes([MultiPartParser])
+def import_properties(request):
+    """Import en masse (fichier CSV ou NDJSON) ; `resume=<id>` reprend un import interrompu."""
+    upload = request.FILES.get('file')
+    if not upload:
+        return Response({'error': 'Aucun fichier fourni'}, status=400)
+
+    job = None
+    if request.data.get('resume'):
+        try:
+            job = PropertyImport.objects.get(pk=request.data['resume'], owner=request.user)
+        except (PropertyImport.DoesNotExist, ValueError, DjangoValidationError):
+            return Response({'error': 'Import introuvable'}, status=404)
+        input_format = job.input_format
+    else:
+        input_format = request.data.get('input_format') or (
+            'ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv'
+        )
+        if input_format not in dict(PropertyImport.FORMAT_CHOICES):
+            return Response({'error': 'Format non supporté'}, status=400)
+
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        job = run_import(request.user, stream, input_format, source_name=upload.name, job=job)
+    except ImportFileError as exc:
+        return Response({'error': str(exc), 'import': PropertyImportSerializer(exc.job).data}, status=400)
+    return Response(PropertyImportSerializer(job).data, status=status.HTTP_201_CREATED)
+
+
+class PropertyImportDetailView(generics.RetrieveAPIView):
+    serializer_class = PropertyImportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return PropertyImport.objects.filter(owner=self.request.user)
@@ -0,0 +1,314 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from apps.properties.cache import calendar_version
+from apps.properties.models import Property
+from .models import Availability, AvailabilityCalendar, BlockedDate, Reservation
+from .pricing import night_price_labels, window_indexes
+
+ACTIVE_STATUSES = ('pending', 'confirmed', 'paid')
+BOOKED_STATUSES = ('confirmed', 'paid')
+# Décalage de l'origine vers aujourd'hui au-delà de cet écart (nuits passées oubliées)
+REBASE_AFTER_DAYS = 31
+BITMAPS = ('booked', 'pending', 'blocked')
+
+# Codes d'état d'une nuit dans les réponses du calendrier
+NIGHT_FREE = 'f'        # réservable (plage active)
+NIGHT_BOOKED = 'r'      # réservation confirmée ou payée
+NIGHT_PENDING = 'p'     # réservation en attente
+NIGHT_BLOCKED = 'b'     # bloquée par le propriétaire
+NIGHT_CLOSED = 'x'      # passée ou hors de toute plage
+CALENDAR_CACHE_TIMEOUT = 24 * 3600
+
+
+def _decode(data):
+    return int.from_bytes(bytes(data or b''), 'little')
+
+
+def _encode(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def span_mask(origin, start, end=None):
+    """
+    Bits des nuits [start, end) (`end=None` : sans borne) ; celles
+    antérieures à `origin` sont ignorées.
+    """
+    low = max((start - origin).days, 0)
+    if end is None:
+        return -(1 << low)
+    high = (end - origin).days
+    if high <= low:
+        return 0
+    return ((1 << (high - low)) - 1) << low
+
+
+def _window(availability):
+    return {
+        'id': availability.pk,
+        'start_date': availability.start_date,
+        'end_date': availability.end_date,
+        'price_per_night': availability.price_per_night,
+        'min_nights': availability.min_nights,
+        'max_nights': availability.max_nights,
+    }
+
+
+def _load_window(data):
+    return {
+        **data,
+        'start_date': date.fromisoformat(data['start_date']),
+        'end_date': date.fromisoformat(data['end_date']),
+        'price_per_night': Decimal(data['price_per_night']),
+    }
+
+
+def _dump_window(window):
+    return {
+        **window,
+        'start_date': window['start_date'].isoformat(),
+        'end_date': window['end_date'].isoformat(),
+        'price_per_night': str(window['price_per_night']),
+    }
+
+
+class NightCalendar:
+    """Calendrier décodé d'un bien ; `save()` réécrit la ligne (sous verrou)."""
+
+    def __init__(self, row):
+        self.row = row
+        self.origin = row.origin
+        for name in BITMAPS:
+            setattr(self, name, _decode(getattr(row, name)))
+        self.windows = [_load_window(w) for w in row.windows]
+
+    @classmethod
+    def build(cls, property_id, today=None):
+        """Calendrier complet depuis la base, à partir d'aujourd'hui."""
+        origin = today or date.today()
+        row = AvailabilityCalendar(linked_property_id=property_id, origin=origin)
+        calendar = cls(row)
+        calendar.refresh_nights(origin, None)
+        calendar.refresh_windows()
+        return calendar
+
+    def refresh_nights(self, start, end):
+        """Recalcule les trois bitmaps sur [start, end) (`end=None` : sans borne)."""
+        reservations = Reservation.objects.filter(
+            linked_property_id=self.row.linked_property_id,
+            status__in=ACTIVE_STATUSES, check_out__gt=start,
+        )
+        blocked = BlockedDate.objects.filter(linked_property_id=self.row.linked_property_id, date__gte=start)
+        if end is not None:
+            reservations = reservations.filter(check_in__lt=end)
+            blocked = blocked.filter(date__lt=end)
+        kept = ~span_mask(self.origin, start, end)
+        for name in BITMAPS:
+            setattr(self, name, getattr(self, name) & kept)
+        for check_in, check_out, status in reservations.values_list('check_in', 'check_out', 'status'):
+            mask = span_mask(self.origin, check_in, check_out) & span_mask(self.origin, start, end)
+            if status in BOOKED_STATUSES:
+                self.booked |= mask
+            else:
+                self.pending |= mask
+        for night in blocked.values_list('date', flat=True):
+            self.blocked |= span_mask(self.origin, night, night + timedelta(days=1))
+
+    def refresh_windows(self):
+        self.windows = [
+            _window(availability) for availability in Availability.objects.filter(
+                linked_property_id=self.row.linked_property_id, is_active=True, end_date__gte=self.origin,
+            ).order_by('start_date', 'pk')
+        ]
+
+    def save(self, today=None):
+        today = today or date.today()
+        shift = (today - self.origin).days
+        if shift > REBASE_AFTER_DAYS:
+            for name in BITMAPS:
+                setattr(self, name, getattr(self, name) >> shift)
+            self.origin = today
+            self.windows = [w for w in self.windows if w['end_date'] >= today]
+        row = self.row
+        row.origin = self.origin
+        for name in BITMAPS:
+            setattr(row, name, _encode(getattr(self, name)))
+        row.windows = [_dump_window(w) for w in self.windows]
+        row.save()
+
+    # ─── Lecture ───
+
+    def conflict(self, check_in, check_out, today=None):
+        """
+        `None` si toutes les nuits [check_in, check_out) sont réservables,
+        sinon la raison : 'past', 'reserved' ou 'blocked'.
+        """
+        if check_in < (today or date.today()) or check_in < self.origin:
+            return 'past'
+        mask = span_mask(self.origin, check_in, check_out)
+        if (self.booked | self.pending) & mask:
+            return 'reserved'
+        if self.blocked & mask:
+            return 'blocked'
+        return None
+
+    def nights(self, name, start, end=None):
+        """Dates des nuits marquées dans le bitmap `name` sur [start, end)."""
+        bits = getattr(self, name) & span_mask(self.origin, start, end)
+        found = []
+        while bits:
+            low = bits & -bits
+            found.append(self.origin + timedelta(days=low.bit_length() - 1))
+            bits ^= low
+        return found
+
+    def night_states(self, start, end, today=None):
+        """Un code `NIGHT_*` par nuit de [start, end)."""
+        today = today or date.today()
+        covered = window_indexes(self.windows, start, end) >= 0
+        states = []
+        for offset in range((end - start).days):
+            night = start + timedelta(days=offset)
+            bit = 1 << (night - self.origin).days if night >= self.origin else 0
+            if night < today or not bit:
+                states.append(NIGHT_CLOSED)
+            elif self.booked & bit:
+                states.append(NIGHT_BOOKED)
+            elif self.pending & bit:
+                states.append(NIGHT_PENDING)
+            elif self.blocked & bit:
+                states.append(NIGHT_BLOCKED)
+            elif covered[offset]:
+                states.append(NIGHT_FREE)
+            else:
+                states.append(NIGHT_CLOSED)
+        return ''.join(states)
+
+    def runs(self, name, start, end=None):
+        """Séjours contigus (début, fin exclusive) du bitmap `name` sur [start, end)."""
+        bits = getattr(self, name) & span_mask(self.origin, start, end)
+        found = []
+        while bits:
+            first = (bits & -bits).bit_length() - 1
+            shifted = bits >> first
+            # Nombre de bits à 1 consécutifs à partir de `first`
+            length = (~shifted & (shifted + 1)).bit_length() - 1
+            found.append((self.origin + timedelta(days=first), self.origin + timedelta(days=first + length)))
+            bits &= ~(((1 << length) - 1) << first)
+        return found
+
+
+def load_calendar(property_id, lock=False):
+    """
+    Calendrier du bien, construit et enregistré au premier accès. Renvoie
+    `(calendrier, créé)`, ou `(None, False)` si le bien n'existe pas ;
+    `lock=True` verrouille la ligne (PostgreSQL).
+    """
+    rows = AvailabilityCalendar.objects.select_for_update() if lock else AvailabilityCalendar.objects
+    row = rows.filter(pk=property_id).first()
+    if row is not None:
+        return NightCalendar(row), False
+    if not Property.objects.filter(pk=property_id).exists():
+        return None, False
+    calendar = NightCalendar.build(property_id)
+    try:
+        with transaction.atomic():
+            calendar.save()
+    except IntegrityError:
+        # Construit en parallèle par une autre requête
+        return NightCalendar(rows.get(pk=property_id)), False
+    return calendar, True
+
+
+def lock_calendar(property_id):
+    """
+    Calendrier du bien sous verrou d'écriture, à appeler en début de
+    transaction : `SELECT ... FOR UPDATE` sur PostgreSQL ; SQLite n'ayant
+    pas de verrou de ligne, une écriture préalable y prend le verrou de la
+    base avant toute lecture (les réservations concurrentes attendent).
+    """
+    if not connection.features.has_select_for_update:
+        AvailabilityCalendar.objects.filter(pk=property_id).update(updated_at=timezone.now())
+    calendar, _ = load_calendar(property_id, lock=True)
+    return calendar
+
+
+def refresh_calendar(property_id, start=None, end=None, windows=False, create=True):
+    """
+    Répercute une écriture : nuits [start, end) et/ou plages. Appelé dans la
+    transaction de l'écriture, un calendrier absent est construit (écriture
+    comprise) ; `create=False` ne met à jour qu'un calendrier existant.
+    """
+    with transaction.atomic():
+        if not create:
+            if not AvailabilityCalendar.objects.filter(pk=property_id).exists():
+                return
+        calendar, created = load_calendar(property_id, lock=True)
+        if calendar is None or created:
+            return
+        if start is not None:
+            calendar.refresh_nights(start, end)
+        if windows:
+            calendar.refresh_windows()
+        calendar.save()
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _month_summary(calendar, month, today, prices):
+    end = next_month(month)
+    return {
+        'states': calendar.night_states(month, end, today),
+        'prices': prices,
+        'windows': [
+            _dump_window(w) for w in calendar.windows
+            if w['start_date'] < end and w['end_date'] > month
+        ],
+    }
+
+
+def calendar_months(property_id, start, end, today=None):
+    """
+    Résumés mensuels (états et tarifs nuit par nuit, plages) couvrant
+    [start, end), lus en cache en un seul appel ; seuls les mois absents
+    chargent le calendrier. La clé suit `calendar_version` (incrémentée à
+    chaque écriture du bien) et, pour les mois entamés, la date du jour.
+    Renvoie None si le bien n'existe pas.
+    """
+    today = today or date.today()
+    version = calendar_version(property_id)
+    months, month = [], month_start(start)
+    while month < end:
+        months.append(month)
+        month = next_month(month)
+
+    def key(month):
+        suffix = f':{today}' if month <= today else ''
+        return f'reservations:calendar:{property_id}:v{version}:{month:%Y-%m}{suffix}'
+
+    found = cache.get_many([key(m) for m in months])
+    missing = [m for m in months if key(m) not in found]
+    if missing:
+        calendar, _ = load_calendar(property_id)
+        if calendar is None:
+            return None
+        # Tarifs de tous les mois manquants en une seule passe vectorisée
+        first = missing[0]
+        prices = night_price_labels(calendar.windows, first, next_month(missing[-1]))
+        computed = {
+            key(m): _month_summary(
+                calendar, m, today, prices[(m - first).days:(next_month(m) - first).days],
+            )
+            for m in missing
+        }
+        cache.set_many(computed, CALENDAR_CACHE_TIMEOUT)
+        found.update(computed)
+    return [(m, found[key(m)]) for m in months]
@@ -0,0 +1,53 @@
+import threading
+import time
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+from .views import ReservationCreateView
+
+
+def book_concurrently(property_id, guests, stays):
+    """
+    Soumet les séjours `stays` ([(check_in, check_out)]) à la vue de
+    réservation depuis un thread par voyageur (une connexion chacun), tous
+    libérés en même temps. Renvoie les codes HTTP obtenus et la durée en
+    secondes.
+    """
+    view = ReservationCreateView.as_view()
+    factory = APIRequestFactory()
+    statuses = []
+    barrier = threading.Barrier(len(guests) + 1)
+
+    def run(guest, batch):
+        barrier.wait()
+        try:
+            for check_in, check_out in batch:
+                request = factory.post('/api/reservations/create/', {
+                    'linked_property': str(property_id),
+                    'check_in': check_in.isoformat(), 'check_out': check_out.isoformat(),
+                }, format='json')
+                force_authenticate(request, user=guest)
+                statuses.append(view(request).status_code)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=run, args=(guest, stays[i::len(guests)]))
+        for i, guest in enumerate(guests)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return statuses, time.perf_counter() - started
+
+
+def double_booked_nights(reservations):
+    """Nuits réservées plus d'une fois parmi `reservations` ((check_in, check_out))."""
+    seen, doubled = set(), set()
+    for check_in, check_out in reservations:
+        for i in range((check_out - check_in).days):
+            day = check_in.toordinal() + i
+            (doubled if day in seen else seen).add(day)
+    return doubled
@@ -0,0 +1,66 @@
+from datetime import date
+from django.db.models import Exists, OuterRef, Q, Subquery
+from rest_framework.exceptions import ValidationError
+from .availability import ACTIVE_STATUSES
+from .models import Availability, BlockedDate, Reservation
+
+STAY_PARAMS = frozenset({'check_in', 'check_out', 'guests'})
+
+
+def _parse_date(params, name):
+    try:
+        return date.fromisoformat(params[name])
+    except (KeyError, ValueError):
+        raise ValidationError({name: 'Date attendue (AAAA-MM-JJ).'})
+
+
+def filter_available(qs, params):
+    """
+    Applique `?check_in=&check_out=&guests=` : biens réservables sur tout le
+    séjour, selon les mêmes règles que le devis (`quote_stay`) : chaque nuit
+    couverte par une plage active (éventuellement plusieurs plages
+    contiguës), durée admise par la plage d'arrivée, aucune réservation
+    active ni date bloquée. Une seule requête : sous-requêtes et
+    anti-jointures (`EXISTS` / `NOT EXISTS`) corrélées au bien.
+    """
+    if params.get('guests'):
+        try:
+            guests = int(params['guests'])
+        except ValueError:
+            raise ValidationError({'guests': 'Entier attendu.'})
+        if guests < 1:
+            raise ValidationError({'guests': 'Doit être au moins 1.'})
+        qs = qs.filter(Q(max_guests__isnull=True) | Q(max_guests__gte=guests))
+
+    if not (params.get('check_in') or params.get('check_out')):
+        return qs
+    check_in = _parse_date(params, 'check_in')
+    check_out = _parse_date(params, 'check_out')
+    if check_out <= check_in:
+        raise ValidationError({'check_out': 'Doit être après le check-in.'})
+
+    windows = Availability.objects.filter(linked_property=OuterRef('pk'), is_active=True)
+    # Plage d'arrivée : la première couvrant la nuit du check-in, comme `window_indexes`
+    arrival = windows.filter(start_date__lte=check_in, end_date__gt=check_in).order_by('start_date', 'pk')
+    # Trou dans la couverture : une plage s'arrête pendant le séjour sans
+    # qu'aucune autre ne couvre la nuit suivante
+    continued = Availability.objects.filter(
+        linked_property=OuterRef(OuterRef('pk')), is_active=True,
+        start_date__lte=OuterRef('end_date'), end_date__gt=OuterRef('end_date'),
+    )
+    gap = windows.filter(end_date__gt=check_in, end_date__lt=check_out).filter(~Exists(continued))
+    reserved = Reservation.objects.filter(
+        linked_property=OuterRef('pk'), status__in=ACTIVE_STATUSES,
+        check_in__lt=check_out, check_out__gt=check_in,
+    )
+    blocked = BlockedDate.objects.filter(
+        linked_property=OuterRef('pk'), date__gte=check_in, date__lt=check_out,
+    )
+    nights = (check_out - check_in).days
+    return qs.alias(
+        arrival_min_nights=Subquery(arrival.values('min_nights')[:1]),
+        arrival_max_nights=Subquery(arrival.values('max_nights')[:1]),
+    ).filter(
+        ~Exists(gap), ~Exists(reserved), ~Exists(blocked),
+        arrival_min_nights__lte=nights, arrival_max_nights__gte=nights,
+    )
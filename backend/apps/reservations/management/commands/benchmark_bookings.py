@@ -0,0 +1,59 @@
+import random
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from apps.properties.models import Property
+from apps.reservations.benchmark import book_concurrently, double_booked_nights
+from apps.reservations.models import Availability, Reservation
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit de réservations simultanées sur un bien jetable "
+        "(créé puis supprimé) et vérifie qu'aucune nuit n'est réservée deux fois"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=320)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--force', action='store_true', help="Autorise l'exécution hors DEBUG")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Écrit dans la base : réservé au développement (DEBUG) sauf --force")
+        tag = uuid.uuid4().hex[:8]
+        today = date.today()
+        rng = random.Random(options['seed'])
+        stays = []
+        for _ in range(options['attempts']):
+            start = today + timedelta(days=rng.randint(1, 60))
+            stays.append((start, start + timedelta(days=rng.randint(1, 4))))
+
+        host = User.objects.create_user(f'benchmark-{tag}-hote')
+        guests = [User.objects.create_user(f'benchmark-{tag}-{i}') for i in range(options['threads'])]
+        try:
+            prop = Property.objects.create(
+                owner=host, title='Benchmark', price=Decimal('200'), address='-', city='-',
+            )
+            Availability.objects.create(
+                linked_property=prop, start_date=today, end_date=today + timedelta(days=90),
+                price_per_night=Decimal('150'),
+            )
+            statuses, elapsed = book_concurrently(prop.pk, guests, stays)
+            doubled = double_booked_nights(
+                Reservation.objects.filter(linked_property=prop).values_list('check_in', 'check_out')
+            )
+        finally:
+            User.objects.filter(pk__in=[host.pk, *(g.pk for g in guests)]).delete()
+
+        self.stdout.write(
+            f'{len(statuses)} tentatives en {elapsed:.2f} s : {len(statuses) / elapsed:.1f} réservations/s '
+            f'({statuses.count(201)} acceptées, {statuses.count(409)} refusées)'
+        )
+        if doubled:
+            raise CommandError(f'{len(doubled)} nuit(s) réservée(s) deux fois')
+        self.stdout.write(self.style.SUCCESS('Aucune nuit réservée deux fois'))
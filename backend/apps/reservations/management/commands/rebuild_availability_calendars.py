@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from apps.reservations.models import AvailabilityCalendar
+
+
+class Command(BaseCommand):
+    help = "Supprime les calendriers de disponibilité ; ils sont reconstruits au prochain accès"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--property', help="Limite à ce bien (UUID)")
+
+    def handle(self, *args, **options):
+        calendars = AvailabilityCalendar.objects.all()
+        if options['property']:
+            calendars = calendars.filter(pk=options['property'])
+        count, _ = calendars.delete()
+        self.stdout.write(self.style.SUCCESS(f'{count} calendrier(s) invalidé(s)'))
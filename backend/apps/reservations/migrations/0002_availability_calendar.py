@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0011_price_eur'),
+        ('reservations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityCalendar',
+            fields=[
+                ('linked_property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='availability_calendar', serialize=False, to='properties.property')),
+                ('origin', models.DateField()),
+                ('booked', models.BinaryField(default=b'', help_text='Réservations confirmées ou payées')),
+                ('pending', models.BinaryField(default=b'', help_text='Réservations en attente')),
+                ('blocked', models.BinaryField(default=b'', help_text='Dates bloquées par le propriétaire')),
+                ('windows', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
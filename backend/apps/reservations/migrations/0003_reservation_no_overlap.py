@@ -0,0 +1,58 @@
+import apps.reservations.constraints
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import IntegrityError, migrations, models
+from django.db.models import Exists, OuterRef
+
+ACTIVE_STATUSES = ['pending', 'confirmed', 'paid']
+REPORTED_OVERLAPS = 20
+
+
+def overlapping_reservations(Reservation, using):
+    """Réservations actives partageant au moins une nuit avec une autre réservation active du bien."""
+    active = Reservation.objects.using(using).filter(status__in=ACTIVE_STATUSES)
+    clash = active.filter(
+        linked_property=OuterRef('linked_property'),
+        check_in__lt=OuterRef('check_out'), check_out__gt=OuterRef('check_in'),
+    ).exclude(pk=OuterRef('pk'))
+    return active.filter(Exists(clash)).order_by('linked_property_id', 'check_in', 'pk')
+
+
+def check_no_overlaps(apps, schema_editor):
+    """
+    PostgreSQL uniquement (seule base où la contrainte est posée) : refuse de
+    poursuivre tant que des réservations actives se chevauchent, en listant
+    les séjours à annuler ou corriger plutôt que d'échouer sur l'ALTER TABLE.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Reservation = apps.get_model('reservations', 'Reservation')
+    rows = list(
+        overlapping_reservations(Reservation, schema_editor.connection.alias)
+        .values_list('pk', 'linked_property_id', 'check_in', 'check_out')[:REPORTED_OVERLAPS + 1]
+    )
+    if rows:
+        lines = [f'  {pk} (bien {prop}, {check_in} → {check_out})' for pk, prop, check_in, check_out in rows]
+        if len(rows) > REPORTED_OVERLAPS:
+            lines[-1] = '  ...'
+        raise IntegrityError(
+            'Réservations actives qui se chevauchent ; les annuler ou corriger avant '
+            "d'ajouter la contrainte reservation_no_overlap :\n" + '\n'.join(lines)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0002_availability_calendar'),
+    ]
+
+    operations = [
+        # `btree_gist` : égalité sur le bien dans un index GiST (sans effet hors PostgreSQL)
+        BtreeGistExtension(),
+        migrations.RunPython(check_no_overlaps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=apps.reservations.constraints.PostgresExclusionConstraint(condition=models.Q(('status__in', ['pending', 'confirmed', 'paid'])), expressions=[('linked_property', '='), (apps.reservations.constraints.DateRange('check_in', 'check_out', django.contrib.postgres.fields.ranges.RangeBoundary()), '&&')], name='reservation_no_overlap'),
+        ),
+    ]
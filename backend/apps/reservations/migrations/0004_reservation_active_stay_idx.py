@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-18 01:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0012_property_max_guests'),
+        ('reservations', '0003_reservation_no_overlap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'confirmed', 'paid'])), fields=['linked_property', 'check_in', 'check_out'], name='reservation_active_stay_idx'),
+        ),
+    ]
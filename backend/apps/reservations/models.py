@@ -1,7 +1,9 @@
 import uuid
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.fields import RangeBoundary, RangeOperators
 from django.core.exceptions import ValidationError
+from .constraints import DateRange, PostgresExclusionConstraint
 
 
 class Availability(models.Model):
@@ -65,6 +67,24 @@ class Reservation(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Anti-jointure de la recherche par dates (voir `filters.py`)
+            models.Index(
+                fields=['linked_property', 'check_in', 'check_out'], name='reservation_active_stay_idx',
+                condition=models.Q(status__in=['pending', 'confirmed', 'paid']),
+            ),
+        ]
+        constraints = [
+            # Deux séjours actifs d'un même bien ne partagent aucune nuit (PostgreSQL)
+            PostgresExclusionConstraint(
+                name='reservation_no_overlap',
+                expressions=[
+                    ('linked_property', RangeOperators.EQUAL),
+                    (DateRange('check_in', 'check_out', RangeBoundary()), RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(status__in=['pending', 'confirmed', 'paid']),
+            ),
+        ]
 
     def clean(self):
         if self.check_in and self.check_out and self.check_in >= self.check_out:
@@ -91,3 +111,25 @@ class BlockedDate(models.Model):
     class Meta:
         unique_together = ('linked_property', 'date')
         ordering = ['date']
+
+
+class AvailabilityCalendar(models.Model):
+    """
+    Nuits d'un bien sous forme de bitmaps (bit i = nuit `origin + i`) et
+    plages de disponibilité actives, maintenues par signaux (voir
+    `availability.py`) : une seule lecture répond aux questions de
+    disponibilité.
+    """
+    linked_property = models.OneToOneField(
+        'properties.Property', on_delete=models.CASCADE, primary_key=True,
+        related_name='availability_calendar',
+    )
+    origin = models.DateField()
+    booked = models.BinaryField(default=b'', help_text="Réservations confirmées ou payées")
+    pending = models.BinaryField(default=b'', help_text="Réservations en attente")
+    blocked = models.BinaryField(default=b'', help_text="Dates bloquées par le propriétaire")
+    windows = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Calendrier de {self.linked_property_id} depuis {self.origin}"
@@ -0,0 +1,90 @@
+from decimal import ROUND_HALF_UP, Decimal
+import numpy as np
+
+SERVICE_FEE_RATE = Decimal('0.05')
+CENTS = Decimal('0.01')
+
+
+class QuoteError(Exception):
+    """Séjour non tarifable : `reason` ('past', 'reserved', 'blocked', 'uncovered', 'min_nights', 'max_nights')."""
+
+    def __init__(self, reason, limit=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.limit = limit
+
+
+def window_indexes(windows, start, end):
+    """
+    Indice, dans `windows`, de la plage couvrant chaque nuit de [start, end)
+    (-1 si aucune). Une affectation par tranche et par plage, de la
+    dernière à la première : la première plage couvrante (ordre de début)
+    l'emporte.
+    """
+    indexes = np.full((end - start).days, -1, dtype=np.int32)
+    for i in range(len(windows) - 1, -1, -1):
+        window = windows[i]
+        low = max((window['start_date'] - start).days, 0)
+        high = min((window['end_date'] - start).days, len(indexes))
+        if low < high:
+            indexes[low:high] = i
+    return indexes
+
+
+def night_cents(windows, indexes):
+    """Tarif de chaque nuit en centimes (int64), -1 hors plage."""
+    cents = np.array([int(w['price_per_night'] * 100) for w in windows] + [-1], dtype=np.int64)
+    # L'indice -1 désigne le dernier élément : la valeur sentinelle
+    return cents[indexes]
+
+
+def night_price_labels(windows, start, end):
+    """Tarif (chaîne) de chaque nuit de [start, end), None hors plage : une seule passe pour l'année."""
+    labels = [str(w['price_per_night']) for w in windows] + [None]
+    return [labels[i] for i in window_indexes(windows, start, end).tolist()]
+
+
+def to_decimal(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def quote_stay(calendar, check_in, check_out, today=None):
+    """
+    Devis du séjour [check_in, check_out) : chaque nuit au tarif de la plage
+    qui la couvre, durées minimale et maximale de la plage d'arrivée, frais
+    de service de 5 % arrondis au centime. Lève `QuoteError` si le séjour
+    n'est pas réservable.
+    """
+    conflict = calendar.conflict(check_in, check_out, today)
+    if conflict:
+        raise QuoteError(conflict)
+    indexes = window_indexes(calendar.windows, check_in, check_out)
+    if (indexes < 0).any():
+        raise QuoteError('uncovered')
+    nights = len(indexes)
+    arrival = calendar.windows[indexes[0]]
+    if nights < arrival['min_nights']:
+        raise QuoteError('min_nights', arrival['min_nights'])
+    if nights > arrival['max_nights']:
+        raise QuoteError('max_nights', arrival['max_nights'])
+
+    cents = night_cents(calendar.windows, indexes)
+    subtotal = to_decimal(cents.sum())
+    service_fee = (subtotal * SERVICE_FEE_RATE).quantize(CENTS, rounding=ROUND_HALF_UP)
+    # Suites de nuits au même tarif : [tarif, nombre de nuits]
+    changes = np.flatnonzero(np.diff(cents)) + 1
+    bounds = [0, *changes.tolist(), nights]
+    return {
+        'check_in': check_in,
+        'check_out': check_out,
+        'nights': nights,
+        'nightly_prices': [
+            [to_decimal(cents[low]), high - low] for low, high in zip(bounds, bounds[1:])
+        ],
+        'price_per_night': (subtotal / nights).quantize(CENTS, rounding=ROUND_HALF_UP),
+        'subtotal': subtotal,
+        'service_fee': service_fee,
+        'total': subtotal + service_fee,
+        'min_nights': arrival['min_nights'],
+        'max_nights': arrival['max_nights'],
+    }
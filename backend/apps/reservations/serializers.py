@@ -1,3 +1,4 @@
+from datetime import date
 from rest_framework import serializers
 from .models import Reservation, Availability, BlockedDate
 
@@ -53,27 +54,8 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
         if data['check_in'] >= data['check_out']:
             raise serializers.ValidationError("Le check-out doit être après le check-in")
 
-        prop = data['linked_property']
-        check_in = data['check_in']
-        check_out = data['check_out']
-
-        # Vérifier qu'il n'y a pas de réservation existante qui chevauche
-        overlapping = Reservation.objects.filter(
-            linked_property=prop,
-            status__in=['pending', 'confirmed', 'paid'],
-            check_in__lt=check_out,
-            check_out__gt=check_in,
-        )
-        if overlapping.exists():
-            raise serializers.ValidationError("Ces dates ne sont pas disponibles")
-
-        # Vérifier les dates bloquées
-        blocked = BlockedDate.objects.filter(
-            linked_property=prop,
-            date__gte=check_in,
-            date__lt=check_out,
-        )
-        if blocked.exists():
-            raise serializers.ValidationError("Certaines dates sont bloquées par le propriétaire")
+        if data['check_in'] < date.today():
+            raise serializers.ValidationError("Le check-in ne peut pas être dans le passé")
 
+        # La disponibilité est vérifiée par la vue, sous verrou (voir `ReservationCreateView`)
         return data
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from apps.properties.cache import invalidate_availability, invalidate_calendar
+from .availability import refresh_calendar
+from .models import Availability, AvailabilityCalendar, BlockedDate, Reservation
+
+
+def refresh_after_delete(property_id, *args, **kwargs):
+    # Après validation : lors de la suppression du bien, le calendrier
+    # n'existe plus et n'est pas recréé. Un calendrier resté en retard ne
+    # peut que garder des nuits indisponibles.
+    transaction.on_commit(partial(refresh_calendar, property_id, *args, create=False, **kwargs))
+
+
+@receiver(pre_save, sender=Reservation)
+def remember_previous_stay(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._previous_stay = (
+            Reservation.objects.filter(pk=instance.pk).values_list('check_in', 'check_out').first()
+        )
+
+
+@receiver(post_save, sender=Reservation)
+def update_calendar_for_reservation(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    start, end = instance.check_in, instance.check_out
+    previous = getattr(instance, '_previous_stay', None)
+    if previous:
+        start, end = min(start, previous[0]), max(end, previous[1])
+    refresh_calendar(instance.linked_property_id, start, end)
+
+
+@receiver(post_delete, sender=Reservation)
+def update_calendar_for_deleted_reservation(sender, instance, **kwargs):
+    refresh_after_delete(instance.linked_property_id, instance.check_in, instance.check_out)
+
+
+@receiver(pre_save, sender=BlockedDate)
+def remember_previous_blocked_date(sender, instance, raw=False, **kwargs):
+    if not raw and not instance._state.adding:
+        instance._previous_date = BlockedDate.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=BlockedDate)
+def update_calendar_for_blocked_date(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    nights = [instance.date, getattr(instance, '_previous_date', None) or instance.date]
+    refresh_calendar(instance.linked_property_id, min(nights), max(nights) + timedelta(days=1))
+
+
+@receiver(post_delete, sender=BlockedDate)
+def update_calendar_for_deleted_blocked_date(sender, instance, **kwargs):
+    refresh_after_delete(instance.linked_property_id, instance.date, instance.date + timedelta(days=1))
+
+
+@receiver(post_save, sender=Availability)
+def update_calendar_windows(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_calendar(instance.linked_property_id, windows=True)
+
+
+@receiver(post_delete, sender=Availability)
+def update_calendar_for_deleted_window(sender, instance, **kwargs):
+    refresh_after_delete(instance.linked_property_id, windows=True)
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+@receiver(post_save, sender=BlockedDate)
+@receiver(post_delete, sender=BlockedDate)
+@receiver(post_save, sender=Availability)
+@receiver(post_delete, sender=Availability)
+def invalidate_cached_availability(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_availability)
+    transaction.on_commit(partial(invalidate_calendar, instance.linked_property_id))
+
+
+@receiver(post_delete, sender=AvailabilityCalendar)
+def invalidate_deleted_calendar(sender, instance, **kwargs):
+    # Suppression du bien : les mois en cache ne doivent plus répondre
+    transaction.on_commit(partial(invalidate_calendar, instance.pk))
@@ -1,3 +1,247 @@
-from django.test import TestCase
+import io
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
+from types import SimpleNamespace
+from unittest.mock import patch
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from apps.properties.models import Property
+from .availability import load_calendar
+from .benchmark import book_concurrently, double_booked_nights
+from .models import Availability, AvailabilityCalendar, BlockedDate, Reservation
 
-# Create your tests here.
+
+def night(offset):
+    return date.today() + timedelta(days=offset)
+
+
+class AvailabilityCalendarTests(TestCase):
+    def setUp(self):
+        self.host = User.objects.create_user('hote', 'hote@example.com', 'motdepasse123')
+        self.guest = User.objects.create_user('voyageur', 'voyageur@example.com', 'motdepasse123')
+        self.property = Property.objects.create(
+            owner=self.host, title='Studio', price=Decimal('100'), address='1 rue', city='Nice',
+        )
+        Availability.objects.create(
+            linked_property=self.property, start_date=night(0), end_date=night(30),
+            price_per_night=Decimal('80'),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+
+    def book(self, check_in, check_out):
+        return self.client.post('/api/reservations/create/', {
+            'linked_property': str(self.property.pk),
+            'check_in': night(check_in).isoformat(), 'check_out': night(check_out).isoformat(),
+        }, format='json')
+
+    def test_booking_uses_calendar(self):
+        booking = self.book(2, 5)
+        self.assertEqual(booking.status_code, 201)
+        self.assertEqual(booking.json()['price_per_night'], '80.00')
+        self.assertEqual(self.book(4, 6).status_code, 409)
+        self.assertEqual(self.book(-1, 1).status_code, 400)
+        self.assertEqual(self.book(5, 6).status_code, 201)
+
+        BlockedDate.objects.create(linked_property=self.property, date=night(10))
+        response = self.book(9, 11)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['error'], 'Certaines dates sont bloquées par le propriétaire')
+
+        self.client.post(f"/api/reservations/{booking.json()['id']}/cancel/")
+        self.assertEqual(self.book(2, 4).status_code, 201)
+
+    def test_only_overlap_violation_is_a_conflict(self):
+        overlap = IntegrityError('conflicting key value violates exclusion constraint "reservation_no_overlap"')
+        with patch.object(Reservation.objects, 'create', side_effect=overlap):
+            self.assertEqual(self.book(2, 5).status_code, 409)
+        with patch.object(Reservation.objects, 'create', side_effect=IntegrityError('NOT NULL constraint failed')):
+            with self.assertRaises(IntegrityError):
+                self.book(2, 5)
+
+    def test_constraint_migration_reports_overlapping_stays(self):
+        migration = import_module('apps.reservations.migrations.0003_reservation_no_overlap')
+        # Doubles réservations antérieures à la contrainte (insertion directe)
+        first, second, cancelled = [
+            Reservation.objects.create(
+                linked_property=self.property, guest=self.guest, host=self.host, status=status,
+                check_in=night(check_in), check_out=night(check_out),
+                price_per_night=Decimal('80'), total_price=Decimal('240'),
+            )
+            for check_in, check_out, status in [(2, 5, 'confirmed'), (4, 6, 'pending'), (3, 4, 'cancelled')]
+        ]
+        Reservation.objects.create(
+            linked_property=self.property, guest=self.guest, host=self.host, check_in=night(6),
+            check_out=night(8), price_per_night=Decimal('80'), total_price=Decimal('160'),
+        )
+        self.assertEqual(
+            list(migration.overlapping_reservations(Reservation, 'default').values_list('pk', flat=True)),
+            [first.pk, second.pk],
+        )
+        schema_editor = SimpleNamespace(connection=SimpleNamespace(vendor='postgresql', alias='default'))
+        with self.assertRaisesMessage(IntegrityError, str(second.pk)):
+            migration.check_no_overlaps(apps, schema_editor)
+
+    def test_calendar_merges_confirmed_stays(self):
+        host = APIClient()
+        host.force_authenticate(self.host)
+        self.book(0, 2)
+        for stay in [(2, 4), (4, 6), (8, 9)]:
+            host.post(f"/api/reservations/{self.book(*stay).json()['id']}/confirm/")
+        BlockedDate.objects.create(linked_property=self.property, date=night(12))
+
+        url = f'/api/reservations/properties/{self.property.pk}/calendar/'
+        data = self.client.get(url, {'from': night(0).isoformat(), 'to': night(40).isoformat()}).json()
+        # Le séjour (4, 6) prolonge (2, 4) ; (0, 2) reste en attente
+        self.assertEqual(data['states'], [
+            ['p', 2], ['r', 4], ['f', 2], ['r', 1], ['f', 3], ['b', 1], ['f', 17], ['x', 10],
+        ])
+        self.assertEqual(data['prices'], [['80.00', 30], [None, 10]])
+        self.assertEqual([w['max_nights'] for w in data['availabilities']], [30])
+
+        # Mois en cache, invalidés à la validation d'une écriture
+        with self.assertNumQueries(0):
+            self.client.get(url, {'from': night(0).isoformat(), 'to': night(40).isoformat()})
+        with self.captureOnCommitCallbacks(execute=True):
+            BlockedDate.objects.create(linked_property=self.property, date=night(20))
+        data = self.client.get(url, {'from': night(19).isoformat(), 'to': night(22).isoformat()}).json()
+        self.assertEqual(data['states'], [['f', 1], ['b', 1], ['f', 1]])
+        for params in [{'from': night(5), 'to': night(5)}, {'from': '9999-06-01'}, {'from': '9999-12-01', 'to': '9999-12-31'}]:
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+
+        # Les mises à jour incrémentales donnent le même calendrier qu'une reconstruction
+        incremental, _ = load_calendar(self.property.pk)
+        AvailabilityCalendar.objects.all().delete()
+        rebuilt, _ = load_calendar(self.property.pk)
+        for name in ('booked', 'pending', 'blocked', 'windows'):
+            self.assertEqual(getattr(incremental, name), getattr(rebuilt, name))
+
+    def test_property_list_filters_on_stay(self):
+        Property.objects.filter(pk=self.property.pk).update(is_published=True, max_guests=2)
+        other = Property.objects.create(
+            owner=self.host, title='Villa', price=Decimal('300'), address='2 rue', city='Nice',
+            is_published=True,
+        )
+        Availability.objects.create(
+            linked_property=other, start_date=night(0), end_date=night(10), price_per_night=Decimal('200'),
+        )
+
+        def search(check_in, check_out, **params):
+            response = self.client.get('/api/properties/', {
+                'check_in': night(check_in).isoformat(), 'check_out': night(check_out).isoformat(), **params,
+            })
+            return sorted(item['title'] for item in response.json()['results'])
+
+        self.assertEqual(search(2, 5), ['Studio', 'Villa'])
+        self.assertEqual(search(2, 5, guests=3), ['Villa'])
+        self.assertEqual(search(8, 12), ['Studio'])
+        # Les listes en cache suivent la version de disponibilité, incrémentée au commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(3, 4)
+            BlockedDate.objects.create(linked_property=other, date=night(6))
+        self.assertEqual(search(2, 5), ['Villa'])
+        self.assertEqual(search(5, 7), ['Studio'])
+        self.assertEqual(search(1, 3), ['Studio', 'Villa'])
+        self.assertEqual(self.client.get('/api/properties/', {'check_in': night(2).isoformat()}).status_code, 400)
+
+    def test_stay_spanning_adjacent_windows_is_listed(self):
+        Property.objects.filter(pk=self.property.pk).update(is_published=True)
+        Availability.objects.create(
+            linked_property=self.property, start_date=night(30), end_date=night(40),
+            price_per_night=Decimal('120'), min_nights=2,
+        )
+        Availability.objects.create(
+            linked_property=self.property, start_date=night(45), end_date=night(50),
+            price_per_night=Decimal('120'),
+        )
+
+        def listed(check_in, check_out):
+            cache.clear()
+            return self.client.get('/api/properties/', {
+                'check_in': night(check_in).isoformat(), 'check_out': night(check_out).isoformat(),
+            }).json()['count'] == 1
+
+        for check_in, check_out in [(28, 33), (29, 40), (31, 32), (38, 46), (39, 40)]:
+            quote = self.client.get(f'/api/reservations/properties/{self.property.pk}/quote/', {
+                'check_in': night(check_in).isoformat(), 'check_out': night(check_out).isoformat(),
+            })
+            # La recherche retient exactement les séjours que le devis accepte
+            self.assertEqual(listed(check_in, check_out), quote.status_code == 200, (check_in, check_out))
+        self.assertTrue(listed(28, 33))
+        self.assertFalse(listed(38, 46))
+
+    def test_quote_prices_each_night(self):
+        # Plages qui se chevauchent : la première (début plus tôt) l'emporte sur [25, 30)
+        Availability.objects.create(
+            linked_property=self.property, start_date=night(25), end_date=night(40),
+            price_per_night=Decimal('99.99'), min_nights=3, max_nights=5,
+        )
+        url = f'/api/reservations/properties/{self.property.pk}/quote/'
+
+        def quote(check_in, check_out):
+            return self.client.get(url, {'check_in': night(check_in).isoformat(), 'check_out': night(check_out).isoformat()})
+
+        data = quote(28, 31).json()
+        self.assertEqual(data['nightly_prices'], [['80.00', 2], ['99.99', 1]])
+        self.assertEqual(data['subtotal'], '259.99')
+        self.assertEqual(data['service_fee'], '13.00')
+        self.assertEqual(data['total'], '272.99')
+        self.assertEqual(quote(30, 31).status_code, 400)
+        self.assertEqual(quote(30, 36).json()['error'], 'Séjour maximum : 5 nuits')
+        self.assertEqual(quote(38, 41).status_code, 409)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(quote(28, 31).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self.book(28, 31).json()
+        self.assertEqual(booking['total_price'], '272.99')
+        self.assertEqual(booking['service_fee'], '13.00')
+        self.assertEqual(quote(28, 31).status_code, 409)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Réservations simultanées des mêmes nuits depuis plusieurs threads (une
+    connexion chacun) : aucune nuit ne doit être réservée deux fois. Le débit
+    se mesure avec `manage.py benchmark_bookings`.
+    """
+    THREADS = 8
+    ATTEMPTS = 80
+
+    def setUp(self):
+        host = User.objects.create_user('hote', 'hote@example.com', 'motdepasse123')
+        self.guests = [User.objects.create_user(f'voyageur{i}') for i in range(self.THREADS)]
+        self.property = Property.objects.create(
+            owner=host, title='Villa', price=Decimal('200'), address='1 rue', city='Nice',
+        )
+        Availability.objects.create(
+            linked_property=self.property, start_date=night(0), end_date=night(90),
+            price_per_night=Decimal('150'),
+        )
+
+    def test_simultaneous_bookings_never_overlap(self):
+        rng = random.Random(42)
+        starts = [rng.randint(1, 30) for _ in range(self.ATTEMPTS)]
+        stays = [(night(start), night(start + rng.randint(1, 4))) for start in starts]
+        statuses, _ = book_concurrently(self.property.pk, self.guests, stays)
+
+        self.assertEqual(len(statuses), self.ATTEMPTS)
+        self.assertLessEqual(set(statuses), {201, 409})
+        self.assertIn(409, statuses)
+        self.assertEqual(double_booked_nights(Reservation.objects.values_list('check_in', 'check_out')), set())
+        self.assertEqual(statuses.count(201), Reservation.objects.count())
+
+    def test_benchmark_command_cleans_up(self):
+        out = io.StringIO()
+        call_command('benchmark_bookings', '--threads', '4', '--attempts', '20', '--force', stdout=out)
+        self.assertIn('Aucune nuit réservée deux fois', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='benchmark-').exists())
+        self.assertFalse(Property.objects.filter(title='Benchmark').exists())
@@ -11,6 +11,7 @@ urlpatterns = [
 
     # Calendrier
     path('properties/<uuid:property_id>/calendar/', views.property_calendar, name='property-calendar'),
+    path('properties/<uuid:property_id>/quote/', views.property_quote, name='property-quote'),
 
     # Réservations
     path('create/', views.ReservationCreateView.as_view(), name='reservation-create'),
@@ -1,11 +1,16 @@
-from datetime import date
-from decimal import Decimal
+from datetime import date, timedelta
+from itertools import groupby
+from django.core.cache import cache
 from django.utils import timezone
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from apps.properties.cache import calendar_version
+from .availability import calendar_months, load_calendar, lock_calendar, next_month
 from .models import Reservation, Availability, BlockedDate
+from .pricing import QuoteError, quote_stay
 from .serializers import (
     ReservationSerializer, ReservationCreateSerializer,
     AvailabilitySerializer, BlockedDateSerializer,
@@ -55,36 +60,156 @@ class BlockedDateListCreateView(generics.ListCreateAPIView):
 
 # ─── CALENDAR (dates disponibles/bloquées) ───────────────
 
+DEFAULT_CALENDAR_DAYS = 365
+MAX_CALENDAR_DAYS = 731
+# Au-delà, aucune plage ne peut exister ; borne aussi les calculs de mois
+CALENDAR_HORIZON_DAYS = 10 * 365
+
+
+def run_lengths(values):
+    """[[valeur, nombre de nuits], ...] des suites de valeurs identiques."""
+    return [[value, len(list(group))] for value, group in groupby(values)]
+
+
+def parse_calendar_range(params, today):
+    """`?from=&to=` (AAAA-MM-JJ, fin exclue) ; par défaut un an à partir d'aujourd'hui."""
+    try:
+        start = date.fromisoformat(params['from']) if params.get('from') else today
+        end = date.fromisoformat(params['to']) if params.get('to') else start + timedelta(days=DEFAULT_CALENDAR_DAYS)
+    except ValueError:
+        raise ValueError('Dates attendues au format AAAA-MM-JJ')
+    except OverflowError:
+        raise ValueError('Dates hors limites')
+    if end <= start:
+        raise ValueError('`to` doit être postérieur à `from`')
+    if (end - start).days > MAX_CALENDAR_DAYS:
+        raise ValueError(f'Période limitée à {MAX_CALENDAR_DAYS} jours')
+    if end > today + timedelta(days=CALENDAR_HORIZON_DAYS):
+        raise ValueError(f'Calendrier disponible sur {CALENDAR_HORIZON_DAYS // 365} ans au plus')
+    return start, end
+
+
 @api_view(['GET'])
 def property_calendar(request, property_id):
-    """Retourne les disponibilités, dates bloquées et réservations pour le calendrier."""
-    availabilities = Availability.objects.filter(
-        linked_property_id=property_id, is_active=True,
-        end_date__gte=date.today(),
-    )
-    blocked = BlockedDate.objects.filter(
-        linked_property_id=property_id,
-        date__gte=date.today(),
-    )
-    reservations = Reservation.objects.filter(
-        linked_property_id=property_id,
-        status__in=['confirmed', 'paid'],
-        check_out__gte=date.today(),
-    )
+    """
+    Calendrier du bien sur `?from=&to=`, encodé par suites : `states` donne
+    l'état de chaque nuit (`f` libre, `r` réservée, `p` en attente, `b`
+    bloquée, `x` fermée) et `prices` son tarif (null hors plage), sous forme
+    de [valeur, nombre de nuits]. Les mois sont mis en cache par bien.
+    """
+    today = date.today()
+    try:
+        start, end = parse_calendar_range(request.query_params, today)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+    months = calendar_months(property_id, start, end, today)
+    if months is None:
+        return Response({'error': 'Bien introuvable'}, status=404)
+
+    states, prices, windows = [], [], {}
+    for month, summary in months:
+        skip = max((start - month).days, 0)
+        take = (min(end, next_month(month)) - month).days
+        states.extend(summary['states'][skip:take])
+        prices.extend(summary['prices'][skip:take])
+        for window in summary['windows']:
+            if window['start_date'] < end.isoformat() and window['end_date'] > start.isoformat():
+                windows[window['id']] = window
 
     return Response({
-        'availabilities': AvailabilitySerializer(availabilities, many=True).data,
-        'blocked_dates': [bd.date.isoformat() for bd in blocked],
-        'reserved_dates': [
-            {'check_in': r.check_in.isoformat(), 'check_out': r.check_out.isoformat()}
-            for r in reservations
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'states': run_lengths(states),
+        'prices': run_lengths(prices),
+        'availabilities': [
+            {key: window[key] for key in ('id', 'start_date', 'end_date', 'min_nights', 'max_nights')}
+            for window in windows.values()
         ],
     })
 
 
 # ─── RESERVATIONS ────────────────────────────────────────
 
+QUOTE_MESSAGES = {
+    'past': "Le check-in ne peut pas être dans le passé",
+    'reserved': "Ces dates ne sont pas disponibles",
+    'blocked': "Certaines dates sont bloquées par le propriétaire",
+    'uncovered': "Certaines nuits ne sont couvertes par aucune disponibilité",
+    'min_nights': "Séjour minimum : {limit} nuits",
+    'max_nights': "Séjour maximum : {limit} nuits",
+}
+QUOTE_CACHE_TIMEOUT = 3600
+
+
+def quote_error(exc):
+    """Réponse d'erreur d'un devis : 409 si les nuits sont indisponibles, 400 si la durée est refusée."""
+    code = status.HTTP_400_BAD_REQUEST if exc.reason in ('min_nights', 'max_nights') else status.HTTP_409_CONFLICT
+    return {'error': QUOTE_MESSAGES[exc.reason].format(limit=exc.limit)}, code
+
+
+def dump_quote(quote):
+    return {
+        **quote,
+        'check_in': quote['check_in'].isoformat(),
+        'check_out': quote['check_out'].isoformat(),
+        'nightly_prices': [[str(price), count] for price, count in quote['nightly_prices']],
+        **{key: str(quote[key]) for key in ('price_per_night', 'subtotal', 'service_fee', 'total')},
+    }
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def property_quote(request, property_id):
+    """
+    Devis `?check_in=&check_out=` : tarif nuit par nuit, frais de service et
+    total. Mis en cache par bien et par séjour, sur la version du calendrier.
+    """
+    try:
+        check_in = date.fromisoformat(request.query_params.get('check_in', ''))
+        check_out = date.fromisoformat(request.query_params.get('check_out', ''))
+    except ValueError:
+        return Response({'error': 'Dates attendues au format AAAA-MM-JJ'}, status=400)
+    if check_out <= check_in:
+        return Response({'error': 'Le check-out doit être après le check-in'}, status=400)
+    if check_in < date.today():
+        return Response({'error': QUOTE_MESSAGES['past']}, status=400)
+
+    key = f'reservations:quote:{property_id}:v{calendar_version(property_id)}:{check_in}:{check_out}'
+    cached = cache.get(key)
+    if cached is None:
+        calendar, _ = load_calendar(property_id)
+        if calendar is None:
+            return Response({'error': 'Bien introuvable'}, status=404)
+        try:
+            cached = (dump_quote(quote_stay(calendar, check_in, check_out)), status.HTTP_200_OK)
+        except QuoteError as exc:
+            cached = quote_error(exc)
+        cache.set(key, cached, QUOTE_CACHE_TIMEOUT)
+    data, code = cached
+    return Response(data, status=code)
+
+
+# Contrainte d'exclusion de `Reservation` (PostgreSQL, voir `constraints.py`)
+NO_OVERLAP_CONSTRAINT = 'reservation_no_overlap'
+
+
+def is_overlap_violation(exc):
+    """Vrai si l'`IntegrityError` provient de la contrainte `reservation_no_overlap`."""
+    diag = getattr(exc.__cause__, 'diag', None)
+    name = getattr(diag, 'constraint_name', None)
+    if name is not None:
+        return name == NO_OVERLAP_CONSTRAINT
+    return NO_OVERLAP_CONSTRAINT in str(exc)
+
+
 class ReservationCreateView(generics.CreateAPIView):
+    """
+    Vérification, devis et insertion dans une même transaction, calendrier
+    du bien verrouillé : deux réservations simultanées des mêmes nuits sont
+    sérialisées et la seconde reçoit un 409. Sur PostgreSQL, une contrainte
+    d'exclusion (`Reservation.Meta.constraints`) garantit en plus l'absence
+    de chevauchement.
+    """
     serializer_class = ReservationCreateSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -94,38 +219,33 @@ class ReservationCreateView(generics.CreateAPIView):
 
         data = serializer.validated_data
         prop = data['linked_property']
-        check_in = data['check_in']
-        check_out = data['check_out']
-        nights = (check_out - check_in).days
-
-        # Trouver le prix par nuit depuis les disponibilités
-        availability = Availability.objects.filter(
-            linked_property=prop,
-            start_date__lte=check_in,
-            end_date__gte=check_out,
-            is_active=True,
-        ).first()
-
-        if availability:
-            price_per_night = availability.price_per_night
-        else:
-            price_per_night = prop.price  # Fallback au prix de la propriété
-
-        total_price = price_per_night * nights
-        service_fee = total_price * Decimal('0.05')  # 5% frais de service
-
-        reservation = Reservation.objects.create(
-            linked_property=prop,
-            guest=request.user,
-            host=prop.owner,
-            check_in=check_in,
-            check_out=check_out,
-            guests_count=data.get('guests_count', 1),
-            price_per_night=price_per_night,
-            total_price=total_price + service_fee,
-            service_fee=service_fee,
-            message=data.get('message', ''),
-        )
+
+        try:
+            with transaction.atomic():
+                # Réservations, dates bloquées et plages : une seule lecture, sous verrou
+                calendar = lock_calendar(prop.pk)
+                quote = quote_stay(calendar, data['check_in'], data['check_out'])
+                reservation = Reservation.objects.create(
+                    linked_property=prop,
+                    guest=request.user,
+                    host=prop.owner,
+                    check_in=data['check_in'],
+                    check_out=data['check_out'],
+                    guests_count=data.get('guests_count', 1),
+                    price_per_night=quote['price_per_night'],
+                    total_price=quote['total'],
+                    service_fee=quote['service_fee'],
+                    message=data.get('message', ''),
+                )
+        except QuoteError as exc:
+            error, code = quote_error(exc)
+            return Response(error, status=code)
+        except IntegrityError as exc:
+            # Contrainte d'exclusion (PostgreSQL) : chevauchement détecté à
+            # l'insertion ; toute autre violation reste une erreur serveur
+            if not is_overlap_violation(exc):
+                raise
+            return Response({'error': QUOTE_MESSAGES['reserved']}, status=status.HTTP_409_CONFLICT)
 
         return Response(
             ReservationSerializer(reservation).data,
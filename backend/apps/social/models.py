@@ -36,12 +36,17 @@ class Post(models.Model):
     def __str__(self):
         return f"{self.author.username} - {self.content[:50]}"
 
+    # `likes_total` / `comments_total` : annotations posées par `_annotate_posts`
     @property
     def likes_count(self):
+        if hasattr(self, 'likes_total'):
+            return self.likes_total
         return self.likes.count()
 
     @property
     def comments_count(self):
+        if hasattr(self, 'comments_total'):
+            return self.comments_total
         return self.comments.count()
 
 
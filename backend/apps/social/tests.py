@@ -1,3 +1,36 @@
+from unittest.mock import patch
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+from .models import Comment, Like, Post
+from .serializers import PostSerializer
 
-# Create your tests here.
+
+class PostEtagTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        self.reader = User.objects.create_user('lecteur', 'lecteur@example.com', 'motdepasse123')
+        self.post = Post.objects.create(author=self.author, content='Nouveau loft')
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.url = f'/api/social/posts/{self.post.pk}/'
+
+    def etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_etag_is_not_serialized(self):
+        etag = self.etag()
+        with patch.object(PostSerializer, 'to_representation') as to_representation:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        to_representation.assert_not_called()
+
+    def test_comments_and_likes_change_etag(self):
+        etags = [self.etag()]
+        Comment.objects.create(user=self.author, post=self.post, content='Disponible dès juin')
+        etags.append(self.etag())
+        Like.objects.create(user=self.reader, post=self.post)
+        etags.append(self.etag())
+        self.assertEqual(len(set(etags)), 3)
@@ -1,6 +1,9 @@
+import hashlib
 from django.contrib.auth.models import User
-from django.db.models import Count
+from django.db.models import Count, Max
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -13,8 +16,8 @@ from .serializers import (
 
 def _annotate_posts(qs):
     return qs.annotate(
-        likes_count=Count('likes', distinct=True),
-        comments_count=Count('comments', distinct=True),
+        likes_total=Count('likes', distinct=True),
+        comments_total=Count('comments', distinct=True),
     ).select_related('author__profile').prefetch_related('images', 'comments__user')
 
 
@@ -79,6 +82,25 @@ class PostCreateView(generics.CreateAPIView):
         )
 
 
+def post_etag(request, pk):
+    """ETag du détail : `updated_at`, auteur, marqueurs des likes, commentaires et images, like courant."""
+    parts = Post.objects.filter(pk=pk).annotate(
+        likes_n=Count('likes', distinct=True),
+        comments_n=Count('comments', distinct=True),
+        comments_last=Max('comments__id'),
+        images_last=Max('images__id'),
+    ).values_list(
+        'updated_at', 'author__username', 'author__first_name', 'author__last_name',
+        'author__profile__updated_at', 'likes_n', 'comments_n', 'comments_last', 'images_last',
+    ).first()
+    if parts is None:
+        return None
+    if request.user.is_authenticated:
+        parts += (request.user.likes.filter(post_id=pk).exists(),)
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+@method_decorator(condition(etag_func=post_etag), name='get')
 class PostDetailView(generics.RetrieveDestroyAPIView):
     serializer_class = PostSerializer
 
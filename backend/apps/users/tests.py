@@ -1,3 +1,56 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+from apps.properties.models import Property
 
-# Create your tests here.
+
+class UserPropertiesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('agence', 'agence@example.com', 'motdepasse123')
+        self.other = User.objects.create_user('voisin', 'voisin@example.com', 'motdepasse123')
+        self.property = self.create(self.owner, 'Loft')
+        self.create(self.owner, 'Brouillon', is_published=False)
+        self.neighbour = self.create(self.other, 'Maison')
+        self.client = APIClient()
+        self.url = f'/api/users/{self.owner.pk}/properties/'
+
+    def create(self, owner, title, is_published=True):
+        return Property.objects.create(
+            owner=owner, title=title, price=Decimal('1000'), address='1 rue', city='Nice', is_published=is_published,
+        )
+
+    def titles(self):
+        return [p['title'] for p in self.client.get(self.url).json()['results']]
+
+    def test_paginated_cards(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(set(data), {'count', 'next', 'previous', 'results'})
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(self.client.get('/api/users/999/properties/').status_code, 404)
+
+    def test_cache_follows_only_the_owner_writes(self):
+        self.assertEqual(self.titles(), ['Loft'])
+        self.neighbour.title = 'Maison rénovée'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.neighbour.save()
+        # Ni la liste ni le contrôle d'existence de l'utilisateur ne touchent la base
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(), ['Loft'])
+
+        self.property.title = 'Loft rénové'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.save()
+        self.assertEqual(self.titles(), ['Loft rénové'])
+
+    def test_deleted_owner_is_not_served_from_cache(self):
+        url = f'/api/users/{self.other.pk}/properties/'
+        Property.objects.filter(owner=self.other).delete()
+        self.assertEqual(self.client.get(url).json()['count'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.delete()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'error': 'Utilisateur introuvable'})
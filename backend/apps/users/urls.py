@@ -11,5 +11,5 @@ urlpatterns = [
 
     # Users
     path('users/<int:pk>/', views.UserDetailView.as_view(), name='user-detail'),
-    path('users/<int:pk>/properties/', views.user_properties_view, name='user-properties'),
+    path('users/<int:pk>/properties/', views.UserPropertiesView.as_view(), name='user-properties'),
 ]
@@ -1,8 +1,15 @@
+from functools import partial
 from django.contrib.auth.models import User
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
+from apps.properties.cache import owner_version
+from apps.properties.filters import PropertyOrderingFilter
+from apps.properties.models import Property
+from apps.properties.pagination import PropertyPagination
+from apps.properties.serializers import PropertyCardSerializer, card_queryset
+from apps.properties.views import SharedCacheMixin
 from .models import UserProfile
 from .serializers import UserSerializer, RegisterSerializer
 
@@ -50,15 +57,37 @@ class UserDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.AllowAny]
 
 
-@api_view(['GET'])
-@permission_classes([permissions.AllowAny])
-def user_properties_view(request, pk):
-    from apps.properties.models import Property
-    from apps.properties.serializers import PropertySerializer
-    try:
-        user = User.objects.get(pk=pk)
-    except User.DoesNotExist:
-        return Response({'error': 'Utilisateur introuvable'}, status=404)
-    properties = Property.objects.filter(owner=user, is_published=True)
-    serializer = PropertySerializer(properties, many=True, context={'request': request})
-    return Response(serializer.data)
+class UserPropertiesView(SharedCacheMixin, generics.ListAPIView):
+    """
+    Biens publiés d'un utilisateur, en cartes ; cache invalidé par ses seules
+    écritures. La réponse est paginée comme la liste des biens
+    (`{count, next, previous, results}`, ou curseur) et non plus une liste nue.
+    """
+    serializer_class = PropertyCardSerializer
+    pagination_class = PropertyPagination
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [PropertyOrderingFilter]
+    ordering_fields = ['price', 'created_at', 'surface_area']
+    ordering = ['-created_at']
+    cache_prefix = 'owner'
+
+    def get_cache_version(self):
+        return owner_version(self.kwargs['pk'])
+
+    def get_queryset(self):
+        return card_queryset(Property.objects.filter(owner_id=self.kwargs['pk'], is_published=True))
+
+    def list_owned(self, request, *args, **kwargs):
+        # Contrôle d'existence au seul défaut de cache : la suppression de
+        # l'utilisateur invalide ses entrées (signal)
+        if not User.objects.filter(pk=kwargs['pk']).exists():
+            raise User.DoesNotExist
+        return super().list(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        try:
+            return self.cached_response(
+                partial(self.list_owned, request, *args, **kwargs), extra=str(kwargs['pk']),
+            )
+        except User.DoesNotExist:
+            return Response({'error': 'Utilisateur introuvable'}, status=404)
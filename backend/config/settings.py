@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     'apps.analytics',
     'apps.reservations',
     'apps.messaging',
+    'apps.alerts',
 ]
 
 MIDDLEWARE = [
@@ -77,6 +78,9 @@ if USE_SQLITE:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Base de test sur fichier : les tests concurrents ont besoin du
+            # verrouillage réel de SQLite (la base en mémoire partagée échoue)
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 else:
@@ -94,6 +98,23 @@ else:
         }
     }
 
+# Cache : mémoire locale par défaut, Redis (partagé entre workers) en production
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -117,6 +138,15 @@ CLOUDINARY_STORAGE = {
 }
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Stockage local à la place de Cloudinary (développement hors ligne, tests)
+if config('USE_LOCAL_MEDIA', default=False, cast=bool):
+    DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+
+# Images des biens : traitées hors requête par `manage.py process_property_images`.
+# En mode « eager », le traitement est lancé à la fin de la requête d'upload.
+PROPERTY_IMAGES_EAGER = config('PROPERTY_IMAGES_EAGER', default=False, cast=bool)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 SITE_ID = 1
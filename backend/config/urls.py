@@ -15,6 +15,7 @@ urlpatterns = [
     path('api/analytics/', include('apps.analytics.urls')),
     path('api/reservations/', include('apps.reservations.urls')),
     path('api/messaging/', include('apps.messaging.urls')),
+    path('api/alerts/', include('apps.alerts.urls')),
 
     # Documentation API (accessible sur /api/docs/)
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
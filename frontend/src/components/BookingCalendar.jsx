@@ -2,11 +2,13 @@ import { useState, useEffect, useMemo } from 'react'
 import { ChevronLeft, ChevronRight } from 'lucide-react'
 import {
   format, startOfMonth, endOfMonth, eachDayOfInterval, isSameMonth,
-  isSameDay, addMonths, subMonths, isAfter, isBefore, startOfDay,
+  isSameDay, addDays, addMonths, subMonths, isAfter, isBefore, startOfDay,
 } from 'date-fns'
 import { fr } from 'date-fns/locale'
 
 const DAYS = ['Lu', 'Ma', 'Me', 'Je', 'Ve', 'Sa', 'Di']
+// Réservée, en attente, bloquée (les nuits passées sont gérées à part)
+const UNAVAILABLE_STATES = ['r', 'p', 'b']
 
 export default function BookingCalendar({
   calendarData,
@@ -23,15 +25,13 @@ export default function BookingCalendar({
     if (!calendarData) return new Set()
     const dates = new Set()
 
-    // Dates bloquées
-    calendarData.blocked_dates?.forEach((d) => dates.add(d))
-
-    // Dates réservées
-    calendarData.reserved_dates?.forEach((r) => {
-      const start = new Date(r.check_in)
-      const end = new Date(r.check_out)
-      const days = eachDayOfInterval({ start, end: new Date(end.getTime() - 86400000) })
-      days.forEach((d) => dates.add(format(d, 'yyyy-MM-dd')))
+    // États nuit par nuit encodés par suites : [état, nombre de nuits]
+    let day = new Date(`${calendarData.from}T00:00:00`)
+    calendarData.states?.forEach(([state, count]) => {
+      for (let i = 0; i < count; i++) {
+        if (UNAVAILABLE_STATES.includes(state)) dates.add(format(day, 'yyyy-MM-dd'))
+        day = addDays(day, 1)
+      }
     })
 
     return dates
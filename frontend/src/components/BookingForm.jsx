@@ -1,16 +1,29 @@
-import { useState } from 'react'
+import { useState, useEffect } from 'react'
 import { format } from 'date-fns'
 import { fr } from 'date-fns/locale'
 import { Loader2, Calendar, Users, CreditCard } from 'lucide-react'
 import reservationService from '../services/reservationService'
 import { useAuth } from '../context/AuthContext'
 
-export default function BookingForm({ propertyId, checkIn, checkOut, pricePerNight, onBooked }) {
+export default function BookingForm({ propertyId, checkIn, checkOut, onBooked }) {
   const { user } = useAuth()
   const [guestsCount, setGuestsCount] = useState(1)
   const [message, setMessage] = useState('')
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
+  const [quote, setQuote] = useState(null)
+
+  // Le devis du serveur fait foi : tarif de chaque nuit, durée min/max, frais
+  useEffect(() => {
+    setQuote(null)
+    if (!checkIn || !checkOut) return
+    let cancelled = false
+    reservationService
+      .getQuote(propertyId, format(checkIn, 'yyyy-MM-dd'), format(checkOut, 'yyyy-MM-dd'))
+      .then((data) => { if (!cancelled) { setQuote(data); setError('') } })
+      .catch((err) => { if (!cancelled) setError(err.response?.data?.error || 'Devis indisponible') })
+    return () => { cancelled = true }
+  }, [propertyId, checkIn, checkOut])
 
   if (!checkIn || !checkOut) {
     return (
@@ -22,11 +35,6 @@ export default function BookingForm({ propertyId, checkIn, checkOut, pricePerNig
     )
   }
 
-  const nights = Math.ceil((checkOut - checkIn) / (1000 * 60 * 60 * 24))
-  const subtotal = pricePerNight * nights
-  const serviceFee = Math.round(subtotal * 0.05 * 100) / 100
-  const total = subtotal + serviceFee
-
   const handleSubmit = async (e) => {
     e.preventDefault()
     if (!user) {
@@ -48,6 +56,8 @@ export default function BookingForm({ propertyId, checkIn, checkOut, pricePerNig
       const detail = err.response?.data
       if (typeof detail === 'object' && detail.non_field_errors) {
         setError(detail.non_field_errors[0])
+      } else if (typeof detail === 'object' && detail.error) {
+        setError(detail.error)
       } else if (typeof detail === 'string') {
         setError(detail)
       } else {
@@ -109,26 +119,30 @@ export default function BookingForm({ propertyId, checkIn, checkOut, pricePerNig
         </div>
 
         {/* Price breakdown */}
-        <div className="space-y-2 mb-4 pt-4 border-t border-gray-100">
-          <div className="flex justify-between text-sm">
-            <span className="text-gray-600">{pricePerNight}€ x {nights} nuit{nights > 1 ? 's' : ''}</span>
-            <span className="text-gray-900">{subtotal}€</span>
-          </div>
-          <div className="flex justify-between text-sm">
-            <span className="text-gray-600">Frais de service (5%)</span>
-            <span className="text-gray-900">{serviceFee}€</span>
-          </div>
-          <div className="flex justify-between text-sm font-semibold pt-2 border-t border-gray-100">
-            <span className="text-gray-900">Total</span>
-            <span className="text-gray-900">{total}€</span>
+        {quote && (
+          <div className="space-y-2 mb-4 pt-4 border-t border-gray-100">
+            {quote.nightly_prices.map(([price, count], i) => (
+              <div key={i} className="flex justify-between text-sm">
+                <span className="text-gray-600">{price}€ x {count} nuit{count > 1 ? 's' : ''}</span>
+                <span className="text-gray-900">{(Number(price) * count).toFixed(2)}€</span>
+              </div>
+            ))}
+            <div className="flex justify-between text-sm">
+              <span className="text-gray-600">Frais de service (5%)</span>
+              <span className="text-gray-900">{quote.service_fee}€</span>
+            </div>
+            <div className="flex justify-between text-sm font-semibold pt-2 border-t border-gray-100">
+              <span className="text-gray-900">Total</span>
+              <span className="text-gray-900">{quote.total}€</span>
+            </div>
           </div>
-        </div>
+        )}
 
         {error && <p className="text-red-500 text-sm mb-3">{error}</p>}
 
         <button
           type="submit"
-          disabled={loading || !user}
+          disabled={loading || !user || !quote}
           className="w-full bg-primary-600 text-white py-3 rounded-lg font-medium hover:bg-primary-700 disabled:opacity-50 transition-colors flex items-center justify-center gap-2"
         >
           {loading ? (
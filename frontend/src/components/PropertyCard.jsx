@@ -3,7 +3,7 @@ import { Heart, MapPin, BedDouble, Bath, Maximize } from 'lucide-react'
 
 export default function PropertyCard({ property, onToggleFavorite, isFavorite }) {
   const coverImage = property.images?.find(img => img.is_cover) || property.images?.[0]
-  const imageUrl = coverImage?.image || 'https://placehold.co/400x300/e2e8f0/64748b?text=Aucune+image'
+  const imageUrl = property.cover_image || coverImage?.image || 'https://placehold.co/400x300/e2e8f0/64748b?text=Aucune+image'
 
   const formatPrice = (price) => {
     return new Intl.NumberFormat('fr-FR', {
@@ -151,6 +151,7 @@ export default function PropertyList() {
                 <option value="price">Prix croissant</option>
                 <option value="-price">Prix décroissant</option>
                 <option value="-surface_area">Surface</option>
+                <option value="price_per_sqm">Prix au m² croissant</option>
               </select>
             </div>
           </div>
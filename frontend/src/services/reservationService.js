@@ -2,8 +2,16 @@ import api from './api'
 
 const reservationService = {
   // Calendar
-  getCalendar: async (propertyId) => {
-    const res = await api.get(`/reservations/properties/${propertyId}/calendar/`)
+  getCalendar: async (propertyId, params = {}) => {
+    const res = await api.get(`/reservations/properties/${propertyId}/calendar/`, { params })
+    return res.data
+  },
+
+  // Devis (tarif nuit par nuit, frais de service, total)
+  getQuote: async (propertyId, checkIn, checkOut) => {
+    const res = await api.get(`/reservations/properties/${propertyId}/quote/`, {
+      params: { check_in: checkIn, check_out: checkOut },
+    })
     return res.data
   },
 